@@ -0,0 +1,225 @@
+import numpy as np
+import pandas as pd
+from eligibility import build_eligible_pairs
+from preprocessing import encode_product_attributes, group_pairs
+from rule_index import compile_rule_index
+
+
+def prepare_allocation_data(products_df: pd.DataFrame,
+                            channels_df: pd.DataFrame,
+                            inventory_df: pd.DataFrame,
+                            demand_dict: dict,
+                            parameters) -> dict:
+    """
+    Engine-independent preparation of the allocation model.
+
+    Resolves the inputs and the parameter rules into arrays over the eligible (p, c) pairs,
+    so every model builder (PuLP/CBC, matrix/HiGHS, ...) works from the same data.
+
+    Args:
+        products_df: DataFrame indexed by SKU.
+        channels_df: DataFrame indexed by channel ID.
+        inventory_df: DataFrame with columns 'product_sku', 'quantity'.
+        demand_dict: Dictionary of WEEKLY demand {(product_sku, channel_id): demand_quantity}.
+        parameters: OptimizationParameters object.
+
+    Returns:
+        Dictionary with:
+            'products', 'channels': Index of SKUs / channel IDs.
+            'inventory_quantity': Dictionary {product_sku: total_quantity}.
+            'supply': float array of total inventory per product.
+            'product_idx', 'channel_idx': int arrays, positions of each eligible pair.
+            'eligible_pairs': list of (product_sku, channel_id) tuples.
+            'pair_coverage_cap': float array, max allocation from the coverage rule (NaN = no rule).
+            'channel_capacity': float array, max total units for non-outlet channels (NaN = no binding limit).
+            'supply_limit', 'pair_upper_bound': see tighten_bounds.
+            'binary_pairs': see scope_binaries.
+            'outlet_capacity_rows': list of (row_name, pair_positions, max_skus), Max SKUs per (outlet, division, axe).
+            'outlet_assortment_rows': list of (row_name, pair_positions, max_skus), Max SKUs per (outlet, metier, subaxis, brand).
+    """
+    products_df.index = products_df.index.astype(str)
+    channels_df.index = channels_df.index.astype(str)
+    products = products_df.index
+    channels = channels_df.index
+
+    # Aggregate inventory by product SKU
+    inventory_quantity = inventory_df.groupby('product_sku')['quantity'].sum().to_dict() if len(inventory_df) else {}
+    supply = pd.Series(inventory_quantity, dtype=float).reindex(products).fillna(0).to_numpy()
+
+    # Columnar preprocessing: ABC codes and integer-coded (division, axe) / (metier, subaxis, brand) groups
+    attributes = encode_product_attributes(products_df)
+    channel_types = channels_df['channel_type'].to_numpy(dtype=object)
+
+    # Resolve the parameter rules (wildcards, channel-type defaults, overrides) once into dense lookups
+    rule_index = compile_rule_index(channels, channel_types, attributes, parameters)
+    coverage_days = rule_index['coverage_days']
+
+    # --- Sparse Eligibility Index ---
+    product_idx, channel_idx = build_eligible_pairs(products_df, channels_df, inventory_quantity, demand_dict, parameters,
+                                                    attributes, coverage_days)
+    eligible_pairs = list(zip(products[product_idx], channels[channel_idx]))
+
+    # --- Coverage caps: Daily_Demand * Coverage_Days ---
+    pair_abc = attributes['abc_code'][product_idx]
+    pair_coverage_days = np.where(pair_abc >= 0, coverage_days[channel_idx, np.maximum(pair_abc, 0)], np.nan)
+    pair_coverage_cap = np.full(len(eligible_pairs), np.nan)
+    for k in np.flatnonzero(pair_coverage_days >= 0):
+        weekly_demand_qty = demand_dict.get(eligible_pairs[k], 0)
+        pair_coverage_cap[k] = weekly_demand_qty / 7.0 * pair_coverage_days[k]
+
+    # --- Non-outlet capacity ---
+    channel_capacity = pd.to_numeric(channels_df['capacity'], errors='coerce').to_numpy(dtype=float)
+    channel_capacity[(channel_types == 'outlet') | (channel_capacity < 0)] = np.nan
+
+    # --- Outlet SKU-count rows ---
+    is_outlet_pair = channel_types[channel_idx] == 'outlet'
+    outlet_capacity_rows = []
+    capacity_groups = group_pairs(channel_idx, attributes['capacity_group_id'][product_idx], is_outlet_pair)
+    for (j, g), max_skus in zip(capacity_groups, _gather(rule_index['outlet_capacity'], capacity_groups)):
+        if max_skus >= 0: # Apply if rule exists
+            c = channels[j]
+            division, axe = attributes['capacity_group_keys'][g]
+            outlet_capacity_rows.append((f"Outlet_Capacity_SKU_{c}_{division}_{axe}", capacity_groups[j, g], int(max_skus)))
+
+    outlet_assortment_rows = []
+    assortment_groups = group_pairs(channel_idx, attributes['assortment_group_id'][product_idx], is_outlet_pair)
+    for (j, g), max_skus in zip(assortment_groups, _gather(rule_index['outlet_assortment'], assortment_groups)):
+        if max_skus >= 0: # Apply if rule exists
+            c = channels[j]
+            metier, subaxis, brand = attributes['assortment_group_keys'][g]
+            outlet_assortment_rows.append((f"Outlet_Assortment_{c}_{metier}_{subaxis}_{brand}", assortment_groups[j, g], int(max_skus)))
+
+    return scope_binaries(tighten_bounds({
+        'products': products,
+        'channels': channels,
+        'inventory_quantity': inventory_quantity,
+        'supply': supply,
+        'product_idx': product_idx,
+        'channel_idx': channel_idx,
+        'eligible_pairs': eligible_pairs,
+        'pair_coverage_cap': pair_coverage_cap,
+        'channel_capacity': channel_capacity,
+        'outlet_capacity_rows': outlet_capacity_rows,
+        'outlet_assortment_rows': outlet_assortment_rows,
+    }))
+
+
+def _gather(table: np.ndarray, groups: dict) -> np.ndarray:
+    """
+    Rule values of (channel position, group id) keys, by one fancy-index gather.
+
+    table is indexed by (channel, group), or by group only for rules that apply to every outlet.
+    NaN where no rule applies (NaN >= 0 is False).
+    """
+    if not groups:
+        return np.empty(0)
+    keys = np.array(list(groups), dtype=np.int64)
+    return table[keys[:, 0], keys[:, 1]] if table.ndim == 2 else table[keys[:, 1]]
+
+
+def tighten_bounds(data: dict) -> dict:
+    """
+    Bound-tightening pass over prepared allocation data.
+
+    - Each pair gets the integer upper bound min(inventory, coverage cap, channel capacity);
+      coverage rules are single-variable rows and become this bound instead of a row.
+    - Pairs whose bound rounds to zero are fixed to zero, i.e. removed from the pair set.
+    - Rows that cannot bind once the bounds are known are dropped: supply rows whose pairs'
+      bounds sum to at most the inventory, capacity rows likewise, and SKU-count rows with at
+      most max_skus pairs.
+
+    The bound is also the per-pair big-M of the x/y linking rows, which gives a much tighter
+    LP relaxation than the product's total inventory.
+
+    Args:
+        data: Dictionary built by prepare_allocation_data (modified in place).
+
+    Returns:
+        The same dictionary, filtered, with:
+            'pair_upper_bound': float array, integer upper bound of x per pair.
+            'supply_limit': float array per product, inventory where the supply row can bind, NaN otherwise.
+            'channel_capacity': rounded down, NaN where the capacity row cannot bind.
+    """
+    product_idx = data['product_idx']
+    channel_idx = data['channel_idx']
+
+    upper_bound = data['supply'][product_idx].copy()
+    pair_coverage_cap = data['pair_coverage_cap']
+    covered = pair_coverage_cap >= 0 # NaN = no rule
+    upper_bound[covered] = np.minimum(upper_bound[covered], pair_coverage_cap[covered])
+    pair_capacity = data['channel_capacity'][channel_idx]
+    capped = ~np.isnan(pair_capacity)
+    upper_bound[capped] = np.minimum(upper_bound[capped], pair_capacity[capped])
+    upper_bound = np.floor(upper_bound + 1e-9) # x is integer
+
+    # --- Fix zero-bound pairs by dropping them ---
+    keep = upper_bound >= 1
+    if not keep.all():
+        new_position = np.cumsum(keep) - 1
+        for key in ('product_idx', 'channel_idx', 'pair_coverage_cap'):
+            data[key] = data[key][keep]
+        data['eligible_pairs'] = [pair for pair, kept in zip(data['eligible_pairs'], keep) if kept]
+        for key in ('outlet_capacity_rows', 'outlet_assortment_rows'):
+            data[key] = [(name, new_position[positions[keep[positions]]], max_skus)
+                         for name, positions, max_skus in data[key]]
+        upper_bound = upper_bound[keep]
+        product_idx = data['product_idx']
+        channel_idx = data['channel_idx']
+
+    # --- Drop rows that can never bind ---
+    for key in ('outlet_capacity_rows', 'outlet_assortment_rows'):
+        data[key] = [row for row in data[key] if len(row[1]) > row[2]]
+
+    # Right-hand sides of rows over integer x are rounded down, so all row data is integral
+    bound_per_product = np.bincount(product_idx, weights=upper_bound, minlength=len(data['products']))
+    data['supply_limit'] = np.where(bound_per_product > data['supply'], np.floor(data['supply'] + 1e-9), np.nan)
+
+    bound_per_channel = np.bincount(channel_idx, weights=upper_bound, minlength=len(data['channels']))
+    channel_capacity = np.floor(data['channel_capacity'] + 1e-9)
+    channel_capacity[bound_per_channel <= channel_capacity] = np.nan
+    data['channel_capacity'] = channel_capacity
+
+    data['pair_upper_bound'] = upper_bound
+    return data
+
+
+def scope_binaries(data: dict) -> dict:
+    """
+    Selects the pairs that need an allocation binary y[p, c].
+
+    y only appears in the outlet SKU-count rows (Outlet_Capacity_SKU / Outlet_Assortment), so
+    pairs outside every such row need neither y nor a linking row. Without any binary, the
+    remaining rows (supply, channel capacity) form a transportation matrix with integral
+    bounds and right-hand sides, and the model is solved as a pure LP with integral optimum.
+
+    Args:
+        data: Dictionary built by prepare_allocation_data (modified in place).
+
+    Returns:
+        The same dictionary, with 'binary_pairs': sorted int array of the pair positions that get a y.
+    """
+    rule_positions = [positions for _, positions, _ in data['outlet_capacity_rows'] + data['outlet_assortment_rows']]
+    data['binary_pairs'] = np.unique(np.concatenate(rule_positions)) if rule_positions else np.empty(0, dtype=np.int64)
+    return data
+
+
+def extract_allocations(data: dict, pair_values) -> list:
+    """
+    Turns solution values aligned with data['eligible_pairs'] into allocation result dictionaries.
+
+    Args:
+        data: Output of prepare_allocation_data.
+        pair_values: Sequence of allocated quantities per eligible pair (None = no value).
+
+    Returns:
+        List of {'product_sku', 'channel_id', 'quantity'} dictionaries for non-zero allocations.
+    """
+    allocation_results = []
+    for (p, c), allocated_qty in zip(data['eligible_pairs'], pair_values):
+        if allocated_qty is not None and allocated_qty > 0.1: # Use tolerance for float comparison
+            allocation_results.append({
+                'product_sku': p,
+                'channel_id': c,
+                'quantity': int(round(allocated_qty)) # Round and convert to int
+            })
+    return allocation_results
@@ -0,0 +1,140 @@
+import csv
+import hashlib
+import io
+import time
+from datetime import datetime
+from sqlalchemy import func
+from backend.models import db, Allocation, AllocationRun, Channel, Product
+
+# Allocation columns written by the bulk paths, in COPY order
+ALLOCATION_COLUMNS = ('run_id', 'product_id', 'channel_id', 'quantity', 'allocation_date', 'status')
+LOOKUP_CHUNK_SIZE = 900 # Keys per IN (...) lookup, under the SQLite bound-parameter limit
+
+
+def parameters_hash(parameters) -> str:
+    """SHA-256 of the OptimizationParameters JSON, stored on the run header to group runs by settings."""
+    return hashlib.sha256(parameters.model_dump_json().encode()).hexdigest()
+
+
+def load_previous_allocation() -> dict:
+    """
+    Loads the latest allocation run from the Allocation table.
+
+    The latest run is the newest AllocationRun header; rows stored before run headers existed
+    are read as one run per allocation_date. Cancelled rows are ignored. Allocation.product_id is
+    mapped back to the product SKU (Product.item_id); older rows that stored the SKU itself in
+    product_id match no product and are read as they are.
+
+    Returns:
+        Dictionary {(product_sku, channel_id): quantity}, empty when no run has been stored.
+    """
+    query = (db.session.query(Product.item_id, Allocation.product_id, Allocation.channel_id, Allocation.quantity)
+             .outerjoin(Product, Allocation.product_id == Product.id))
+    latest_run_id = db.session.query(func.max(AllocationRun.id)).scalar()
+    if latest_run_id is not None:
+        query = query.filter(Allocation.run_id == latest_run_id)
+    else:
+        latest_date = db.session.query(func.max(Allocation.allocation_date)).scalar()
+        if latest_date is None:
+            return {}
+        query = query.filter(Allocation.allocation_date == latest_date)
+
+    previous_allocation = {}
+    for item_id, product_id, channel_id, quantity in query.filter(Allocation.status != 'cancelled'):
+        key = (str(item_id if item_id is not None else product_id), str(channel_id))
+        previous_allocation[key] = previous_allocation.get(key, 0) + (quantity or 0)
+    return previous_allocation
+
+
+def _database_ids(key_column, id_column, keys) -> dict:
+    """{key: id} for the keys found in key_column, looked up LOOKUP_CHUNK_SIZE keys at a time."""
+    keys = list(keys)
+    ids = {}
+    for start in range(0, len(keys), LOOKUP_CHUNK_SIZE):
+        chunk = keys[start:start + LOOKUP_CHUNK_SIZE]
+        ids.update(db.session.query(key_column, id_column).filter(key_column.in_(chunk)))
+    return ids
+
+
+def _copy_allocations(rows: list):
+    """PostgreSQL: streams the rows through COPY ... FROM STDIN on the session's connection (same transaction)."""
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    for row in rows:
+        writer.writerow([row[column] for column in ALLOCATION_COLUMNS])
+    buffer.seek(0)
+    cursor = db.session.connection().connection.cursor()
+    try:
+        cursor.copy_expert(f"COPY {Allocation.__tablename__} ({', '.join(ALLOCATION_COLUMNS)}) FROM STDIN WITH (FORMAT csv)", buffer)
+    finally:
+        cursor.close()
+
+
+def save_allocation_run(allocations: list, solver_stats: dict = None, parameters=None) -> AllocationRun:
+    """
+    Stores one allocation run (an AllocationRun header and its Allocation rows) and commits.
+
+    The rows bypass the ORM unit of work: COPY on PostgreSQL (psycopg2), one executemany
+    INSERT on other databases. Allocation.product_id and channel_id are the database IDs: the
+    SKUs are mapped to Product.id and the channel IDs to Channel.id. Allocations of products or
+    channels that are not in the database (tables sent with the request only) are not stored;
+    row_count is the number of stored rows.
+
+    Args:
+        allocations: List of {'product_sku', 'channel_id', 'quantity'} dictionaries (optimize_allocation output).
+        solver_stats: Optional model.solver_stats of the solve, copied onto the header.
+        parameters: Optional OptimizationParameters of the solve (stored as parameters_hash).
+
+    Returns:
+        The stored AllocationRun.
+    """
+    start = time.perf_counter()
+    solver_stats = solver_stats or {}
+    product_ids = _database_ids(Product.item_id, Product.id, {str(alloc['product_sku']) for alloc in allocations})
+    channel_keys = {int(c) for c in {str(alloc['channel_id']) for alloc in allocations} if c.isdigit()}
+    channel_ids = {str(key): key for key in _database_ids(Channel.id, Channel.id, channel_keys)}
+    allocations = [alloc for alloc in allocations
+                   if str(alloc['product_sku']) in product_ids and str(alloc['channel_id']) in channel_ids]
+    run = AllocationRun(
+        parameters_hash=parameters_hash(parameters) if parameters is not None else None,
+        engine=solver_stats.get('engine'),
+        status=solver_stats.get('status'),
+        solution_status=solver_stats.get('solution_status'),
+        objective=solver_stats.get('objective'),
+        best_bound=solver_stats.get('best_bound'),
+        gap=solver_stats.get('gap'),
+        solve_seconds=solver_stats.get('wall_time_seconds'),
+        row_count=len(allocations)
+    )
+    db.session.add(run)
+    db.session.flush() # Assigns run.id
+
+    run_date = datetime.now() # One timestamp per run, as for the rows stored before run headers
+    rows = [{
+        'run_id': run.id,
+        'product_id': product_ids[str(alloc['product_sku'])],
+        'channel_id': channel_ids[str(alloc['channel_id'])],
+        'quantity': alloc['quantity'],
+        'allocation_date': run_date,
+        'status': 'pending'
+    } for alloc in allocations]
+    if rows:
+        if db.session.get_bind().dialect.name == 'postgresql':
+            _copy_allocations(rows)
+        else:
+            db.session.execute(Allocation.__table__.insert(), rows) # Core executemany, no ORM objects
+
+    run.persist_seconds = time.perf_counter() - start
+    db.session.commit()
+    return run
+
+
+def delete_allocation_run(run_id: int) -> bool:
+    """Deletes a run and its rows with two set-based DELETEs and commits. Returns False if the run does not exist."""
+    run = db.session.get(AllocationRun, run_id)
+    if run is None:
+        return False
+    Allocation.query.filter_by(run_id=run_id).delete(synchronize_session=False)
+    db.session.delete(run)
+    db.session.commit()
+    return True
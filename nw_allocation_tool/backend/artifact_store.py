@@ -0,0 +1,158 @@
+import gzip
+import os
+import random
+import re
+import shutil
+import threading
+import time
+import traceback
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from config import Config
+
+ARTIFACT_FORMATS = ('lp', 'mps')
+ARTIFACT_ID = re.compile(r'^[0-9a-f]{32}$')
+
+
+def artifact_path(directory: str, artifact_id: str, artifact_format: str):
+    """Path of a stored artifact, None for a malformed id or format (never outside directory)."""
+    if not ARTIFACT_ID.match(artifact_id or '') or artifact_format not in ARTIFACT_FORMATS:
+        return None
+    return os.path.join(directory, f"{artifact_id}.{artifact_format}.gz")
+
+
+class ArtifactStore:
+    """
+    Gzip-compressed LP/MPS exports of solved PuLP models, written off the request path.
+
+    submit() only hands the model to one background writer thread and returns the artifact
+    id at once; the writer exports the model, compresses it to <id>.<format>.gz and then
+    applies the retention policy (oldest artifacts first). Writes go through temporary files
+    and an atomic rename, so concurrent runs never clobber each other or expose a partial
+    file. The writer thread is joined at interpreter exit, so queued artifacts are still
+    written when a job process ends right after its solve.
+
+    Args:
+        directory: Folder of the artifacts.
+        sample_rate: Share of the runs exported without being asked (0.0 = only on request).
+        max_count: Maximum number of artifacts kept.
+        max_bytes: Maximum total compressed size kept.
+        max_age_seconds: Artifacts older than this are deleted.
+    """
+
+    def __init__(self, directory: str, sample_rate: float = 0.0, max_count: int = 50,
+                 max_bytes: int = 1024 * 1024 * 1024, max_age_seconds: float = 7 * 24 * 3600):
+        self.directory = directory
+        self.sample_rate = sample_rate
+        self.max_count = max_count
+        self.max_bytes = max_bytes
+        self.max_age_seconds = max_age_seconds
+        self.counters = {'submitted': 0, 'written': 0, 'failed': 0, 'deleted': 0}
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix='model-artifacts')
+        self._pending = []
+        self._lock = threading.Lock()
+
+    def export_format(self, requested: str = None):
+        """Format to export a run in: the requested one, 'lp' for a sampled run, else None."""
+        if requested:
+            return requested
+        if self.sample_rate and random.random() < self.sample_rate:
+            return 'lp'
+        return None
+
+    def submit(self, model, artifact_format: str = 'lp') -> dict:
+        """
+        Queues the export of a PuLP model; returns {'id', 'format', 'path'} without waiting.
+
+        The model must not be modified afterwards (it is read by the writer thread).
+        """
+        if artifact_format not in ARTIFACT_FORMATS:
+            raise ValueError(f"Unknown artifact format '{artifact_format}', expected one of {ARTIFACT_FORMATS}.")
+        artifact_id = uuid.uuid4().hex
+        path = artifact_path(self.directory, artifact_id, artifact_format)
+        with self._lock:
+            self.counters['submitted'] += 1
+            self._pending = [future for future in self._pending if not future.done()]
+            self._pending.append(self._executor.submit(self._write, model, artifact_format, path))
+        return {'id': artifact_id, 'format': artifact_format, 'path': path}
+
+    def flush(self, timeout: float = None):
+        """Waits until the queued artifacts are written."""
+        with self._lock:
+            pending = list(self._pending)
+        for future in pending:
+            future.result(timeout=timeout)
+
+    def _write(self, model, artifact_format: str, path: str):
+        os.makedirs(self.directory, exist_ok=True)
+        plain_path = f"{path}.{os.getpid()}.plain.tmp"
+        compressed_path = f"{path}.{os.getpid()}.tmp"
+        try:
+            if artifact_format == 'mps':
+                model.writeMPS(plain_path)
+            else:
+                model.writeLP(plain_path)
+            with open(plain_path, 'rb') as source, gzip.open(compressed_path, 'wb', compresslevel=6) as target:
+                shutil.copyfileobj(source, target, 1 << 20)
+            os.replace(compressed_path, path)
+            self.counters['written'] += 1
+        except Exception:
+            self.counters['failed'] += 1
+            traceback.print_exc() # Debug output must never fail a run
+        finally:
+            for temporary_path in (plain_path, compressed_path):
+                if os.path.exists(temporary_path):
+                    os.remove(temporary_path)
+        self.apply_retention()
+
+    def artifacts(self) -> list:
+        """Stored artifacts as (mtime, size, path), oldest first."""
+        entries = []
+        try:
+            names = os.listdir(self.directory)
+        except FileNotFoundError:
+            return []
+        for name in names:
+            if not name.endswith('.gz'):
+                continue
+            path = os.path.join(self.directory, name)
+            try:
+                stat = os.stat(path)
+            except FileNotFoundError:
+                continue
+            entries.append((stat.st_mtime, stat.st_size, path))
+        return sorted(entries)
+
+    def apply_retention(self):
+        """Deletes artifacts older than max_age_seconds, then the oldest beyond max_count / max_bytes."""
+        entries = self.artifacts()
+        now = time.time()
+        total_bytes = sum(size for _, size, _ in entries)
+        count = len(entries)
+        for mtime, size, path in entries:
+            if now - mtime <= self.max_age_seconds and count <= self.max_count and total_bytes <= self.max_bytes:
+                break
+            try:
+                os.remove(path)
+                self.counters['deleted'] += 1
+            except FileNotFoundError:
+                pass
+            count -= 1
+            total_bytes -= size
+
+
+_default_store = None
+_default_lock = threading.Lock()
+
+
+def model_artifacts() -> ArtifactStore:
+    """The process-wide ArtifactStore configured by Config (MODEL_ARTIFACT_*)."""
+    global _default_store
+    with _default_lock:
+        if _default_store is None:
+            _default_store = ArtifactStore(Config.MODEL_ARTIFACT_DIR,
+                                           sample_rate=Config.MODEL_ARTIFACT_SAMPLE_RATE,
+                                           max_count=Config.MODEL_ARTIFACT_MAX_COUNT,
+                                           max_bytes=Config.MODEL_ARTIFACT_MAX_BYTES,
+                                           max_age_seconds=Config.MODEL_ARTIFACT_MAX_AGE_DAYS * 24 * 3600)
+        return _default_store
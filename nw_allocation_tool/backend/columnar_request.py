@@ -0,0 +1,223 @@
+"""
+Columnar allocation requests: one array per field (JSON) or one Parquet/CSV file per table.
+
+Validated with vectorized checks on whole columns (types, bounds, allowed values, duplicate
+keys, SKU/channel references through index joins) and turned straight into the solver's
+DataFrame inputs, without one Pydantic object per row. Same rules as the row schemas
+ProductInput, ChannelInput, InventoryInput and DemandInput.
+"""
+import os
+import numpy as np
+import pandas as pd
+
+# table -> {column: (kind, required)}; kinds: 'str', 'bool', ('int', minimum), ('choice', values).
+# Text columns are validated and kept as categoricals (one string object per distinct value).
+TABLE_COLUMNS = {
+    'products': {
+        'sku': ('str', True),
+        'donation_eligible': ('bool', True),
+        'name': ('str', False),
+        'category': ('str', False),
+        'brand': ('str', False),
+        'division': ('str', False),
+        'axe': ('str', False),
+        'subaxis': ('str', False),
+        'metier': ('str', False),
+        'abc_class': (('choice', ('A', 'B', 'C')), False),
+    },
+    'channels': {
+        'id': ('str', True),
+        'capacity': (('int', 0), True),
+        'channel_type': (('choice', ('store', 'outlet', 'donation', 'other')), True),
+    },
+    'inventory': {
+        'product_sku': ('str', True),
+        'quantity': (('int', 0), True),
+    },
+    'demand': {
+        'product_sku': ('str', True),
+        'channel_id': ('str', True),
+        'demand_quantity': (('int', 1), True),
+    },
+}
+TABLE_KEYS = {'products': ['sku'], 'channels': ['id'], 'demand': ['product_sku', 'channel_id']}
+BOOL_VALUES = {'true': True, 'false': False, '1': True, '0': False}
+MAX_REPORTED_ROWS = 5
+
+
+def _rows(mask: np.ndarray) -> str:
+    """'3 rows (e.g. 0, 4, 9)' for the True positions of mask."""
+    positions = np.flatnonzero(mask)
+    shown = ', '.join(str(position) for position in positions[:MAX_REPORTED_ROWS])
+    return f"{len(positions)} row{'s' if len(positions) > 1 else ''} (e.g. {shown})"
+
+
+def read_table(source, filename: str = None) -> pd.DataFrame:
+    """
+    Raw table of a columnar request.
+
+    Args:
+        source: {column: array} mapping, DataFrame, or a path / file object of a Parquet
+                (.parquet, .pq) or CSV (.csv) file.
+        filename: Name giving the file format when source is a file object (e.g. an upload).
+    """
+    if isinstance(source, pd.DataFrame):
+        return source
+    if isinstance(source, dict):
+        lengths = {column: len(values) for column, values in source.items()}
+        if len(set(lengths.values())) > 1:
+            raise ValueError(f"Columns must have the same length, got {lengths}.")
+        return pd.DataFrame(source)
+    extension = os.path.splitext(filename or str(source))[1].lower()
+    if extension in ('.parquet', '.pq'):
+        try:
+            return pd.read_parquet(source)
+        except ImportError as e:
+            raise ValueError(f"Parquet tables need pyarrow (or fastparquet): {e}") from e
+    if extension == '.csv':
+        # Everything as text first (no float SKUs, no NaN for empty required strings)
+        return pd.read_csv(source, dtype=str, keep_default_na=False, na_values=[''])
+    raise ValueError(f"Unsupported table file '{filename or source}', expected .parquet, .pq or .csv.")
+
+
+def _check_text(label: str, series: pd.Series, allowed, required: bool, errors: list) -> pd.Series:
+    """Text column, factorized once: the checks look at the distinct values only, rows via the codes."""
+    if not isinstance(series.dtype, pd.CategoricalDtype):
+        if not (series.dtype == object or isinstance(series.dtype, pd.StringDtype)):
+            errors.append(f"{label}: expected text, got {series.dtype}")
+            return series
+        series = series.astype('category')
+    codes = series.cat.codes.to_numpy()
+    categories = series.cat.categories
+    missing = codes < 0
+    if required and missing.any():
+        errors.append(f"{label}: missing value in {_rows(missing)}")
+    checks = [('non-text value', ~np.fromiter((isinstance(value, str) for value in categories), dtype=bool, count=len(categories)))]
+    if required:
+        checks.append(('empty text', np.asarray(categories == '', dtype=bool)))
+    if allowed is not None:
+        checks.append((f"value not in {list(allowed)}", ~categories.isin(allowed)))
+    for problem, bad_category in checks:
+        if bad_category.any():
+            errors.append(f"{label}: {problem} in {_rows(bad_category[codes] & ~missing)}")
+    return series
+
+
+def _check_column(label: str, series: pd.Series, kind, required: bool, errors: list) -> pd.Series:
+    """Validates and normalizes one column; appends messages to errors."""
+    if kind == 'str':
+        return _check_text(label, series, None, required, errors)
+    if kind[0] == 'choice':
+        return _check_text(label, series, kind[1], required, errors)
+
+    missing = series.isna().to_numpy()
+    if required and missing.any():
+        errors.append(f"{label}: missing value in {_rows(missing)}")
+    present = ~missing
+    if kind == 'bool':
+        if pd.api.types.is_bool_dtype(series.dtype):
+            return series
+        flags = series.astype(str).str.strip().str.lower().map(BOOL_VALUES)
+        invalid = present & flags.isna().to_numpy()
+        if invalid.any():
+            errors.append(f"{label}: not a boolean in {_rows(invalid)}")
+        return flags.fillna(False).astype(bool)
+
+    minimum = kind[1]
+    numbers = pd.to_numeric(series, errors='coerce')
+    values = numbers.to_numpy(dtype=float, na_value=np.nan)
+    invalid = present & (np.isnan(values) | (values != np.floor(values)))
+    if invalid.any():
+        errors.append(f"{label}: not an integer in {_rows(invalid)}")
+    below = present & ~invalid & (values < minimum)
+    if below.any():
+        errors.append(f"{label}: below {minimum} in {_rows(below)}")
+    if invalid.any() or missing.any():
+        return numbers
+    return pd.Series(values.astype(np.int64), index=series.index, name=series.name)
+
+
+def validate_table(table: str, frame: pd.DataFrame, errors: list) -> pd.DataFrame:
+    """Checks the columns of one table (TABLE_COLUMNS) and its duplicate keys; unknown columns are dropped."""
+    columns = TABLE_COLUMNS[table]
+    first_error = len(errors)
+    absent = [column for column, (_, required) in columns.items() if required and column not in frame.columns]
+    if absent:
+        errors.append(f"{table}: missing column(s) {absent}")
+        return frame
+    checked = {}
+    for column, (kind, required) in columns.items():
+        if column in frame.columns:
+            checked[column] = _check_column(f"{table}.{column}", frame[column].reset_index(drop=True), kind, required, errors)
+    frame = pd.DataFrame(checked)
+    keys = TABLE_KEYS.get(table)
+    if keys and len(errors) == first_error:
+        duplicated = frame.duplicated(keys).to_numpy()
+        if duplicated.any():
+            errors.append(f"{table}: duplicate {'/'.join(keys)} in {_rows(duplicated)}")
+    return frame
+
+
+def _check_references(label: str, values: pd.Series, index: pd.Index, errors: list):
+    """Every value of a categorical column must be in index (a hash join of the distinct values)."""
+    unknown_category = ~values.cat.categories.isin(index)
+    if unknown_category.any():
+        unknown = unknown_category[values.cat.codes.to_numpy()]
+        examples = sorted(values.cat.categories[unknown_category])[:MAX_REPORTED_ROWS]
+        errors.append(f"{label}: unknown reference in {_rows(unknown)}: {examples}")
+
+
+def columnar_inputs(tables: dict, products_df: pd.DataFrame = None, channels_df: pd.DataFrame = None,
+                    inventory_df: pd.DataFrame = None) -> dict:
+    """
+    Validates the tables of a columnar request and builds the optimize_allocation inputs.
+
+    Tables the request leaves out come from the given frames (e.g. loaded from the database);
+    inventory and demand references are checked against the final products and channels.
+
+    Args:
+        tables: {table: source} for any of 'products', 'channels', 'inventory', 'demand'
+                (see read_table for the sources).
+        products_df, channels_df, inventory_df: Solver frames used for the missing tables.
+
+    Returns:
+        Dictionary with 'products_df' (indexed by SKU), 'channels_df' (indexed by channel ID),
+        'inventory_df' and 'demand_dict' {(product_sku, channel_id): weekly quantity}.
+
+    Raises:
+        ValueError: Listing every invalid column, duplicate key and unknown reference.
+    """
+    unknown_tables = sorted(set(tables) - set(TABLE_COLUMNS))
+    if unknown_tables:
+        raise ValueError(f"Unknown columnar table(s) {unknown_tables}, expected {list(TABLE_COLUMNS)}.")
+    errors = []
+    frames = {table: validate_table(table, read_table(source), errors) for table, source in tables.items()}
+    if errors:
+        raise ValueError("Invalid columnar request: " + '; '.join(errors))
+
+    if 'products' in frames:
+        products_df = frames['products'].set_index(frames['products']['sku'].astype(str)).drop(columns='sku')
+    if 'channels' in frames:
+        channels_df = frames['channels'].set_index(frames['channels']['id'].astype(str)).drop(columns='id')
+    if 'inventory' in frames:
+        inventory_df = frames['inventory']
+    if products_df is None or channels_df is None or inventory_df is None:
+        raise ValueError("Products, channels and inventory must be sent or loaded from the database.")
+
+    if 'inventory' in frames:
+        _check_references('inventory.product_sku', inventory_df['product_sku'], products_df.index, errors)
+    demand = frames.get('demand')
+    if demand is not None:
+        _check_references('demand.product_sku', demand['product_sku'], products_df.index, errors)
+        _check_references('demand.channel_id', demand['channel_id'], channels_df.index, errors)
+    if errors:
+        raise ValueError("Invalid columnar request: " + '; '.join(errors))
+
+    if 'inventory' in frames:
+        inventory_df = inventory_df.assign(product_sku=inventory_df['product_sku'].astype(str)) # As load_inventory
+    demand_dict = {}
+    if demand is not None:
+        demand_dict = dict(zip(zip(demand['product_sku'].tolist(), demand['channel_id'].tolist()),
+                               demand['demand_quantity'].tolist()))
+    return {'products_df': products_df, 'channels_df': channels_df, 'inventory_df': inventory_df,
+            'demand_dict': demand_dict}
@@ -8,3 +8,19 @@ class Config:
     JWT_SECRET_KEY = os.environ.get('JWT_SECRET_KEY') or 'jwt-secret-key'
     JWT_ACCESS_TOKEN_EXPIRES = timedelta(hours=1)
     
+    JOB_WORKERS = int(os.environ.get('JOB_WORKERS') or 2)  # Solver processes for asynchronous allocation jobs
+    JOB_POLL_SECONDS = float(os.environ.get('JOB_POLL_SECONDS') or 0.5)
+    SCENARIO_WORKERS = int(os.environ.get('SCENARIO_WORKERS') or 2)  # Solver processes per what-if comparison request (1 = in-process)
+    START_JOB_RUNNER = (os.environ.get('START_JOB_RUNNER') or '0') == '1'  # Also run the job runner inside `python main.py` (else: python -m backend.jobs)
+    SOLVE_CACHE_ENTRIES = int(os.environ.get('SOLVE_CACHE_ENTRIES') or 64)  # In-memory LRU tier of the solve cache
+    SOLVE_CACHE_DIR = os.environ.get('SOLVE_CACHE_DIR', 'data/instance/solve_cache')  # On-disk tier ('' disables it)
+    SOLVE_CACHE_MAX_BYTES = int(os.environ.get('SOLVE_CACHE_MAX_BYTES') or 512 * 1024 * 1024)
+    DASHBOARD_CACHE_SECONDS = float(os.environ.get('DASHBOARD_CACHE_SECONDS') or 30)  # TTL of the cached dashboard metrics
+    INVENTORY_SUMMARY = (os.environ.get('INVENTORY_SUMMARY') or '0') == '1'  # Serve the dashboard from the InventorySummary table
+    EXCEL_PARAMETERS_DIR = os.environ.get('EXCEL_PARAMETERS_DIR', '')  # Rule workbooks (opt-in, e.g. data/ExcelParameters)
+    EXCEL_CACHE_DIR = os.environ.get('EXCEL_CACHE_DIR', 'data/instance/excel_cache')  # Parsed-rule sidecars ('' = memory only)
+    MODEL_ARTIFACT_DIR = os.environ.get('MODEL_ARTIFACT_DIR') or 'data/instance/model_artifacts'  # Gzip LP/MPS exports of CBC runs
+    MODEL_ARTIFACT_SAMPLE_RATE = float(os.environ.get('MODEL_ARTIFACT_SAMPLE_RATE') or 0.0)  # Share of runs exported without solver.export_model
+    MODEL_ARTIFACT_MAX_COUNT = int(os.environ.get('MODEL_ARTIFACT_MAX_COUNT') or 50)
+    MODEL_ARTIFACT_MAX_BYTES = int(os.environ.get('MODEL_ARTIFACT_MAX_BYTES') or 1024 * 1024 * 1024)
+    MODEL_ARTIFACT_MAX_AGE_DAYS = float(os.environ.get('MODEL_ARTIFACT_MAX_AGE_DAYS') or 7)
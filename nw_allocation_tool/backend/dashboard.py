@@ -0,0 +1,133 @@
+import threading
+import time
+from datetime import datetime, timedelta, date
+from sqlalchemy import case, event, func, select
+from backend.models import db, Inventory, InventorySummary
+
+EXPIRY_HORIZON_DAYS = 90
+METRIC_STATUSES = {'excess_stock': 'excess', 'obsolete_items': 'obsolete', 'returns': 'returned'}
+
+
+def inventory_metrics(now: datetime = None) -> dict:
+    """
+    Dashboard counts over the Inventory table in one aggregated query (conditional sums).
+
+    Returns:
+        Dictionary with 'excess_stock', 'obsolete_items', 'returns' and 'expiring_soon' (expiry within 90 days).
+    """
+    cutoff = (now or datetime.now()) + timedelta(days=EXPIRY_HORIZON_DAYS)
+    columns = [func.coalesce(func.sum(case((Inventory.status == status, 1), else_=0)), 0).label(name)
+               for name, status in METRIC_STATUSES.items()]
+    columns.append(func.coalesce(func.sum(case((Inventory.expiry_date <= cutoff, 1), else_=0)), 0).label('expiring_soon'))
+    row = db.session.execute(select(*columns)).one()
+    return {name: int(value) for name, value in row._mapping.items()}
+
+
+def summary_metrics(now: datetime = None) -> dict:
+    """
+    Same counts as inventory_metrics, read from the InventorySummary table.
+
+    The table has one row per (status, expiry day), so the read does not grow with the inventory.
+    Expiry is compared by day: items expiring on the cutoff day count as expiring soon.
+    """
+    cutoff_day = ((now or datetime.now()) + timedelta(days=EXPIRY_HORIZON_DAYS)).date()
+    columns = [func.coalesce(func.sum(case((InventorySummary.status == status, InventorySummary.item_count), else_=0)), 0).label(name)
+               for name, status in METRIC_STATUSES.items()]
+    columns.append(func.coalesce(func.sum(case((InventorySummary.expiry_day <= cutoff_day, InventorySummary.item_count),
+                                               else_=0)), 0).label('expiring_soon'))
+    row = db.session.execute(select(*columns)).one()
+    return {name: int(value) for name, value in row._mapping.items()}
+
+
+# --- Summary maintenance ---
+
+def _expiry_day(value):
+    if value is None:
+        return None
+    return value.date() if isinstance(value, datetime) else value
+
+
+def _adjust_summary(connection, status, expiry_day, delta: int):
+    """Adds delta to the (status, expiry_day) count, creating the row if needed (runs in the flush transaction)."""
+    table = InventorySummary.__table__
+    day_filter = table.c.expiry_day.is_(None) if expiry_day is None else table.c.expiry_day == expiry_day
+    status_filter = table.c.status.is_(None) if status is None else table.c.status == status
+    updated = connection.execute(table.update().where(status_filter, day_filter)
+                                 .values(item_count=table.c.item_count + delta))
+    if updated.rowcount == 0:
+        connection.execute(table.insert().values(status=status, expiry_day=expiry_day, item_count=delta))
+
+
+def _stored_key(connection, target):
+    """(status, expiry day) of the row as stored, read before the UPDATE/DELETE (attribute history is lost after a commit)."""
+    table = Inventory.__table__
+    row = connection.execute(select(table.c.status, table.c.expiry_date).where(table.c.id == target.id)).one_or_none()
+    return None if row is None else (row.status, _expiry_day(row.expiry_date))
+
+
+def _after_insert(mapper, connection, target):
+    _adjust_summary(connection, target.status, _expiry_day(target.expiry_date), 1)
+
+
+def _before_update(mapper, connection, target):
+    old_key = _stored_key(connection, target)
+    new_key = (target.status, _expiry_day(target.expiry_date))
+    if old_key is not None and old_key != new_key:
+        _adjust_summary(connection, *old_key, -1)
+        _adjust_summary(connection, *new_key, 1)
+
+
+def _before_delete(mapper, connection, target):
+    old_key = _stored_key(connection, target)
+    if old_key is not None:
+        _adjust_summary(connection, *old_key, -1)
+
+
+def enable_inventory_summary():
+    """
+    Keeps InventorySummary up to date on ORM inserts, updates and deletes of Inventory rows.
+
+    Core bulk statements bypass the ORM events: call rebuild_inventory_summary after them.
+    """
+    for name, listener in (('after_insert', _after_insert), ('before_update', _before_update), ('before_delete', _before_delete)):
+        if not event.contains(Inventory, name, listener):
+            event.listen(Inventory, name, listener)
+
+
+def rebuild_inventory_summary():
+    """Recomputes InventorySummary from the Inventory table (initial backfill, after bulk loads) and commits."""
+    day = func.date(Inventory.expiry_date)
+    rows = db.session.execute(select(Inventory.status, day, func.count()).group_by(Inventory.status, day)).all()
+    db.session.execute(InventorySummary.__table__.delete())
+    if rows:
+        db.session.execute(InventorySummary.__table__.insert(), [
+            {'status': status, 'expiry_day': date.fromisoformat(str(expiry_day)[:10]) if expiry_day is not None else None,
+             'item_count': count}
+            for status, expiry_day, count in rows
+        ])
+    db.session.commit()
+
+
+class MetricsCache:
+    """Caches a computed value for ttl_seconds (per process)."""
+
+    def __init__(self, ttl_seconds: float = 30):
+        self.ttl_seconds = ttl_seconds
+        self._value = None
+        self._expires_at = 0.0
+        self._lock = threading.Lock()
+
+    def get(self, compute):
+        """Returns the cached value, or compute() once the TTL has expired."""
+        with self._lock:
+            if self._value is not None and time.monotonic() < self._expires_at:
+                return self._value
+        value = compute()
+        with self._lock:
+            self._value = value
+            self._expires_at = time.monotonic() + self.ttl_seconds
+        return value
+
+    def clear(self):
+        with self._lock:
+            self._value = None
@@ -0,0 +1,106 @@
+import pandas as pd
+from pandas.api.types import union_categoricals
+from sqlalchemy import select, func
+from backend.models import db, Product, Inventory, Channel
+
+LOAD_CHUNK_ROWS = 50000 # Rows fetched and converted per chunk
+
+
+def _read_frame(statement, categorical=(), chunksize: int = LOAD_CHUNK_ROWS) -> pd.DataFrame:
+    """
+    Runs a Core select and builds a DataFrame chunk by chunk.
+
+    The columns listed in categorical are converted to categoricals per chunk and the chunks'
+    categories are unioned, so only one chunk of Python strings is alive at a time.
+    """
+    result = db.session.execute(statement.execution_options(yield_per=chunksize))
+    columns = list(result.keys())
+    chunks = []
+    for rows in result.partitions():
+        chunk = pd.DataFrame.from_records(rows, columns=columns)
+        for column in categorical:
+            chunk[column] = chunk[column].astype('category')
+        chunks.append(chunk)
+    if not chunks:
+        return pd.DataFrame({column: pd.Series(dtype='category' if column in categorical else object) for column in columns})
+
+    frame = pd.concat([chunk.drop(columns=list(categorical)) for chunk in chunks], ignore_index=True)
+    for column in categorical:
+        frame[column] = union_categoricals([chunk[column] for chunk in chunks])
+    return frame[columns]
+
+
+def _inventory_filters(country: str = None, statuses=None) -> list:
+    filters = []
+    if country is not None:
+        filters.append(Inventory.country == country)
+    if statuses:
+        filters.append(Inventory.status.in_(list(statuses)))
+    return filters
+
+
+def load_products(stocked_only: bool = False, country: str = None, statuses=None) -> pd.DataFrame:
+    """
+    Products as solver input: DataFrame indexed by SKU with the attribute columns of the model.
+
+    Args:
+        stocked_only: Keep only products with an inventory row in scope (filtered in SQL).
+        country, statuses: Inventory scope used by stocked_only (see load_inventory).
+    """
+    statement = select(Product.item_id.label('sku'), Product.brand, Product.division,
+                       Product.axe, Product.subaxis).where(Product.item_id.isnot(None))
+    if stocked_only:
+        statement = statement.where(Product.id.in_(
+            select(Inventory.product_id).where(*_inventory_filters(country, statuses))))
+    frame = _read_frame(statement, categorical=('brand', 'division', 'axe', 'subaxis'))
+    return frame.set_index(frame['sku'].astype(str)).drop(columns='sku')
+
+
+def load_channels(country: str = None, channel_types=None) -> pd.DataFrame:
+    """Channels as solver input: DataFrame indexed by channel ID (str) with 'capacity' and 'channel_type'."""
+    statement = select(Channel.id, Channel.capacity, Channel.channel_type)
+    if country is not None:
+        statement = statement.where(Channel.country == country)
+    if channel_types:
+        statement = statement.where(Channel.channel_type.in_(list(channel_types)))
+    frame = _read_frame(statement, categorical=('channel_type',))
+    return frame.set_index(frame['id'].astype(str)).drop(columns='id')
+
+
+def load_inventory(country: str = None, statuses=None) -> pd.DataFrame:
+    """
+    Inventory as solver input: one row per SKU with the total quantity, summed in the database.
+
+    Args:
+        country: Only inventory rows of this country.
+        statuses: Only inventory rows with one of these statuses (e.g. ['excess', 'obsolete']).
+
+    Returns:
+        DataFrame with columns 'product_sku' and 'quantity'.
+    """
+    statement = (select(Product.item_id.label('product_sku'), func.sum(Inventory.quantity).label('quantity'))
+                 .join(Product, Inventory.product_id == Product.id)
+                 .where(Product.item_id.isnot(None), *_inventory_filters(country, statuses))
+                 .group_by(Product.item_id))
+    frame = _read_frame(statement)
+    frame['product_sku'] = frame['product_sku'].astype(str)
+    frame['quantity'] = pd.to_numeric(frame['quantity']).fillna(0)
+    return frame
+
+
+def load_allocation_frames(country: str = None, statuses=None, channel_types=None, stocked_only: bool = False):
+    """
+    Loads the products, channels and inventory DataFrames of optimize_allocation for one scope.
+
+    Args:
+        country: Restricts channels and inventory to one country.
+        statuses: Inventory statuses in scope.
+        channel_types: Channel types in scope.
+        stocked_only: Drop products without inventory in scope.
+
+    Returns:
+        Tuple: (products_df, channels_df, inventory_df)
+    """
+    return (load_products(stocked_only, country, statuses),
+            load_channels(country, channel_types),
+            load_inventory(country, statuses))
@@ -0,0 +1,134 @@
+import heapq
+import numpy as np
+import scipy.sparse as sp
+from dataclasses import dataclass
+from scipy.sparse.csgraph import connected_components
+from allocation_data import scope_binaries
+
+
+@dataclass
+class DecomposedModel:
+    """Stand-in model returned when independent components were solved separately."""
+    name: str
+    num_components: int
+    batch_sizes: list # Number of eligible pairs solved by each worker task
+    solver_stats: dict = None
+    run_report: dict = None # Set by optimize_allocation, see run_report.RunReport
+
+
+def find_components(data: dict):
+    """
+    Connected components of the constraint graph over the eligible pairs.
+
+    Two pairs are connected when they share a row: the supply row of their product, the capacity
+    row of their (non-outlet, capacitated) channel, or an outlet SKU-count / assortment row.
+    Rows dropped by tighten_bounds as non-binding couple nothing; linking rows only touch a single pair.
+
+    Args:
+        data: Output of allocation_data.prepare_allocation_data.
+
+    Returns:
+        Tuple: (num_components, pair_component)
+               pair_component: int array, component id of each eligible pair (0 .. num_components - 1).
+    """
+    n = len(data['eligible_pairs'])
+    if n == 0:
+        return 0, np.empty(0, dtype=np.int64)
+
+    n_products = len(data['products'])
+    n_channels = len(data['channels'])
+    rule_rows = data['outlet_capacity_rows'] + data['outlet_assortment_rows']
+
+    # Row nodes: [products | channels | rule rows], placed after the n pair nodes
+    limited = np.flatnonzero(~np.isnan(data['supply_limit'][data['product_idx']]))
+    sources = [limited]
+    targets = [n + data['product_idx'][limited]]
+
+    capped = np.flatnonzero(~np.isnan(data['channel_capacity'][data['channel_idx']]))
+    sources.append(capped)
+    targets.append(n + n_products + data['channel_idx'][capped])
+
+    if rule_rows:
+        sources.append(np.concatenate([positions for _, positions, _ in rule_rows]))
+        targets.append(n + n_products + n_channels + np.repeat(np.arange(len(rule_rows)),
+                                                               [len(positions) for _, positions, _ in rule_rows]))
+
+    num_nodes = n + n_products + n_channels + len(rule_rows)
+    sources = np.concatenate(sources)
+    targets = np.concatenate(targets)
+    graph = sp.coo_matrix((np.ones(len(sources), dtype=np.int8), (sources, targets)), shape=(num_nodes, num_nodes))
+    _, labels = connected_components(graph, directed=False)
+
+    # Compact the labels of the pair nodes (row nodes without pairs form their own components)
+    _, pair_component = np.unique(labels[:n], return_inverse=True)
+    return int(pair_component.max()) + 1, pair_component
+
+
+def assign_batches(pair_component: np.ndarray, num_components: int, num_batches: int) -> np.ndarray:
+    """
+    Packs components into balanced batches (largest component first onto the lightest batch).
+
+    Returns:
+        int array, batch id of each eligible pair.
+    """
+    sizes = np.bincount(pair_component, minlength=num_components)
+    heap = [(0, b) for b in range(num_batches)]
+    component_batch = np.empty(num_components, dtype=np.int64)
+    for component in np.argsort(-sizes, kind='stable'):
+        load, batch = heapq.heappop(heap)
+        component_batch[component] = batch
+        heapq.heappush(heap, (load + sizes[component], batch))
+    return component_batch[pair_component]
+
+
+def partition_allocation_data(data: dict, pair_batch: np.ndarray, num_batches: int) -> list:
+    """
+    Splits prepared allocation data into self-contained sub-problems.
+
+    Every sub-problem is re-indexed on its own products and channels, so it can be pickled to a
+    worker process and solved with the same builders as the full problem. pair_batch must not
+    cut any row (use assign_batches on find_components output).
+
+    Args:
+        data: Output of allocation_data.prepare_allocation_data.
+        pair_batch: int array, batch id of each eligible pair.
+        num_batches: number of batches.
+
+    Returns:
+        List of (pair_positions, sub_data): pair positions in the full data and the sub-problem.
+    """
+    rows_by_batch = {key: [[] for _ in range(num_batches)] for key in ('outlet_capacity_rows', 'outlet_assortment_rows')}
+    local_position = np.empty(len(pair_batch), dtype=np.int64)
+    batch_positions = []
+    for batch in range(num_batches):
+        positions = np.flatnonzero(pair_batch == batch)
+        local_position[positions] = np.arange(len(positions))
+        batch_positions.append(positions)
+    for key, buckets in rows_by_batch.items():
+        for name, positions, max_skus in data[key]:
+            buckets[pair_batch[positions[0]]].append((name, local_position[positions], max_skus))
+
+    parts = []
+    for batch, positions in enumerate(batch_positions):
+        if len(positions) == 0:
+            continue
+        batch_products, product_idx = np.unique(data['product_idx'][positions], return_inverse=True)
+        batch_channels, channel_idx = np.unique(data['channel_idx'][positions], return_inverse=True)
+        products = data['products'][batch_products]
+        sub_data = {
+            'products': products,
+            'channels': data['channels'][batch_channels],
+            'inventory_quantity': {p: data['inventory_quantity'][p] for p in products if p in data['inventory_quantity']},
+            'supply': data['supply'][batch_products],
+            'product_idx': product_idx,
+            'channel_idx': channel_idx,
+            'eligible_pairs': [data['eligible_pairs'][k] for k in positions],
+            'pair_coverage_cap': data['pair_coverage_cap'][positions],
+            'pair_upper_bound': data['pair_upper_bound'][positions],
+            'supply_limit': data['supply_limit'][batch_products],
+            'channel_capacity': data['channel_capacity'][batch_channels],
+            'outlet_capacity_rows': rows_by_batch['outlet_capacity_rows'][batch],
+            'outlet_assortment_rows': rows_by_batch['outlet_assortment_rows'][batch],
+        }
+        parts.append((positions, scope_binaries(sub_data)))
+    return parts
@@ -0,0 +1,102 @@
+import numpy as np
+import pandas as pd
+from collections import defaultdict
+from preprocessing import encode_product_attributes
+from rule_index import compile_coverage_days
+
+
+def build_eligible_pairs(products_df: pd.DataFrame,
+                         channels_df: pd.DataFrame,
+                         inventory_quantity: dict,
+                         demand_dict: dict,
+                         parameters,
+                         attributes: dict = None,
+                         coverage_days: np.ndarray = None):
+    """
+    Computes the sparse set of (product, channel) pairs that can carry a non-zero allocation.
+
+    A pair is eligible when:
+        - the product has positive inventory,
+        - the product's brand is not restricted from donation if the channel is a donation channel,
+        - if a coverage rule exists for (channel, abc_class), the weekly demand for the pair is positive
+          (a coverage rule with zero demand forces the allocation to zero).
+
+    Pairs without a matching coverage rule stay eligible, exactly as in the full model where no
+    coverage constraint was added for them.
+
+    The scan is done one channel at a time on product-length boolean vectors, so memory scales
+    with |P| + number of eligible pairs and never with |P|·|C|.
+
+    Args:
+        products_df: DataFrame indexed by SKU (columns used: 'brand', 'abc_class').
+        channels_df: DataFrame indexed by channel ID (column used: 'channel_type').
+        inventory_quantity: Dictionary {product_sku: total_quantity}.
+        demand_dict: Dictionary of WEEKLY demand {(product_sku, channel_id): demand_quantity}.
+        parameters: OptimizationParameters object.
+        attributes: Output of encode_product_attributes(products_df); computed if not given.
+        coverage_days: (channel, ABC class) coverage days, see rule_index.compile_coverage_days;
+                       compiled from parameters if not given.
+
+    Returns:
+        Tuple: (product_idx, channel_idx)
+               product_idx: int array of positions in products_df.index.
+               channel_idx: int array of positions in channels_df.index.
+               Pairs are sorted by product then channel.
+    """
+    products = products_df.index
+    channels = channels_df.index
+    n_products = len(products)
+
+    if attributes is None:
+        attributes = encode_product_attributes(products_df)
+
+    # --- Per-product attributes as aligned arrays ---
+    supply = pd.Series(inventory_quantity, dtype=float).reindex(products).fillna(0)
+    has_stock = supply.to_numpy() > 0
+
+    restricted = np.zeros(n_products, dtype=bool)
+    if parameters.restricted_brands_for_donation and 'brand' in products_df.columns:
+        restricted = products_df['brand'].isin(set(parameters.restricted_brands_for_donation)).to_numpy()
+
+    abc_code = attributes['abc_code']
+    channel_types = channels_df['channel_type'].to_numpy(dtype=object)
+    if coverage_days is None:
+        coverage_days = compile_coverage_days(channels, channel_types, parameters.coverage_days_rules)
+
+    # --- Positive demand per channel (product positions) ---
+    product_pos = products.get_indexer
+    demand_products_by_channel = defaultdict(list)
+    for (p, c), weekly_demand_qty in demand_dict.items():
+        if weekly_demand_qty > 0:
+            demand_products_by_channel[str(c)].append(str(p))
+
+    # --- Channel-by-channel scan ---
+    product_idx_parts = []
+    channel_idx_parts = []
+    for j, c in enumerate(channels):
+        eligible = has_stock.copy()
+
+        if channel_types[j] == 'donation':
+            eligible &= ~restricted
+
+        rule_codes = np.flatnonzero(~np.isnan(coverage_days[j]))
+        if rule_codes.size:
+            covered = np.isin(abc_code, rule_codes)
+            with_demand = np.zeros(n_products, dtype=bool)
+            positions = product_pos(demand_products_by_channel.get(c, []))
+            with_demand[positions[positions >= 0]] = True
+            eligible &= ~covered | with_demand
+
+        rows = np.flatnonzero(eligible)
+        product_idx_parts.append(rows)
+        channel_idx_parts.append(np.full(len(rows), j, dtype=np.int64))
+
+    if not product_idx_parts:
+        return np.empty(0, dtype=np.int64), np.empty(0, dtype=np.int64)
+
+    product_idx = np.concatenate(product_idx_parts).astype(np.int64)
+    channel_idx = np.concatenate(channel_idx_parts)
+
+    # Same ordering as the dense (product, channel) cross product
+    order = np.lexsort((channel_idx, product_idx))
+    return product_idx[order], channel_idx[order]
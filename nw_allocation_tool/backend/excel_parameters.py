@@ -0,0 +1,235 @@
+import hashlib
+import os
+import threading
+import time
+import numpy as np
+import pandas as pd
+from backend.schemas import CoverageDaysRule, OutletSKUCapacityRule, OutletAssortmentRule
+
+SIDECAR_VERSION = 1 # Bump when the parsed columns change, so old sidecars are re-parsed
+
+# Rule family -> (workbook, parsed columns in sheet order); the first sheet row is the header
+WORKBOOKS = {
+    'coverage_days_rules': ('CoverageperABCperChannel.xlsx', ('channel', 'abc_class', 'coverage_days')),
+    'outlet_sku_capacity_rules': ('CapacityPerChannel.xlsx', ('channel', 'division', 'axe', 'max_skus')),
+    'outlet_assortment_rules': ('AssortmentperSubaxeperSignature.xlsx', ('metier', 'subaxis', 'brand', 'max_skus')),
+}
+INTEGER_COLUMNS = ('coverage_days', 'max_skus')
+
+
+def file_sha256(path: str) -> str:
+    hasher = hashlib.sha256()
+    with open(path, 'rb') as workbook:
+        for block in iter(lambda: workbook.read(1 << 20), b''):
+            hasher.update(block)
+    return hasher.hexdigest()
+
+
+def read_workbook(path: str, columns) -> dict:
+    """
+    Parses the first sheet of a parameter workbook (openpyxl) into column arrays.
+
+    Rows with an empty cell in any of the columns are skipped; labels are stripped strings,
+    INTEGER_COLUMNS are int64.
+
+    Returns:
+        Dictionary {column: numpy array}.
+    """
+    frame = pd.read_excel(path, sheet_name=0, header=0, usecols=list(range(len(columns))), engine='openpyxl')
+    frame.columns = list(columns)
+    frame = frame.dropna()
+    table = {}
+    for column in columns:
+        if column in INTEGER_COLUMNS:
+            table[column] = pd.to_numeric(frame[column], errors='raise').to_numpy(dtype=np.int64)
+        else:
+            table[column] = frame[column].astype(str).str.strip().to_numpy(dtype=str)
+    return table
+
+
+def _sidecar_path(cache_dir: str, path: str) -> str:
+    return os.path.join(cache_dir, f"{os.path.basename(path)}.npz")
+
+
+def load_sidecar(sidecar_path: str, path: str, columns):
+    """
+    Returns the parsed table of a workbook from its sidecar if it is still valid, else None.
+
+    The sidecar is valid when it records the workbook's mtime, or (after a touch or copy) its SHA-256;
+    in the second case the recorded mtime is refreshed so the hash is not computed again.
+    """
+    try:
+        with np.load(sidecar_path, allow_pickle=False) as sidecar:
+            stored = {key: sidecar[key] for key in sidecar.files}
+    except (OSError, ValueError):
+        return None
+    if int(stored.get('sidecar_version', -1)) != SIDECAR_VERSION or any(column not in stored for column in columns):
+        return None
+
+    table = {column: stored[column] for column in columns}
+    mtime = os.stat(path).st_mtime
+    if float(stored['source_mtime']) == mtime:
+        return table
+    sha256 = file_sha256(path)
+    if str(stored['source_sha256']) != sha256:
+        return None
+    save_sidecar(sidecar_path, table, mtime, sha256)
+    return table
+
+
+def save_sidecar(sidecar_path: str, table: dict, mtime: float, sha256: str):
+    """Writes the column arrays and the source key to an .npz file (no pickled objects), atomically."""
+    temporary_path = f"{sidecar_path}.{os.getpid()}.tmp"
+    with open(temporary_path, 'wb') as sidecar:
+        np.savez(sidecar, sidecar_version=np.int64(SIDECAR_VERSION), source_mtime=np.float64(mtime),
+                 source_sha256=np.str_(sha256), **table)
+    os.replace(temporary_path, sidecar_path)
+
+
+def _channel_selectors(label: str, channels_df: pd.DataFrame) -> list:
+    """
+    (channel_id, channel_type) keys of the rules a workbook 'Channel' label stands for.
+
+    The label is a channel ID, a channel name (one rule per named channel), or a channel type
+    matched case-insensitively (e.g. 'Outlet': one channel-type rule ('*', 'outlet'), see
+    rule_index). Without channels_df the label is used as channel ID. An empty list means the
+    label does not resolve (see unresolved_labels).
+    """
+    if channels_df is None or label in channels_df.index:
+        return [(label, None)]
+    if 'name' in channels_df.columns:
+        named = channels_df.index[channels_df['name'].astype(str) == label]
+        if len(named):
+            return [(channel_id, None) for channel_id in named]
+    types = channels_df['channel_type'].astype(str).unique()
+    return [('*', channel_type) for channel_type in types if channel_type.lower() == label.lower()]
+
+
+def _indexed_channels(channels_df: pd.DataFrame):
+    if channels_df is None:
+        return None
+    channels_df = channels_df.copy()
+    channels_df.index = channels_df.index.astype(str)
+    return channels_df
+
+
+def build_rules(tables: dict, channels_df: pd.DataFrame = None) -> dict:
+    """
+    Turns parsed workbook tables into OptimizationParameters rule lists.
+
+    Args:
+        tables: {rule family: column arrays} (see WORKBOOKS), e.g. ExcelParameterStore.tables().
+        channels_df: Optional channels DataFrame indexed by channel ID, used to resolve 'Channel' labels.
+                     Rows whose label does not resolve are skipped (see unresolved_labels).
+
+    Returns:
+        Dictionary with the rule families present in tables: 'coverage_days_rules',
+        'outlet_sku_capacity_rules', 'outlet_assortment_rules'.
+    """
+    channels_df = _indexed_channels(channels_df)
+    rules = {}
+    if 'coverage_days_rules' in tables:
+        table = tables['coverage_days_rules']
+        rules['coverage_days_rules'] = [
+            CoverageDaysRule(channel_id=channel_id, channel_type=channel_type, abc_class=abc_class, coverage_days=int(days))
+            for label, abc_class, days in zip(table['channel'], table['abc_class'], table['coverage_days'])
+            for channel_id, channel_type in _channel_selectors(str(label), channels_df)
+        ]
+    if 'outlet_sku_capacity_rules' in tables:
+        table = tables['outlet_sku_capacity_rules']
+        rules['outlet_sku_capacity_rules'] = [
+            OutletSKUCapacityRule(channel_id=channel_id, channel_type=channel_type, division=division, axe=axe,
+                                  max_skus=int(max_skus))
+            for label, division, axe, max_skus in zip(table['channel'], table['division'], table['axe'], table['max_skus'])
+            for channel_id, channel_type in _channel_selectors(str(label), channels_df)
+        ]
+    if 'outlet_assortment_rules' in tables:
+        table = tables['outlet_assortment_rules']
+        rules['outlet_assortment_rules'] = [
+            OutletAssortmentRule(metier=metier, subaxis=subaxis, brand=brand, max_skus=int(max_skus))
+            for metier, subaxis, brand, max_skus in zip(table['metier'], table['subaxis'], table['brand'], table['max_skus'])
+        ]
+    return rules
+
+
+def unresolved_labels(tables: dict, channels_df: pd.DataFrame = None) -> dict:
+    """{rule family: sorted 'Channel' labels matching no channel ID, name or type} (families without any are left out)."""
+    channels_df = _indexed_channels(channels_df)
+    unresolved = {}
+    for family, table in tables.items():
+        if 'channel' not in table:
+            continue
+        labels = sorted(label for label in set(map(str, table['channel'])) if not _channel_selectors(label, channels_df))
+        if labels:
+            unresolved[family] = labels
+    return unresolved
+
+
+class ExcelParameterStore:
+    """
+    Business rules of the parameter workbooks, parsed once and hot-reloaded.
+
+    Each workbook is parsed with openpyxl only when its sidecar (cache_dir/<workbook>.npz) is
+    missing or stale; afterwards the column arrays are kept in memory. At most every
+    check_interval seconds the workbooks' mtimes are compared with the loaded ones and a
+    changed workbook is reloaded, so an edited rule file is picked up without a restart.
+    Missing workbooks contribute no rules.
+
+    Args:
+        directory: Folder of the workbooks (data/ExcelParameters).
+        cache_dir: Folder of the sidecars; None keeps the parsed tables in memory only.
+        check_interval: Seconds between two mtime checks.
+    """
+
+    def __init__(self, directory: str, cache_dir: str = None, check_interval: float = 2.0):
+        self.directory = directory
+        self.cache_dir = cache_dir
+        self.check_interval = check_interval
+        self.parse_count = 0 # Workbooks parsed with openpyxl (sidecar misses)
+        self._tables = {} # family -> column arrays
+        self._mtimes = {} # family -> mtime of the loaded workbook
+        self._checked_at = None
+        self._lock = threading.Lock()
+        if cache_dir:
+            os.makedirs(cache_dir, exist_ok=True)
+
+    def _load(self, family: str, path: str, mtime: float):
+        _, columns = WORKBOOKS[family]
+        table = None
+        if self.cache_dir:
+            table = load_sidecar(_sidecar_path(self.cache_dir, path), path, columns)
+        if table is None:
+            table = read_workbook(path, columns)
+            self.parse_count += 1
+            if self.cache_dir:
+                save_sidecar(_sidecar_path(self.cache_dir, path), table, mtime, file_sha256(path))
+        self._tables[family] = table
+        self._mtimes[family] = mtime
+
+    def refresh(self, force: bool = False):
+        """Reloads the workbooks whose mtime changed since they were loaded."""
+        with self._lock:
+            now = time.monotonic()
+            if not force and self._checked_at is not None and now - self._checked_at < self.check_interval:
+                return
+            self._checked_at = now
+            for family, (filename, _) in WORKBOOKS.items():
+                path = os.path.join(self.directory, filename)
+                try:
+                    mtime = os.stat(path).st_mtime
+                except OSError:
+                    self._tables.pop(family, None)
+                    self._mtimes.pop(family, None)
+                    continue
+                if self._mtimes.get(family) != mtime:
+                    self._load(family, path, mtime)
+
+    def tables(self) -> dict:
+        """Parsed column arrays per rule family (after a hot-reload check)."""
+        self.refresh()
+        with self._lock:
+            return dict(self._tables)
+
+    def rules(self, channels_df: pd.DataFrame = None) -> dict:
+        """Rule lists for OptimizationParameters, see build_rules."""
+        return build_rules(self.tables(), channels_df)
@@ -0,0 +1,182 @@
+import time
+import numpy as np
+from dataclasses import dataclass
+from matrix_model import SOLUTION_FEASIBLE
+
+GREEDY_SWEEPS = 2
+
+
+@dataclass
+class HeuristicModel:
+    """Stand-in model returned by the greedy engine (no solver, no optimality proof)."""
+    name: str
+    num_pairs: int
+    solution: np.ndarray = None # Allocated quantity per eligible pair
+    objective_value: float = None
+    solver_stats: dict = None
+    run_report: dict = None # Set by optimize_allocation, see run_report.RunReport
+
+
+def _pair_rows(rule_rows: list, n: int):
+    """Row index of each pair in a family of SKU-count rows (-1 = in no row), and the free slots per row."""
+    pair_row = np.full(n, -1, dtype=np.int64)
+    for r, (_, positions, _) in enumerate(rule_rows):
+        pair_row[positions] = r
+    slots = np.array([max_skus for _, _, max_skus in rule_rows], dtype=float)
+    return pair_row, slots
+
+
+def _rank_within(groups: np.ndarray) -> np.ndarray:
+    """0-based rank of every element among the earlier elements of the same group."""
+    order = np.argsort(groups, kind='stable')
+    sorted_groups = groups[order]
+    starts = np.flatnonzero(np.r_[True, sorted_groups[1:] != sorted_groups[:-1]])
+    rank_sorted = np.arange(len(groups)) - np.repeat(starts, np.diff(np.r_[starts, len(groups)]))
+    rank = np.empty(len(groups), dtype=np.int64)
+    rank[order] = rank_sorted
+    return rank
+
+
+def greedy_allocation(data: dict, initial_values: np.ndarray = None) -> np.ndarray:
+    """
+    Priority-ordered greedy fill of the eligible pairs.
+
+    Channels are filled one after the other, the least flexible first (pair bounds summed over
+    the channel, per unit of capacity). Within a channel, pairs are taken by decreasing
+    feasible quantity min(pair upper bound, remaining supply): outlet SKU-count rows keep their
+    max_skus largest pairs, then the channel capacity is shared out by a cumulative sum.
+    Donation restrictions and zero-demand coverage rules are already excluded by the
+    eligibility index and coverage caps are part of the pair upper bounds.
+
+    Every step is vectorized over the pairs of one channel, so the run time is
+    O(n log n) in the number of eligible pairs. The result is feasible for the MILP and
+    can be passed to CBC as MIP start (SolverSettings.mip_start).
+
+    Args:
+        data: Output of allocation_data.prepare_allocation_data.
+        initial_values: Optional feasible quantities aligned with data['eligible_pairs'] (e.g. from
+                        repair_allocation) that the fill starts from and only tops up.
+
+    Returns:
+        Float array of integral allocated quantities aligned with data['eligible_pairs'].
+    """
+    n = len(data['eligible_pairs'])
+    values = np.zeros(n) if initial_values is None else np.array(initial_values, dtype=float)
+    if n == 0:
+        return values
+
+    product_idx = data['product_idx']
+    channel_idx = data['channel_idx']
+    pair_upper_bound = data['pair_upper_bound']
+    remaining_supply = np.floor(data['supply'] + 1e-9) - np.bincount(product_idx, weights=values, minlength=len(data['supply']))
+    capacity_left = np.where(np.isnan(data['channel_capacity']), np.inf, data['channel_capacity'])
+    capacity_left -= np.bincount(channel_idx, weights=values, minlength=len(capacity_left))
+    rule_families = [_pair_rows(data[key], n) for key in ('outlet_capacity_rows', 'outlet_assortment_rows')]
+    for pair_row, slots_left in rule_families:
+        used = pair_row[(values > 0) & (pair_row >= 0)]
+        slots_left -= np.bincount(used, minlength=len(slots_left))
+
+    # --- Pairs grouped by channel, channels in priority order ---
+    by_channel = np.argsort(channel_idx, kind='stable')
+    channels, starts = np.unique(channel_idx[by_channel], return_index=True)
+    blocks = np.split(by_channel, starts[1:])
+    # Channels whose capacity does not bind only take what their pair bounds allow, channels with a
+    # binding capacity can be filled by any product: the more candidate units per unit of capacity,
+    # the later a channel is filled, so it takes whatever supply the other channels left.
+    channel_capacity = np.where(np.isnan(data['channel_capacity']), np.inf, data['channel_capacity'])
+    bound_per_channel = np.bincount(channel_idx, weights=pair_upper_bound, minlength=len(channel_capacity))[channels]
+    channel_order = np.argsort(bound_per_channel / np.maximum(channel_capacity[channels], 1), kind='stable')
+
+    # Later sweeps top up the pairs with the supply left over after the first one
+    for _ in range(GREEDY_SWEEPS):
+        for j in channel_order:
+            positions = blocks[j]
+            quantity = np.minimum(pair_upper_bound[positions] - values[positions], remaining_supply[product_idx[positions]])
+            order = np.argsort(-quantity, kind='stable')
+            positions, quantity = positions[order], quantity[order]
+            is_new = values[positions] == 0
+
+            # Outlet SKU-count rows: new pairs only take the free slots, largest quantities first
+            for pair_row, slots_left in rule_families:
+                rows = pair_row[positions]
+                limited = np.flatnonzero((rows >= 0) & (quantity > 0) & is_new)
+                if limited.size:
+                    over = _rank_within(rows[limited]) >= slots_left[rows[limited]]
+                    quantity[limited[over]] = 0
+
+            # Channel capacity: fill in priority order until the capacity is used up
+            c = channels[j]
+            quantity = np.minimum(quantity, np.maximum(capacity_left[c] - (np.cumsum(quantity) - quantity), 0))
+            capacity_left[c] -= quantity.sum()
+
+            for pair_row, slots_left in rule_families:
+                rows = pair_row[positions[is_new & (quantity > 0)]]
+                np.subtract.at(slots_left, rows[rows >= 0], 1)
+            values[positions] += quantity
+            remaining_supply[product_idx[positions]] -= quantity # A product appears once per channel
+    return values
+
+
+def repair_allocation(data: dict, previous_allocation: dict) -> np.ndarray:
+    """
+    Turns a previous allocation into a feasible solution of the current model.
+
+    Quantities are aligned with the current eligible pairs (pairs that are no longer eligible
+    are dropped) and clipped to the pair upper bounds. Products allocated beyond their current
+    supply and channels beyond their current capacity are scaled down (rounded down), and every
+    outlet SKU-count row keeps its max_skus largest pairs. Each step only lowers quantities,
+    so the earlier ones stay satisfied.
+
+    Args:
+        data: Output of allocation_data.prepare_allocation_data.
+        previous_allocation: Dictionary {(product_sku, channel_id): quantity} of the previous run.
+
+    Returns:
+        Float array of integral feasible quantities aligned with data['eligible_pairs'].
+    """
+    n = len(data['eligible_pairs'])
+    values = np.array([previous_allocation.get(pair, 0) for pair in data['eligible_pairs']], dtype=float)
+    values = np.floor(np.clip(values, 0, data['pair_upper_bound']) + 1e-9)
+    if n == 0:
+        return values
+
+    # --- Supply and channel capacity: scale the excess down ---
+    for idx, limit in ((data['product_idx'], np.floor(data['supply'] + 1e-9)),
+                       (data['channel_idx'], data['channel_capacity'])):
+        total = np.bincount(idx, weights=values, minlength=len(limit))
+        scale = np.where(total > limit, limit / np.maximum(total, 1), 1.0) # NaN limit: no row
+        values = np.floor(values * scale[idx] + 1e-9)
+
+    # --- Outlet SKU-count rows: keep the max_skus largest pairs ---
+    for key in ('outlet_capacity_rows', 'outlet_assortment_rows'):
+        pair_row, max_skus = _pair_rows(data[key], n)
+        limited = np.flatnonzero((pair_row >= 0) & (values > 0))
+        if limited.size:
+            limited = limited[np.argsort(-values[limited], kind='stable')]
+            over = _rank_within(pair_row[limited]) >= max_skus[pair_row[limited]]
+            values[limited[over]] = 0
+    return values
+
+
+def solve_greedy(data: dict, initial_values: np.ndarray = None) -> HeuristicModel:
+    """
+    Runs greedy_allocation and reports it with the same solver_stats contract as the exact engines.
+
+    The solution is an incumbent without bound: solution_status is 'Solution Found' and the status
+    'Optimal', as for a solver stopped on a limit.
+    """
+    start = time.perf_counter()
+    solution = greedy_allocation(data, initial_values)
+    model = HeuristicModel(name="InventoryAllocation", num_pairs=len(solution), solution=solution,
+                           objective_value=float(solution.sum()))
+    model.solver_stats = {
+        'engine': 'greedy',
+        'status': 'Optimal',
+        'solution_status': SOLUTION_FEASIBLE,
+        'objective': model.objective_value,
+        'best_bound': None,
+        'gap': None,
+        'node_count': 0,
+        'wall_time_seconds': time.perf_counter() - start,
+    }
+    return model
@@ -0,0 +1,199 @@
+import time
+import numpy as np
+import pandas as pd
+from allocation_data import prepare_allocation_data, extract_allocations, scope_binaries
+from heuristic import greedy_allocation, repair_allocation
+from solver import ENGINES, relative_gap, solve_prepared_data, solve_decomposed
+from run_report import RunReport
+from artifact_store import model_artifacts
+
+
+def affected_pairs(data: dict, delta) -> np.ndarray:
+    """
+    Region of the constraint graph touched by a delta.
+
+    A changed SKU (inventory or attributes) and a changed demand entry affect the supply row of
+    the product, so every pair of the product is re-opened: units can move between its channels.
+    A changed channel (capacity or rules) re-opens every pair of the channel. The capacity rows
+    and outlet SKU-count rows shared with the rest of the catalogue are not followed: they stay
+    in the region's model with the room left by the fixed pairs.
+
+    Args:
+        data: Output of allocation_data.prepare_allocation_data (current inputs).
+        delta: AllocationDelta.
+
+    Returns:
+        Boolean array over data['eligible_pairs'], True for the pairs to re-solve.
+    """
+    skus = set(map(str, delta.product_skus)) | {str(p) for p, _ in delta.demand_keys}
+    changed_products = data['products'].isin(list(skus))
+    changed_channels = data['channels'].isin([str(c) for c in delta.channel_ids])
+    return changed_products[data['product_idx']] | changed_channels[data['channel_idx']]
+
+
+def region_allocation_data(data: dict, region: np.ndarray, fixed_values: np.ndarray):
+    """
+    Sub-problem over the region pairs, with every other pair fixed to fixed_values.
+
+    Rows shared with fixed pairs keep the room the fixed pairs leave: supply and capacity
+    right-hand sides are reduced by the fixed quantities, SKU-count rows by the fixed pairs in
+    use. Pair bounds are tightened against these residuals. The sub-problem is re-indexed on
+    its own products and channels like a partition_allocation_data part.
+
+    Args:
+        data: Output of allocation_data.prepare_allocation_data.
+        region: Boolean array over the eligible pairs (see affected_pairs).
+        fixed_values: Quantities aligned with data['eligible_pairs']; only the pairs outside the region are used.
+
+    Returns:
+        (positions, sub_data): region pair positions in the full data and the sub-problem,
+        or None when the fixed pairs already violate a row of the current data.
+    """
+    n = len(data['eligible_pairs'])
+    positions = np.flatnonzero(region)
+    fixed = np.where(region, 0.0, fixed_values)
+    if np.any(fixed > data['pair_upper_bound'] + 1e-9):
+        return None
+
+    # --- Room left by the fixed pairs ---
+    supply_left = np.floor(data['supply'] + 1e-9) - np.bincount(data['product_idx'], weights=fixed, minlength=len(data['supply']))
+    capacity_left = data['channel_capacity'] - np.bincount(data['channel_idx'], weights=fixed, minlength=len(data['channels']))
+    if np.any(supply_left < 0) or np.any(capacity_left < 0): # NaN (no row) compares False
+        return None
+
+    local_position = np.full(n, -1, dtype=np.int64)
+    local_position[positions] = np.arange(len(positions))
+    rule_rows = {}
+    for key in ('outlet_capacity_rows', 'outlet_assortment_rows'):
+        rule_rows[key] = []
+        for name, row_positions, max_skus in data[key]:
+            slots_left = max_skus - np.count_nonzero(fixed[row_positions] > 0)
+            if slots_left < 0:
+                return None
+            in_region = local_position[row_positions]
+            in_region = in_region[in_region >= 0]
+            if len(in_region) > slots_left: # Otherwise the row cannot bind
+                rule_rows[key].append((name, in_region, slots_left))
+
+    # --- Re-indexed sub-problem ---
+    region_products, product_idx = np.unique(data['product_idx'][positions], return_inverse=True)
+    region_channels, channel_idx = np.unique(data['channel_idx'][positions], return_inverse=True)
+    supply = supply_left[region_products]
+    channel_capacity = capacity_left[region_channels]
+    upper_bound = np.minimum(data['pair_upper_bound'][positions], supply[product_idx])
+    pair_capacity = channel_capacity[channel_idx]
+    capped = ~np.isnan(pair_capacity)
+    upper_bound[capped] = np.minimum(upper_bound[capped], pair_capacity[capped])
+    upper_bound = np.floor(upper_bound + 1e-9)
+
+    bound_per_product = np.bincount(product_idx, weights=upper_bound, minlength=len(region_products))
+    bound_per_channel = np.bincount(channel_idx, weights=upper_bound, minlength=len(region_channels))
+    channel_capacity[bound_per_channel <= channel_capacity] = np.nan
+    products = data['products'][region_products]
+    sub_data = {
+        'products': products,
+        'channels': data['channels'][region_channels],
+        'inventory_quantity': {p: data['inventory_quantity'][p] for p in products if p in data['inventory_quantity']},
+        'supply': supply,
+        'product_idx': product_idx,
+        'channel_idx': channel_idx,
+        'eligible_pairs': [data['eligible_pairs'][k] for k in positions],
+        'pair_coverage_cap': data['pair_coverage_cap'][positions],
+        'pair_upper_bound': upper_bound,
+        'supply_limit': np.where(bound_per_product > supply, supply, np.nan),
+        'channel_capacity': channel_capacity,
+        'outlet_capacity_rows': rule_rows['outlet_capacity_rows'],
+        'outlet_assortment_rows': rule_rows['outlet_assortment_rows'],
+    }
+    return positions, scope_binaries(sub_data)
+
+
+def reoptimize_allocation(products_df: pd.DataFrame,
+                          channels_df: pd.DataFrame,
+                          inventory_df: pd.DataFrame,
+                          demand_dict: dict,
+                          parameters,
+                          previous_allocation: dict,
+                          delta,
+                          engine: str = None):
+    """
+    Incremental re-optimization: re-solves only the region of the model touched by a delta.
+
+    The inputs are the current (already updated) ones. Pairs outside affected_pairs keep their
+    quantity from previous_allocation, the region is solved against the room they leave and the
+    two are merged. The model handed to the solver therefore scales with the size of the change,
+    not with the catalogue. The rest of the run does not: prepare_allocation_data still runs over
+    the whole catalogue, previous_allocation is aligned with every eligible pair and the merged
+    solution is extracted over every pair. Those costs are the 'prepare', 'region' and 'extract'
+    phases of the run report (see solver_benchmark.py --incremental). The merged solution is optimal for the region given the fixed pairs,
+    not necessarily for the whole catalogue; a periodic full optimize_allocation run removes the drift.
+
+    When the fixed part is no longer feasible under the current data (the delta missed a change),
+    the whole model is solved instead, warm-started from the repaired previous allocation.
+
+    Args:
+        products_df, channels_df, inventory_df, demand_dict, parameters, engine: As optimize_allocation.
+        previous_allocation: {(product_sku, channel_id): quantity} of the run the delta applies to.
+        delta: AllocationDelta.
+
+    Returns:
+        Same (model, status, list_of_allocation_decisions) tuple as optimize_allocation.
+        model.solver_stats covers the merged solution (objective and bound include the fixed
+        pairs) and adds 'region_pairs' and 'total_pairs'; model.run_report is the RunReport of the
+        run, with the model size of the re-solved region.
+    """
+    settings = parameters.solver
+    engine = engine or settings.engine
+    if engine not in ENGINES:
+        raise ValueError(f"Unknown engine '{engine}', expected one of {ENGINES}.")
+
+    report = RunReport()
+    with report.phase('prepare'):
+        data = prepare_allocation_data(products_df, channels_df, inventory_df, demand_dict, parameters)
+    n = len(data['eligible_pairs'])
+    with report.phase('region'):
+        previous_values = np.array([previous_allocation.get(pair, 0) for pair in data['eligible_pairs']], dtype=float)
+        region = affected_pairs(data, delta)
+        region_part = region_allocation_data(data, region, previous_values)
+
+    if region_part is None:
+        # --- Fallback: full solve from the repaired previous run ---
+        region = np.ones(n, dtype=bool)
+        positions, sub_data = np.arange(n), data
+        with report.phase('warm_start'):
+            initial_values = greedy_allocation(data, repair_allocation(data, previous_allocation))
+    else:
+        positions, sub_data = region_part
+        initial_values = None
+    report.record_model_size(sub_data)
+
+    artifact_format = model_artifacts().export_format(settings.export_model) # Export of the region model
+    start = time.perf_counter()
+    if settings.decompose:
+        model, status_string, region_values = solve_decomposed(sub_data, settings, engine, initial_values, report=report,
+                                                               artifact_format=artifact_format)
+    else:
+        model, status_string, region_values = solve_prepared_data(sub_data, settings, engine, artifact_format,
+                                                                   initial_values=initial_values, report=report)
+    wall_time = time.perf_counter() - start
+
+    # --- Merge the region into the fixed part ---
+    fixed_objective = float(previous_values[~region].sum())
+    stats = dict(model.solver_stats)
+    for key in ('objective', 'best_bound'):
+        if stats[key] is not None or len(positions) == 0: # Empty region: the fixed part is the solution
+            stats[key] = (stats[key] or 0.0) + fixed_objective
+    stats['gap'] = relative_gap(stats['objective'], stats['best_bound'])
+    stats['wall_time_seconds'] = wall_time
+    stats['region_pairs'] = len(positions)
+    stats['total_pairs'] = n
+    model.solver_stats = stats
+
+    allocation_results = []
+    with report.phase('extract'):
+        if region_values is not None:
+            pair_values = np.where(region, 0.0, previous_values)
+            pair_values[positions] = region_values
+            allocation_results = extract_allocations(data, pair_values)
+    model.run_report = report.finish(stats)
+    return model, status_string, allocation_results
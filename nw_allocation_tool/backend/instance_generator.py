@@ -0,0 +1,139 @@
+import numpy as np
+import pandas as pd
+from schemas import OptimizationParameters, CoverageDaysRule, OutletSKUCapacityRule, OutletAssortmentRule
+
+# Hierarchy labels of the ExcelParameters workbooks (operational division / axe)
+DIVISIONS = ('CPD', 'LDB', 'LLD', 'PPD')
+AXES = ('Fragrance', 'Generic', 'Hair', 'Hygiene', 'MakeUp', 'Miscellaneous', 'Skin Care')
+ABC_MIX = {'A': 0.2, 'B': 0.3, 'C': 0.5}
+CHANNEL_MIX = {'store': 0.6, 'outlet': 0.25, 'donation': 0.15}
+
+# Coverage days per channel type and ABC class (CoverageperABCperChannel.xlsx: Outlet and TBA rows)
+COVERAGE_DAYS = {'outlet': {'A': 28, 'B': 21, 'C': 14}, 'store': {'A': 60, 'B': 45, 'C': 30}}
+
+
+def _zipf_weights(n: int, exponent: float, rng) -> np.ndarray:
+    """Shuffled Zipf popularity weights summing to 1 (a few labels carry most of the mass)."""
+    weights = 1.0 / np.arange(1, n + 1) ** exponent
+    rng.shuffle(weights)
+    return weights / weights.sum()
+
+
+def _hierarchy(rng) -> pd.DataFrame:
+    """
+    (division, axe, subaxis, metier) leaves with brands per division.
+
+    Each axe has 2-6 subaxes, each subaxis 2-8 metiers; every division owns its brands
+    (signatures), as in the assortment workbook.
+    """
+    leaves = []
+    for axe in AXES:
+        for s in range(rng.integers(2, 7)):
+            subaxis = f"{axe} {s + 1}"
+            for m in range(rng.integers(2, 9)):
+                leaves.append((axe, subaxis, f"{subaxis}.{m + 1}"))
+    return pd.DataFrame(leaves, columns=['axe', 'subaxis', 'metier'])
+
+
+def generate_instance(num_products: int, num_channels: int, seed: int = 0, demand_density: float = 0.1) -> dict:
+    """
+    Seeded synthetic allocation instance with the shape of production data.
+
+    - Products follow the division > axe > subaxis > metier hierarchy with brands per division,
+      Zipf-skewed label popularity and the ABC_MIX class mix; about 15% have no stock.
+    - Channels are stores, outlets and donation channels (CHANNEL_MIX) of log-normal capacity.
+    - Weekly demand exists on about demand_density of the (product, channel) pairs, skewed
+      towards popular products and large channels, with log-normal quantities.
+    - Rules are shaped like the ExcelParameters workbooks: coverage days per channel type and
+      ABC class with a few per-channel overrides, outlet max SKUs per (division, axe) (some
+      zero, i.e. closed) and per (metier, subaxis, brand) for about 30% of the combinations.
+
+    Args:
+        num_products: Number of SKUs.
+        num_channels: Number of channels.
+        seed: Random seed; the same arguments always give the same instance.
+        demand_density: Expected share of pairs with demand.
+
+    Returns:
+        Dictionary with the optimize_allocation inputs: 'products_df', 'channels_df',
+        'inventory_df', 'demand_dict' and 'parameters' (OptimizationParameters).
+    """
+    rng = np.random.default_rng(seed)
+
+    # --- Products ---
+    leaves = _hierarchy(rng)
+    leaf = rng.choice(len(leaves), num_products, p=_zipf_weights(len(leaves), 1.0, rng))
+    division = rng.choice(DIVISIONS, num_products, p=[0.45, 0.1, 0.3, 0.15])
+    brands_per_division = {d: [f"{d} Brand {b + 1}" for b in range(rng.integers(8, 21))] for d in DIVISIONS}
+    brand = np.empty(num_products, dtype=object)
+    for d, names in brands_per_division.items():
+        rows = np.flatnonzero(division == d)
+        brand[rows] = np.asarray(names, dtype=object)[rng.choice(len(names), len(rows), p=_zipf_weights(len(names), 1.2, rng))]
+    skus = np.array([f"SKU{i:08d}" for i in range(num_products)], dtype=object)
+    products_df = pd.DataFrame({
+        'sku': skus,
+        'donation_eligible': rng.random(num_products) < 0.8,
+        'brand': brand,
+        'division': division,
+        'axe': leaves['axe'].to_numpy()[leaf],
+        'subaxis': leaves['subaxis'].to_numpy()[leaf],
+        'metier': leaves['metier'].to_numpy()[leaf],
+        'abc_class': rng.choice(list(ABC_MIX), num_products, p=list(ABC_MIX.values())),
+    }).set_index('sku')
+
+    # --- Channels ---
+    channel_type = rng.choice(list(CHANNEL_MIX), num_channels, p=list(CHANNEL_MIX.values()))
+    channel_ids = np.array([f"{t.upper()}{j:05d}" for j, t in enumerate(channel_type)], dtype=object)
+    channel_size = rng.lognormal(0.0, 0.8, num_channels)
+    mean_stock = 20.0
+    channels_df = pd.DataFrame({
+        'id': channel_ids,
+        # Roughly a fair share of the stock per channel, so capacities bind on part of the channels
+        'capacity': np.maximum((channel_size / channel_size.sum() * num_products * mean_stock * 0.8).astype(np.int64), 1),
+        'channel_type': channel_type,
+    }).set_index('id')
+
+    # --- Inventory (a few SKUs split over several lots) ---
+    quantity = np.where(rng.random(num_products) < 0.85, rng.lognormal(np.log(mean_stock), 1.0, num_products), 0).astype(np.int64)
+    split = rng.random(num_products) < 0.1
+    lots = np.concatenate([np.arange(num_products), np.flatnonzero(split)])
+    lot_quantity = np.concatenate([quantity - quantity * split // 2, quantity[split] // 2])
+    inventory_df = pd.DataFrame({'product_sku': skus[lots], 'quantity': lot_quantity})
+
+    # --- Skewed weekly demand, one channel at a time ---
+    popularity = _zipf_weights(num_products, 0.8, rng) * num_products
+    demand_dict = {}
+    for j in range(num_channels):
+        probability = np.minimum(demand_density * popularity * channel_size[j] / channel_size.mean(), 1.0)
+        rows = np.flatnonzero(rng.random(num_products) < probability)
+        weekly = np.maximum(rng.lognormal(0.5, 1.0, len(rows)).astype(np.int64), 1)
+        demand_dict.update(zip(zip(skus[rows], [channel_ids[j]] * len(rows)), weekly.tolist()))
+
+    # --- Rules shaped like the ExcelParameters workbooks ---
+    coverage_days_rules = [CoverageDaysRule(channel_type=t, abc_class=abc, coverage_days=days)
+                           for t, per_class in COVERAGE_DAYS.items() for abc, days in per_class.items()]
+    for j in rng.choice(num_channels, max(num_channels // 20, 1), replace=False): # Per-channel overrides
+        if channel_type[j] in COVERAGE_DAYS:
+            coverage_days_rules.append(CoverageDaysRule(channel_id=channel_ids[j], abc_class='A',
+                                                        coverage_days=int(rng.integers(7, 90))))
+
+    group_size = products_df.groupby(['division', 'axe']).size()
+    outlet_sku_capacity_rules = [
+        OutletSKUCapacityRule(channel_type='outlet', division=d, axe=a,
+                              max_skus=0 if rng.random() < 0.3 else max(int(size * rng.uniform(0.05, 0.5)), 1))
+        for (d, a), size in group_size.items()]
+
+    assortment_size = products_df.groupby(['metier', 'subaxis', 'brand']).size()
+    ruled = rng.random(len(assortment_size)) < 0.3
+    outlet_assortment_rules = [
+        OutletAssortmentRule(metier=m, subaxis=s, brand=b, max_skus=max(int(size * rng.uniform(0.1, 0.6)), 1))
+        for ((m, s, b), size), keep in zip(assortment_size.items(), ruled) if keep]
+
+    parameters = OptimizationParameters(
+        restricted_brands_for_donation=list(rng.choice(brands_per_division['LLD'], 2, replace=False)),
+        coverage_days_rules=coverage_days_rules,
+        outlet_sku_capacity_rules=outlet_sku_capacity_rules,
+        outlet_assortment_rules=outlet_assortment_rules,
+    )
+    return {'products_df': products_df, 'channels_df': channels_df, 'inventory_df': inventory_df,
+            'demand_dict': demand_dict, 'parameters': parameters}
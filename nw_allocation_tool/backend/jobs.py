@@ -0,0 +1,278 @@
+import atexit
+import json
+import os
+import signal
+import threading
+import traceback
+import uuid
+import multiprocessing
+from datetime import datetime
+from backend.models import db, AllocationJob
+from backend.solve_cache import allocation_fingerprint, is_cacheable
+
+ACTIVE_STATES = ('building', 'solving')
+FINAL_STATES = ('done', 'failed', 'cancelled')
+
+
+def submit_job(payload: dict, submitted_by: str = None) -> AllocationJob:
+    """Stores a new allocation job in the 'queued' state and returns it."""
+    job = AllocationJob(id=uuid.uuid4().hex, status='queued', progress=0.0,
+                        request_payload=json.dumps(payload), submitted_by=submitted_by)
+    db.session.add(job)
+    db.session.commit()
+    return job
+
+
+def request_cancel(job: AllocationJob) -> AllocationJob:
+    """
+    Cancels a job: a queued job is cancelled at once, a running one is marked 'cancelling'
+    and its solver process is killed by the JobRunner that owns it. Finished jobs are unchanged.
+    """
+    if job.status == 'queued':
+        job.status = 'cancelled'
+        job.finished_at = datetime.utcnow()
+    elif job.status in ACTIVE_STATES:
+        job.status = 'cancelling'
+    db.session.commit()
+    return job
+
+
+def _run_job(job_id: str, inputs: dict, connection):
+    """
+    Worker process entry point: solves one job and sends (job_id, phase, progress, payload) messages.
+
+    The process leads its own process group, so cancelling the job also kills the CBC subprocess.
+    Messages go through the job's own pipe: a process killed while sending can only break its
+    own channel, never the messages of the other jobs.
+    """
+    if hasattr(os, 'setpgrp'):
+        os.setpgrp()
+    from backend.solver import optimize_allocation
+
+    def progress(phase, fraction):
+        connection.send((job_id, phase, fraction, None))
+
+    try:
+        model, status, allocations = optimize_allocation(**inputs, progress=progress)
+        connection.send((job_id, 'done', 1.0, {'status': status,
+                                               'allocations': allocations,
+                                               'solver_stats': model.solver_stats,
+                                               'run_report': model.run_report}))
+    except Exception:
+        connection.send((job_id, 'failed', None, traceback.format_exc()))
+    finally:
+        connection.close()
+
+
+class JobRunner:
+    """
+    Runs queued allocation jobs on a bounded set of solver processes.
+
+    The runner loop (a background thread started by start(), or the calling thread of serve()
+    in a standalone `python -m backend.jobs` process) claims queued jobs from the job table,
+    starts one spawned process per job (at most max_workers at a time) and writes the progress
+    messages of the processes back to the table, so any web worker can serve status and result
+    requests. Claims are atomic updates of the job row, so several runners can share one table.
+
+    Args:
+        app: Flask application (the thread works inside its app context).
+        load_inputs: Callable payload -> keyword arguments of optimize_allocation (reads the database).
+        save_result: Callable (job, result) -> None, persists the result {'status', 'allocations', 'solver_stats', 'run_report'}
+                     of a finished job.
+        max_workers: Maximum number of concurrent solver processes.
+        poll_interval: Seconds between two passes over the job table.
+        cache: Optional SolveCache; a job whose inputs were already solved finishes without a process.
+    """
+
+    def __init__(self, app, load_inputs, save_result, max_workers: int = 2, poll_interval: float = 0.5, cache=None):
+        self.app = app
+        self.load_inputs = load_inputs
+        self.save_result = save_result
+        self.max_workers = max_workers
+        self.poll_interval = poll_interval
+        self.cache = cache
+        self._fingerprints = {} # job_id -> cache key of the running job
+        self._context = multiprocessing.get_context('spawn') # No fork of a threaded web process
+        self._processes = {} # job_id -> Process
+        self._connections = {} # job_id -> receiving end of the job's message pipe
+        self._stop = threading.Event()
+        self._thread = None
+
+    def start(self):
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._loop, name='allocation-job-runner', daemon=True)
+            self._thread.start()
+            # Solver processes are not daemonic (decompose starts its own pool in them), so the
+            # interpreter would wait for them at exit: kill the running jobs first instead
+            atexit.register(self.stop)
+
+    def serve(self):
+        """Runs the runner in the calling thread until interrupted (standalone job process)."""
+        try:
+            self._loop()
+        except KeyboardInterrupt:
+            pass
+        finally:
+            self.stop()
+
+    def stop(self):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+        for job_id in list(self._processes):
+            self._kill(job_id)
+
+    def _loop(self):
+        while not self._stop.is_set():
+            try:
+                with self.app.app_context():
+                    self.run_once()
+            except Exception:
+                traceback.print_exc() # Keep the runner alive, e.g. before the job table exists
+            self._stop.wait(self.poll_interval)
+
+    def run_once(self):
+        """One pass: apply progress messages, handle cancellations and exits, start queued jobs."""
+        self._drain_messages()
+        self._handle_cancellations()
+        self._reap()
+        self._claim_queued()
+
+    # --- Job table updates ---
+
+    def _receive(self):
+        """Pending messages of all running jobs; a broken pipe ends the messages of that job only."""
+        messages = []
+        for job_id, connection in self._connections.items():
+            try:
+                while connection.poll():
+                    messages.append(connection.recv())
+            except (EOFError, OSError):
+                pass # Process exited (or was killed mid-message): _reap settles the job
+        return messages
+
+    def _drain_messages(self):
+        for job_id, phase, fraction, payload in self._receive():
+            job = db.session.get(AllocationJob, job_id)
+            if job is None or job.status not in ACTIVE_STATES:
+                continue # Cancelled meanwhile
+            if phase == 'done':
+                self.save_result(job, payload)
+                job.result = json.dumps(payload, default=str)
+                job.finished_at = datetime.utcnow()
+                key = self._fingerprints.pop(job_id, None)
+                if key is not None and is_cacheable(payload['solver_stats']):
+                    self.cache.put(key, payload)
+            elif phase == 'failed':
+                job.error = payload
+                job.finished_at = datetime.utcnow()
+            job.status = phase
+            if fraction is not None:
+                job.progress = fraction
+            db.session.commit()
+
+    def _handle_cancellations(self):
+        if not self._processes:
+            return
+        cancelling = AllocationJob.query.filter(AllocationJob.id.in_(list(self._processes)),
+                                                AllocationJob.status == 'cancelling').all()
+        for job in cancelling:
+            self._kill(job.id)
+            job.status = 'cancelled'
+            job.finished_at = datetime.utcnow()
+        if cancelling:
+            db.session.commit()
+
+    def _reap(self):
+        finished = [job_id for job_id, process in self._processes.items() if not process.is_alive()]
+        if not finished:
+            return
+        self._drain_messages() # Final messages of the exited processes
+        for job_id in finished:
+            process = self._processes.pop(job_id)
+            process.join()
+            self._connections.pop(job_id).close()
+            self._fingerprints.pop(job_id, None)
+            job = db.session.get(AllocationJob, job_id)
+            if job is not None and job.status in ACTIVE_STATES: # Exited without reporting
+                job.status = 'failed'
+                job.error = f"Solver process exited with code {process.exitcode}"
+                job.finished_at = datetime.utcnow()
+        db.session.commit()
+
+    def _claim_queued(self):
+        while len(self._processes) < self.max_workers:
+            job = AllocationJob.query.filter_by(status='queued').order_by(AllocationJob.created_at).first()
+            if job is None:
+                return
+            claimed = AllocationJob.query.filter_by(id=job.id, status='queued').update(
+                {'status': 'building', 'started_at': datetime.utcnow()}, synchronize_session=False)
+            db.session.commit()
+            if not claimed:
+                continue # Claimed by another runner
+
+            job = db.session.get(AllocationJob, job.id)
+            try:
+                inputs = self.load_inputs(json.loads(job.request_payload))
+                key = allocation_fingerprint(**inputs) if self.cache is not None else None
+                cached = self.cache.get(key) if key is not None else None
+                if cached is not None: # Same inputs already solved: done without a solver process
+                    self.save_result(job, cached)
+                    job.status, job.progress = 'done', 1.0
+                    job.result = json.dumps(cached, default=str)
+                    job.finished_at = datetime.utcnow()
+                    db.session.commit()
+                    continue
+            except Exception:
+                db.session.rollback()
+                job.status = 'failed'
+                job.error = traceback.format_exc()
+                job.finished_at = datetime.utcnow()
+                db.session.commit()
+                continue
+
+            receiver, sender = self._context.Pipe(duplex=False)
+            # Not daemonic: a decompose job starts the batch process pool of solve_decomposed
+            process = self._context.Process(target=_run_job, args=(job.id, inputs, sender))
+            try:
+                process.start()
+            except Exception:
+                receiver.close()
+                job.status = 'failed'
+                job.error = traceback.format_exc()
+                job.finished_at = datetime.utcnow()
+                db.session.commit()
+                continue
+            finally:
+                sender.close() # Only the solver process writes; EOF once it exits
+            self._processes[job.id] = process
+            self._connections[job.id] = receiver
+            if key is not None:
+                self._fingerprints[job.id] = key
+            AllocationJob.query.filter_by(id=job.id).update({'worker_pid': process.pid}, synchronize_session=False)
+            db.session.commit()
+
+    def _kill(self, job_id: str):
+        """Kills the solver process of a job together with its process group (CBC subprocess)."""
+        self._fingerprints.pop(job_id, None)
+        process = self._processes.pop(job_id, None)
+        if process is None:
+            return
+        self._connections.pop(job_id).close()
+        if process.is_alive():
+            try:
+                # Only once the process leads its group, never the group of the web process
+                if hasattr(os, 'killpg') and os.getpgid(process.pid) == process.pid:
+                    os.killpg(process.pid, signal.SIGKILL)
+                else:
+                    process.kill()
+            except ProcessLookupError:
+                pass
+        process.join()
+
+
+if __name__ == '__main__':
+    # Standalone job runner, next to the web processes: python -m backend.jobs
+    from main import job_runner
+    job_runner.serve()
@@ -0,0 +1,213 @@
+import time
+import numpy as np
+import scipy.sparse as sp
+from dataclasses import dataclass
+from scipy.optimize import milp, LinearConstraint, Bounds
+
+# scipy.optimize.milp status codes mapped to the PuLP status strings used by the rest of the backend
+MILP_STATUS = {0: 'Optimal', 1: 'Not Solved', 2: 'Infeasible', 3: 'Unbounded', 4: 'Undefined'}
+
+# Solution tags, same strings as pulp.LpSolution
+SOLUTION_OPTIMAL = 'Optimal Solution Found'
+SOLUTION_FEASIBLE = 'Solution Found'
+SOLUTION_NONE = 'No Solution Found'
+SOLUTION_INFEASIBLE = 'No Solution Exists'
+SOLUTION_UNBOUNDED = 'Solution is Unbounded'
+
+
+@dataclass
+class MatrixModel:
+    """
+    Sparse matrix form of the allocation MILP.
+
+    Columns are [x_0 .. x_{n-1}, y_0 .. y_{m-1}]: x over the n eligible pairs, y over the m
+    binary_pairs (pair positions); every row reads A[i] @ v <= row_ub[i].
+    row_families lists (family_name, first_row, last_row + 1).
+    """
+    name: str
+    num_pairs: int
+    binary_pairs: np.ndarray
+    objective: np.ndarray # Maximization coefficients
+    A: sp.csr_matrix
+    row_ub: np.ndarray
+    lb: np.ndarray
+    ub: np.ndarray
+    integrality: np.ndarray
+    row_families: list
+    solution: np.ndarray = None
+    objective_value: float = None
+    solver_stats: dict = None
+    run_report: dict = None # Set by optimize_allocation, see run_report.RunReport
+
+
+def _rule_rows(rule_rows: list, y_column: np.ndarray):
+    """COO parts of SKU-count rows (sum of y over a group of pairs <= max_skus)."""
+    if not rule_rows:
+        return np.empty(0, dtype=np.int64), np.empty(0, dtype=np.int64), np.empty(0)
+    lengths = [len(positions) for _, positions, _ in rule_rows]
+    rows = np.repeat(np.arange(len(rule_rows)), lengths)
+    cols = y_column[np.concatenate([positions for _, positions, _ in rule_rows])]
+    row_ub = np.array([max_skus for _, _, max_skus in rule_rows], dtype=float)
+    return rows, cols, row_ub
+
+
+def build_matrix_model(data: dict) -> MatrixModel:
+    """
+    Assembles the allocation model directly as a CSR matrix with bound vectors.
+
+    Builds the same constraint families as the PuLP formulation (supply, channel capacity,
+    outlet SKU capacity, outlet assortment, x/y linking) without creating any
+    LpAffineExpression. Donation restrictions are already enforced by the eligibility index
+    and coverage rules are column upper bounds (see allocation_data.tighten_bounds).
+    y columns only exist for data['binary_pairs']; without any, all columns are continuous
+    and HiGHS solves a pure LP whose optimum is integral.
+
+    Args:
+        data: Output of allocation_data.prepare_allocation_data.
+
+    Returns:
+        MatrixModel ready for solve_matrix_model.
+    """
+    n = len(data['eligible_pairs'])
+    product_idx = data['product_idx']
+    channel_idx = data['channel_idx']
+    pair_upper_bound = data['pair_upper_bound']
+    binary_pairs = data['binary_pairs']
+    m = len(binary_pairs)
+    y_column = np.full(n, -1, dtype=np.int64) # Column of y[p, c] per pair (-1 = no binary)
+    y_column[binary_pairs] = n + np.arange(m)
+
+    row_parts = [] # (family, rows, cols, vals, row_ub)
+
+    # 1. Supply: sum_c x[p, c] <= inventory[p] (only rows that can bind, see tighten_bounds)
+    pair_supply = data['supply_limit'][product_idx]
+    limited = np.flatnonzero(~np.isnan(pair_supply))
+    limited_products, supply_rows = np.unique(product_idx[limited], return_inverse=True)
+    row_parts.append(('Supply_Product', supply_rows, limited, np.ones(len(limited)), data['supply_limit'][limited_products]))
+
+    # 2. Non-outlet capacity: sum_p x[p, c] <= capacity[c]
+    pair_capacity = data['channel_capacity'][channel_idx]
+    capped = np.flatnonzero(~np.isnan(pair_capacity))
+    capped_channels, capacity_rows = np.unique(channel_idx[capped], return_inverse=True)
+    row_parts.append(('Capacity_Channel', capacity_rows, capped, np.ones(len(capped)), data['channel_capacity'][capped_channels]))
+
+    # 3. Coverage: x[p, c] <= daily_demand * coverage_days is folded into the upper bound of x
+    # 4. Outlet SKU capacity per (division, axe)
+    rows, cols, row_ub = _rule_rows(data['outlet_capacity_rows'], y_column)
+    row_parts.append(('Outlet_Capacity_SKU', rows, cols, np.ones(len(cols)), row_ub))
+
+    # 5. Outlet assortment per (metier, subaxis, brand)
+    rows, cols, row_ub = _rule_rows(data['outlet_assortment_rows'], y_column)
+    row_parts.append(('Outlet_Assortment', rows, cols, np.ones(len(cols)), row_ub))
+
+    # 6. Linking: x[p, c] - M * y[p, c] <= 0, M = upper bound of x[p, c]
+    link_rows = np.arange(m)
+    row_parts.append(('Link_x_y',
+                      np.concatenate([link_rows, link_rows]),
+                      np.concatenate([binary_pairs, n + link_rows]),
+                      np.concatenate([np.ones(m), -pair_upper_bound[binary_pairs]]),
+                      np.zeros(m)))
+
+    # --- Stack families into one CSR matrix ---
+    all_rows, all_cols, all_vals, all_ub, row_families = [], [], [], [], []
+    offset = 0
+    for family, rows, cols, vals, row_ub in row_parts:
+        if len(row_ub) == 0:
+            continue
+        all_rows.append(rows + offset)
+        all_cols.append(cols)
+        all_vals.append(vals)
+        all_ub.append(row_ub)
+        row_families.append((family, offset, offset + len(row_ub)))
+        offset += len(row_ub)
+
+    num_cols = n + m
+    if offset:
+        A = sp.csr_matrix((np.concatenate(all_vals), (np.concatenate(all_rows), np.concatenate(all_cols))),
+                          shape=(offset, num_cols))
+        row_ub = np.concatenate(all_ub)
+    else:
+        A = sp.csr_matrix((0, num_cols))
+        row_ub = np.empty(0)
+
+    return MatrixModel(
+        name="InventoryAllocation",
+        num_pairs=n,
+        binary_pairs=binary_pairs,
+        objective=np.concatenate([np.ones(n), np.zeros(m)]), # Maximize total allocated quantity
+        A=A,
+        row_ub=row_ub,
+        lb=np.zeros(num_cols),
+        ub=np.concatenate([pair_upper_bound, np.ones(m)]),
+        integrality=np.full(num_cols, 1 if m else 0),
+        row_families=row_families,
+    )
+
+
+def solve_matrix_model(model: MatrixModel, options: dict = None) -> str:
+    """
+    Solves a MatrixModel in-process with HiGHS (scipy.optimize.milp).
+
+    The solution vector, objective value and solver statistics (gap, node count,
+    wall time) are stored on the model.
+
+    Args:
+        model: MatrixModel from build_matrix_model.
+        options: Optional scipy.optimize.milp options (time_limit, mip_rel_gap, presolve, disp).
+
+    Returns:
+        PuLP-style status string ('Optimal', 'Not Solved', 'Infeasible', 'Unbounded', 'Undefined').
+        As with CBC through PuLP, a run stopped on a limit with an incumbent returns 'Optimal';
+        solver_stats['solution_status'] tells a proven optimum from an incumbent.
+    """
+    start = time.perf_counter()
+    if model.A.shape[1] == 0:
+        model.solution = np.empty(0)
+        model.objective_value = 0.0
+        model.solver_stats = {'engine': 'highs', 'status': 'Optimal', 'solution_status': SOLUTION_OPTIMAL,
+                              'objective': 0.0, 'best_bound': 0.0, 'gap': 0.0, 'node_count': 0,
+                              'wall_time_seconds': time.perf_counter() - start}
+        return 'Optimal'
+
+    constraints = [LinearConstraint(model.A, -np.inf, model.row_ub)] if model.A.shape[0] else []
+    result = milp(c=-model.objective, # milp minimizes
+                  constraints=constraints,
+                  integrality=model.integrality,
+                  bounds=Bounds(model.lb, model.ub),
+                  options=options or {})
+    wall_time = time.perf_counter() - start
+
+    status_string = MILP_STATUS.get(result.status, 'Undefined')
+    if result.x is not None:
+        model.solution = result.x
+        model.objective_value = -result.fun
+
+    if result.status == 0:
+        solution_status = SOLUTION_OPTIMAL
+    elif result.x is not None:
+        # Stopped on a time/node limit with an incumbent: reported like PuLP does for CBC
+        # ('Optimal' status, 'Solution Found' tag) so both engines share the same contract.
+        solution_status = SOLUTION_FEASIBLE
+        status_string = 'Optimal'
+    elif result.status == 2:
+        solution_status = SOLUTION_INFEASIBLE
+    elif result.status == 3:
+        solution_status = SOLUTION_UNBOUNDED
+    else:
+        solution_status = SOLUTION_NONE
+    dual_bound = getattr(result, 'mip_dual_bound', None)
+    mip_gap = getattr(result, 'mip_gap', None)
+    node_count = getattr(result, 'mip_node_count', None)
+    if result.status == 0 and dual_bound is None: # Pure LP: no branch-and-bound
+        dual_bound, mip_gap, node_count = result.fun, 0.0, 0
+    model.solver_stats = { # Plain Python numbers so the stats can be serialized as JSON
+        'engine': 'highs',
+        'status': status_string,
+        'solution_status': solution_status,
+        'objective': float(model.objective_value) if model.objective_value is not None else None,
+        'best_bound': -float(dual_bound) if dual_bound is not None else None,
+        'gap': float(mip_gap) if mip_gap is not None else None,
+        'node_count': int(node_count) if node_count is not None else None,
+        'wall_time_seconds': wall_time,
+    }
+    return status_string
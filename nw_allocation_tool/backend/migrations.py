@@ -0,0 +1,76 @@
+from sqlalchemy import inspect, text
+from backend.models import db, Allocation
+
+# Indexes of backend/models.py added after the first schema (created by 0002 on existing databases)
+QUERY_INDEXES = (
+    'ix_inventory_country_status',
+    'ix_inventory_status',
+    'ix_inventory_expiry_date',
+    'ix_inventory_product_id',
+    'ix_channel_channel_type',
+    'ix_channel_country_channel_type',
+    'ix_allocation_product_id',
+    'ix_allocation_channel_id_allocation_date',
+    'ix_allocation_allocation_date',
+    'ix_allocation_run_id',
+    'ix_allocation_job_status_created_at',
+)
+
+
+def _model_indexes(names=QUERY_INDEXES) -> list:
+    """Index objects declared on the models, by name."""
+    indexes = {index.name: index for table in db.metadata.sorted_tables for index in table.indexes}
+    return [indexes[name] for name in names]
+
+
+def _add_allocation_run_id(connection):
+    """0001: Allocation.run_id (AllocationRun header) on tables created before the header existed."""
+    columns = {column['name'] for column in inspect(connection).get_columns(Allocation.__tablename__)}
+    if 'run_id' not in columns:
+        connection.execute(text(f"ALTER TABLE {Allocation.__tablename__} ADD COLUMN run_id INTEGER REFERENCES allocation_run (id)"))
+
+
+def _create_query_indexes(connection):
+    """0002: indexes of the hot filters and joins (main.py routes, data_loader, allocation_store, jobs)."""
+    for index in _model_indexes():
+        index.create(connection, checkfirst=True)
+
+
+MIGRATIONS = (
+    ('0001_allocation_run_id', _add_allocation_run_id),
+    ('0002_query_indexes', _create_query_indexes),
+)
+
+
+def upgrade(engine=None) -> list:
+    """
+    Creates the missing tables, then applies the migrations not yet recorded in schema_migrations.
+
+    Every step is idempotent, so databases created by an earlier db.create_all() are upgraded in place.
+
+    Returns:
+        Names of the migrations applied by this call.
+    """
+    engine = engine or db.engine
+    db.metadata.create_all(engine) # New tables (AllocationRun, ...); existing tables are left as they are
+    applied = []
+    with engine.begin() as connection:
+        connection.execute(text("CREATE TABLE IF NOT EXISTS schema_migrations (name VARCHAR(100) PRIMARY KEY)"))
+        done = {row[0] for row in connection.execute(text("SELECT name FROM schema_migrations"))}
+        for name, migrate in MIGRATIONS:
+            if name in done:
+                continue
+            migrate(connection)
+            connection.execute(text("INSERT INTO schema_migrations (name) VALUES (:name)"), {'name': name})
+            applied.append(name)
+    return applied
+
+
+def drop_query_indexes(engine=None):
+    """Reverts 0002 (drops the query indexes and forgets the migration), e.g. to compare query plans."""
+    engine = engine or db.engine
+    with engine.begin() as connection:
+        for index in _model_indexes():
+            index.drop(connection, checkfirst=True)
+        connection.execute(text("CREATE TABLE IF NOT EXISTS schema_migrations (name VARCHAR(100) PRIMARY KEY)"))
+        connection.execute(text("DELETE FROM schema_migrations WHERE name = '0002_query_indexes'"))
@@ -1,91 +1,310 @@
-import pandas as pd
-from pulp import *
-# Import the function and necessary schema/classes
-from .solver import optimize_allocation # Use relative import
-from .schemas import OptimizationParameters # Use relative import
-
-# --- Create Sample Data to Build the Model ---
-# (You can reuse the sample data from allocation_service.py or define specific data here)
-sample_products = pd.DataFrame({
-    'sku': ['SKU001', 'SKU002', 'SKU003', 'SKU004'],
-    'donation_eligible': [True, False, True, True],
-    'brand': ['BrandA', 'BrandA', 'BrandB', 'BrandC']
-}).set_index('sku')
-
-sample_channels = pd.DataFrame({
-    'id': ['STORE1', 'OUTLET1', 'DONATE1', 'STORE2'],
-    'capacity': [100, 200, 50, 80],
-    'min_coverage': [0.5, 0.0, 0.0, 0.6],
-    'channel_type': ['store', 'outlet', 'donation', 'store']
-}).set_index('id')
-
-sample_inventory = pd.DataFrame({
-    'product_sku': ['SKU001', 'SKU002', 'SKU003', 'SKU004', 'SKU001'],
-    'quantity': [50, 30, 40, 60, 20] # SKU001 has 70 total
-})
-
-sample_demand = {
-    ('SKU001', 'STORE1'): 40, ('SKU002', 'STORE1'): 20,
-    ('SKU003', 'OUTLET1'): 50,
-    ('SKU001', 'STORE2'): 30, ('SKU004', 'STORE2'): 50,
-}
-
-sample_revenue = {
-    ('SKU001', 'STORE1'): 10, ('SKU002', 'STORE1'): 12,
-    ('SKU003', 'OUTLET1'): 5,
-    ('SKU001', 'DONATE1'): 0, ('SKU003', 'DONATE1'): 0, ('SKU004', 'DONATE1'): 0,
-    ('SKU001', 'STORE2'): 11, ('SKU004', 'STORE2'): 9,
-}
-
-# Use default parameters for generating the model structure
-params = OptimizationParameters(
-    default_min_coverage=None,
-    min_skus_per_store=None,
-    restricted_brands_for_donation=None
-)
-
-# --- Call the function to get the model object ---
-# The function now returns (model, status, results)
-try:
-    model, status, results = optimize_allocation(
-        sample_products, sample_channels, sample_inventory,
-        sample_demand, sample_revenue, params
-    )
-
-    # --- Generate Markdown Summary ---
-    with open("model_summary.md", "w") as f:
-        f.write("# Model Summary\n\n")
-        f.write(f"Generated for model: {model.name}\n")
-        f.write(f"Status after solve (using sample data): {status}\n\n")
-
-        if model.objective:
-            f.write("## Objective Function\n\n")
-            f.write(f"{model.objective}\n\n")
-        else:
-            f.write("## Objective Function\n\n")
-            f.write("No objective function defined.\n\n")
-
-        f.write("## Decision Variables\n\n")
-        if model.variables():
-            for v in model.variables():
-                f.write(f"- {v.name}: ")
-                if v.lowBound is not None:
-                    f.write(f"{v.lowBound} <= ")
-                f.write(f"{v} ")
-                if v.upBound is not None:
-                    f.write(f"<= {v.upBound}")
-                f.write("\n")
-        else:
-            f.write("No decision variables defined.\n\n")
-
-        f.write("\n## Constraints\n\n")
-        if model.constraints:
-            for name, c in model.constraints.items():
-                f.write(f"- {name}: {c}\n")
-        else:
-            f.write("No constraints defined.\n\n")
-
-    print("Model summary written to model_summary.md")
-
-except Exception as e:  # Handle potential errors (e.g., file writing issues)
-    print(f"An error occurred: {e}")
+"""
+Aggregated summary of an allocation model and its output, for eyeballing models of any size.
+
+Streams once over the formulation (PuLP constraints for CBC, CSR rows for HiGHS) and reports,
+per constraint family, the row and non-zero counts, the coefficient range, an RHS histogram by
+decade and a bounded sample of rows; per variable group, the counts, bounds and objective
+ranges. Engines that keep no formulation (greedy, decomposed, cached runs) are summarized from
+their run report. Memory is bounded by the number of families, never by the model size.
+
+Usage:
+    python backend/model_summary_generator.py --products 1000 --channels 100 --engine highs --output model_summary.md
+"""
+import argparse
+import math
+import sys
+import numpy as np
+import pulp
+
+# Constraint families of the allocation model (name prefixes of the PuLP rows, MatrixModel.row_families)
+FAMILIES = ('Supply_Product', 'Capacity_Channel', 'Outlet_Capacity_SKU', 'Outlet_Assortment', 'Link_x_y')
+SENSES = {pulp.LpConstraintLE: '<=', pulp.LpConstraintGE: '>=', pulp.LpConstraintEQ: '='}
+SAMPLE_TERMS = 4 # Terms shown per sample row
+
+
+def constraint_family(name: str) -> str:
+    for family in FAMILIES:
+        if name.startswith(family):
+            return family
+    return 'Other'
+
+
+def _decade(value: float):
+    """Histogram bucket of an RHS: '<0', '0' or the decade exponent k of [10^k, 10^(k+1))."""
+    if value < 0:
+        return '<0'
+    if value == 0:
+        return '0'
+    return math.floor(math.log10(value))
+
+
+def _bucket_order(bucket) -> tuple:
+    return (0, 0) if bucket == '<0' else (1, 0) if bucket == '0' else (2, bucket)
+
+
+def _bucket_label(bucket) -> str:
+    return bucket if isinstance(bucket, str) else f"[1e{bucket}, 1e{bucket + 1})"
+
+
+def _row_text(name: str, terms: list, num_terms: int, sense: str, rhs: float) -> str:
+    """'name: 1 a + 1 b + ... (n terms) <= rhs' with at most SAMPLE_TERMS terms."""
+    text = ' + '.join(f"{coefficient:g} {variable}" for variable, coefficient in terms[:SAMPLE_TERMS])
+    if num_terms > SAMPLE_TERMS:
+        text += f" + ... ({num_terms} terms)"
+    return f"{name}: {text or '0'} {sense} {rhs:g}"
+
+
+class _FamilyStats:
+    """Running statistics of one constraint family (constant memory)."""
+
+    def __init__(self, sample_rows: int):
+        self.sample_rows = sample_rows
+        self.rows = 0
+        self.nonzeros = 0
+        self.coefficient_range = [math.inf, -math.inf] # |coefficient|
+        self.rhs_range = [math.inf, -math.inf]
+        self.rhs_histogram = {}
+        self.samples = []
+
+    def add_rows(self, rhs: np.ndarray, nonzeros: int, abs_coefficients: np.ndarray):
+        """Adds a block of rows (vectorized path)."""
+        self.rows += len(rhs)
+        self.nonzeros += nonzeros
+        if len(abs_coefficients):
+            self.coefficient_range = [min(self.coefficient_range[0], float(abs_coefficients.min())),
+                                      max(self.coefficient_range[1], float(abs_coefficients.max()))]
+        if len(rhs):
+            self.rhs_range = [min(self.rhs_range[0], float(rhs.min())), max(self.rhs_range[1], float(rhs.max()))]
+            negative, zero = int((rhs < 0).sum()), int((rhs == 0).sum())
+            for bucket, count in (('<0', negative), ('0', zero)):
+                if count:
+                    self.rhs_histogram[bucket] = self.rhs_histogram.get(bucket, 0) + count
+            exponents, counts = np.unique(np.floor(np.log10(rhs[rhs > 0])).astype(np.int64), return_counts=True)
+            for exponent, count in zip(exponents.tolist(), counts.tolist()):
+                self.rhs_histogram[exponent] = self.rhs_histogram.get(exponent, 0) + count
+
+    def add_row(self, rhs: float, abs_coefficients, sample):
+        """Adds one row (streaming path); sample is a callable rendering the row, only called when kept."""
+        self.rows += 1
+        for value in abs_coefficients:
+            self.nonzeros += 1
+            if value < self.coefficient_range[0]:
+                self.coefficient_range[0] = value
+            if value > self.coefficient_range[1]:
+                self.coefficient_range[1] = value
+        self.rhs_range = [min(self.rhs_range[0], rhs), max(self.rhs_range[1], rhs)]
+        bucket = _decade(rhs)
+        self.rhs_histogram[bucket] = self.rhs_histogram.get(bucket, 0) + 1
+        if len(self.samples) < self.sample_rows:
+            self.samples.append(sample())
+
+    def result(self) -> dict:
+        return {
+            'rows': self.rows,
+            'nonzeros': self.nonzeros,
+            'coefficient_range': None if self.coefficient_range[0] == math.inf else self.coefficient_range,
+            'rhs_range': None if self.rhs_range[0] == math.inf else self.rhs_range,
+            'rhs_histogram': {_bucket_label(bucket): self.rhs_histogram[bucket]
+                              for bucket in sorted(self.rhs_histogram, key=_bucket_order)},
+            'samples': self.samples,
+        }
+
+
+def _range(values: np.ndarray):
+    finite = values[np.isfinite(values)]
+    return [float(finite.min()), float(finite.max())] if len(finite) else None
+
+
+def _widen(value_range, value: float):
+    """Running [min, max] of the finite values (None until the first one)."""
+    if not math.isfinite(value):
+        return value_range
+    if value_range is None:
+        return [value, value]
+    return [min(value_range[0], value), max(value_range[1], value)]
+
+
+def _variable_group(count: int, integer: int, binary: int, lower_range, upper_range, objective_range,
+                    unbounded_above: int) -> dict:
+    return {'count': count, 'continuous': count - integer, 'integer': integer - binary, 'binary': binary,
+            'lower_range': lower_range, 'upper_range': upper_range, 'objective_range': objective_range,
+            'unbounded_above': unbounded_above}
+
+
+# --- Formulations ---
+
+def _summarize_pulp(model: pulp.LpProblem, sample_rows: int) -> tuple:
+    """One pass over the variables and one over the constraints of a PuLP model."""
+    objective = dict(model.objective.items()) if model.objective is not None else {}
+    groups = {} # group -> [count, integer, binary, lower range, upper range, objective range, unbounded above]
+    for variable in model.variables():
+        group = groups.setdefault(variable.name.split('_(')[0], [0, 0, 0, None, None, None, 0])
+        low = -math.inf if variable.lowBound is None else variable.lowBound
+        up = math.inf if variable.upBound is None else variable.upBound
+        group[0] += 1
+        if variable.cat == pulp.LpInteger:
+            group[1] += 1
+            group[2] += int(low >= 0 and up <= 1)
+        group[3] = _widen(group[3], low)
+        group[4] = _widen(group[4], up)
+        group[5] = _widen(group[5], objective.get(variable, 0.0))
+        group[6] += int(up == math.inf)
+    variables = {name: _variable_group(*group) for name, group in groups.items()}
+
+    families = {}
+    for name, constraint in model.constraints.items():
+        stats = families.setdefault(constraint_family(name), _FamilyStats(sample_rows))
+        rhs = -constraint.constant + 0.0 # No -0
+        stats.add_row(rhs, (abs(coefficient) for coefficient in constraint.values() if coefficient),
+                      lambda: _row_text(name, [(variable.name, coefficient) for variable, coefficient in
+                                               list(constraint.items())[:SAMPLE_TERMS]],
+                                        len(constraint), SENSES.get(constraint.sense, '?'), rhs))
+    return variables, {family: stats.result() for family, stats in families.items()}
+
+
+def _summarize_matrix(model, sample_rows: int) -> tuple:
+    """Vectorized pass over the CSR rows of a MatrixModel, one family slice at a time."""
+    n = model.num_pairs
+    variables = {}
+    for name, columns in (('allocation_qty', slice(0, n)), ('is_allocated', slice(n, len(model.objective)))):
+        integrality = model.integrality[columns]
+        if not len(integrality):
+            continue
+        lower, upper = model.lb[columns], model.ub[columns]
+        integer = integrality.astype(bool)
+        variables[name] = _variable_group(len(integrality), int(integer.sum()),
+                                          int((integer & (lower >= 0) & (upper <= 1)).sum()),
+                                          _range(lower), _range(upper), _range(model.objective[columns]),
+                                          int(np.isinf(upper).sum()))
+
+    def column_name(j: int) -> str:
+        return f"x[{j}]" if j < n else f"y[{j - n}]"
+
+    families = {}
+    A = model.A
+    for family, first, last in model.row_families:
+        stats = families.setdefault(family, _FamilyStats(sample_rows))
+        start, end = A.indptr[first], A.indptr[last]
+        stats.add_rows(model.row_ub[first:last], int(end - start), np.abs(A.data[start:end]))
+        for row in range(first, min(last, first + sample_rows - len(stats.samples))):
+            row_start, row_end = A.indptr[row], A.indptr[row + 1]
+            terms = [(column_name(j), value) for j, value in
+                     zip(A.indices[row_start:row_start + SAMPLE_TERMS].tolist(), A.data[row_start:row_start + SAMPLE_TERMS].tolist())]
+            stats.samples.append(_row_text(f"{family}_{row - first}", terms, int(row_end - row_start), '<=', float(model.row_ub[row])))
+    return variables, {family: stats.result() for family, stats in families.items()}
+
+
+def _summarize_output(allocations: list) -> dict:
+    quantities = np.fromiter((allocation['quantity'] for allocation in allocations), dtype=np.int64, count=len(allocations))
+    return {
+        'allocations': len(allocations),
+        'units': int(quantities.sum()),
+        'products': len({allocation['product_sku'] for allocation in allocations}),
+        'channels': len({allocation['channel_id'] for allocation in allocations}),
+        'quantity_range': [int(quantities.min()), int(quantities.max())] if len(quantities) else None,
+        'quantity_median': float(np.median(quantities)) if len(quantities) else None,
+    }
+
+
+def summarize_model(model, allocations: list = None, sample_rows: int = 3) -> dict:
+    """
+    Aggregated summary of the model returned by optimize_allocation, for any engine.
+
+    Args:
+        model: pulp.LpProblem (CBC), MatrixModel (HiGHS), or a model without formulation
+               (HeuristicModel, DecomposedModel, CachedModel).
+        allocations: Optional allocation results of the run (summarized as 'output').
+        sample_rows: Example rows kept per constraint family.
+
+    Returns:
+        Dictionary with 'name', 'source' ('formulation', 'run_report' or None), 'solver_stats',
+        'variables' {group: counts and ranges}, 'constraints' {family: {'rows', 'nonzeros',
+        'coefficient_range', 'rhs_range', 'rhs_histogram', 'samples'}} and 'output'.
+    """
+    summary = {'name': getattr(model, 'name', None), 'source': None,
+               'solver_stats': getattr(model, 'solver_stats', None), 'variables': {}, 'constraints': {}}
+    if isinstance(model, pulp.LpProblem):
+        summary['variables'], summary['constraints'] = _summarize_pulp(model, sample_rows)
+        summary['source'] = 'formulation'
+    elif getattr(model, 'A', None) is not None:
+        summary['variables'], summary['constraints'] = _summarize_matrix(model, sample_rows)
+        summary['source'] = 'formulation'
+    elif (getattr(model, 'run_report', None) or {}).get('model_size'):
+        size = model.run_report['model_size']
+        n = size['variables'] - size['binaries']
+        summary['variables'] = {'allocation_qty': {'count': n}, 'is_allocated': {'count': size['binaries'], 'binary': size['binaries']}}
+        summary['constraints'] = {family: dict(counts) for family, counts in size['families'].items() if counts['rows']}
+        summary['source'] = 'run_report'
+    if allocations is not None:
+        summary['output'] = _summarize_output(allocations)
+    return summary
+
+
+# --- Markdown ---
+
+def _format_range(values) -> str:
+    return '-' if values is None else f"{values[0]:g} .. {values[1]:g}"
+
+
+def write_markdown(summary: dict, file):
+    """Writes a summary as Markdown tables to an open text file, line by line."""
+    file.write(f"# Model Summary\n\nModel: {summary['name']}\n\n")
+    stats = summary.get('solver_stats') or {}
+    if stats:
+        file.write(f"Engine: {stats.get('engine')}, status: {stats.get('status')}, objective: {stats.get('objective')}, "
+                   f"gap: {stats.get('gap')}, wall time: {stats.get('wall_time_seconds')} s\n\n")
+    if summary['source'] is None:
+        file.write("No formulation or run report available for this model.\n\n")
+    elif summary['source'] == 'run_report':
+        file.write("The engine keeps no formulation: counts from the run report only.\n\n")
+
+    file.write("## Variables\n\n| Group | Count | Continuous | Integer | Binary | Lower | Upper | Objective |\n"
+               "|---|---|---|---|---|---|---|---|\n")
+    for name, group in summary['variables'].items():
+        file.write(f"| {name} | {group['count']} | {group.get('continuous', '-')} | {group.get('integer', '-')} | "
+                   f"{group.get('binary', '-')} | {_format_range(group.get('lower_range'))} | "
+                   f"{_format_range(group.get('upper_range'))} | {_format_range(group.get('objective_range'))} |\n")
+
+    file.write("\n## Constraints\n\n| Family | Rows | Non-zeros | abs(coefficient) | RHS |\n|---|---|---|---|---|\n")
+    for family, counts in summary['constraints'].items():
+        file.write(f"| {family} | {counts['rows']} | {counts['nonzeros']} | {_format_range(counts.get('coefficient_range'))} | "
+                   f"{_format_range(counts.get('rhs_range'))} |\n")
+    for family, counts in summary['constraints'].items():
+        if not counts.get('rhs_histogram'):
+            continue
+        file.write(f"\n### {family}\n\nRHS histogram: "
+                   + ', '.join(f"{bucket}: {count}" for bucket, count in counts['rhs_histogram'].items()) + "\n\n")
+        for sample in counts['samples']:
+            file.write(f"- `{sample}`\n")
+
+    output = summary.get('output')
+    if output is not None:
+        file.write(f"\n## Output\n\n{output['allocations']} allocations, {output['units']} units, "
+                   f"{output['products']} SKUs, {output['channels']} channels; quantity "
+                   f"{_format_range(output['quantity_range'])} (median {output['quantity_median']})\n")
+
+
+def main(argv=None) -> int:
+    from instance_generator import generate_instance
+    from solver import ENGINES, optimize_allocation
+
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--products', type=int, default=200)
+    parser.add_argument('--channels', type=int, default=20)
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--engine', default='highs', choices=ENGINES)
+    parser.add_argument('--sample-rows', type=int, default=3, help="Example rows per constraint family")
+    parser.add_argument('--output', default='model_summary.md')
+    args = parser.parse_args(argv)
+
+    instance = generate_instance(args.products, args.channels, seed=args.seed)
+    model, status, allocations = optimize_allocation(**instance, engine=args.engine)
+    summary = summarize_model(model, allocations, sample_rows=args.sample_rows)
+    with open(args.output, 'w') as file:
+        write_markdown(summary, file)
+    print(f"Model summary written to {args.output}")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
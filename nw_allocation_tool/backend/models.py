@@ -42,6 +42,12 @@ class Inventory(db.Model):
     country = db.Column(db.String(50))
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
     updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+    __table_args__ = (
+        db.Index('ix_inventory_country_status', 'country', 'status'),  # Scoped allocation loads
+        db.Index('ix_inventory_status', 'status'),  # Dashboard status counts
+        db.Index('ix_inventory_expiry_date', 'expiry_date'),  # Dashboard expiring soon
+        db.Index('ix_inventory_product_id', 'product_id'),  # Join to product, stocked_only filter
+    )
 
     def to_dict(self):
         return {
@@ -53,6 +59,14 @@ class Inventory(db.Model):
             'country': self.country
         }
 
+class InventorySummary(db.Model):
+    """Inventory row counts per (status, expiry day), maintained on inventory writes (see backend/dashboard.py)."""
+    id = db.Column(db.Integer, primary_key=True)
+    status = db.Column(db.String(20))
+    expiry_day = db.Column(db.Date)  # NULL = no expiry date
+    item_count = db.Column(db.Integer, default=0, nullable=False)
+    __table_args__ = (db.UniqueConstraint('status', 'expiry_day', name='uq_inventory_summary_status_day'),)
+
 class Channel(db.Model):
     id = db.Column(db.Integer, primary_key=True)
     name = db.Column(db.String(100))
@@ -61,6 +75,10 @@ class Channel(db.Model):
     capacity = db.Column(db.Integer)
     min_coverage = db.Column(db.Integer)
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    __table_args__ = (
+        db.Index('ix_channel_channel_type', 'channel_type'),  # Channel type filters (secondlife, scoped loads)
+        db.Index('ix_channel_country_channel_type', 'country', 'channel_type'),
+    )
 
     def to_dict(self):
         return {
@@ -72,20 +90,85 @@ class Channel(db.Model):
             'min_coverage': self.min_coverage
         }
 
+class AllocationRun(db.Model):
+    id = db.Column(db.Integer, primary_key=True)
+    parameters_hash = db.Column(db.String(64))  # SHA-256 of the OptimizationParameters JSON
+    engine = db.Column(db.String(20))
+    status = db.Column(db.String(20))  # PuLP status string of the solve
+    solution_status = db.Column(db.String(40))
+    objective = db.Column(db.Float)
+    best_bound = db.Column(db.Float)
+    gap = db.Column(db.Float)
+    solve_seconds = db.Column(db.Float)
+    persist_seconds = db.Column(db.Float)
+    row_count = db.Column(db.Integer)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+
+    def to_dict(self):
+        return {
+            'run_id': self.id,
+            'parameters_hash': self.parameters_hash,
+            'engine': self.engine,
+            'status': self.status,
+            'solution_status': self.solution_status,
+            'objective': self.objective,
+            'best_bound': self.best_bound,
+            'gap': self.gap,
+            'solve_seconds': self.solve_seconds,
+            'persist_seconds': self.persist_seconds,
+            'row_count': self.row_count,
+            'created_at': self.created_at
+        }
+
 class Allocation(db.Model):
     id = db.Column(db.Integer, primary_key=True)
+    run_id = db.Column(db.Integer, db.ForeignKey('allocation_run.id', ondelete='CASCADE'), index=True)
     product_id = db.Column(db.Integer, db.ForeignKey('product.id'))
     channel_id = db.Column(db.Integer, db.ForeignKey('channel.id'))
     quantity = db.Column(db.Integer)
     allocation_date = db.Column(db.DateTime, default=datetime.utcnow)
     status = db.Column(db.String(20), default='pending')  # pending, completed, cancelled
+    __table_args__ = (
+        db.Index('ix_allocation_product_id', 'product_id'),
+        db.Index('ix_allocation_channel_id_allocation_date', 'channel_id', 'allocation_date'),  # Channel history
+        db.Index('ix_allocation_allocation_date', 'allocation_date'),  # Latest run of rows without header
+    )
     
     def to_dict(self):
         return {
             'id': self.id,
+            'run_id': self.run_id,
             'product_id': self.product_id,
             'channel_id': self.channel_id,
             'quantity': self.quantity,
             'allocation_date': self.allocation_date,
             'status': self.status
         }
+
+class AllocationJob(db.Model):
+    id = db.Column(db.String(32), primary_key=True)  # uuid4 hex
+    status = db.Column(db.String(20), default='queued')  # queued, building, solving, done, failed, cancelling, cancelled
+    progress = db.Column(db.Float, default=0.0)  # Share of the solve done (decomposed batches), 1.0 when done
+    request_payload = db.Column(db.Text)  # JSON body of the submit request
+    result = db.Column(db.Text)  # JSON {'status', 'allocations', 'solver_stats'} once done
+    error = db.Column(db.Text)
+    worker_pid = db.Column(db.Integer)
+    submitted_by = db.Column(db.String(80))
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    started_at = db.Column(db.DateTime)
+    finished_at = db.Column(db.DateTime)
+    __table_args__ = (
+        db.Index('ix_allocation_job_status_created_at', 'status', 'created_at'),  # Oldest queued job claim
+    )
+
+    def to_dict(self):
+        return {
+            'job_id': self.id,
+            'status': self.status,
+            'progress': self.progress,
+            'error': self.error,
+            'submitted_by': self.submitted_by,
+            'created_at': self.created_at,
+            'started_at': self.started_at,
+            'finished_at': self.finished_at
+        }
@@ -0,0 +1,93 @@
+import numpy as np
+import pandas as pd
+
+ABC_CLASSES = ('A', 'B', 'C')
+
+CAPACITY_GROUP_COLUMNS = ('division', 'axe')
+ASSORTMENT_GROUP_COLUMNS = ('metier', 'subaxis', 'brand')
+
+
+def _missing_mask(products_df: pd.DataFrame, columns) -> np.ndarray:
+    """True for rows where any of the columns is absent, null or an empty string."""
+    missing = np.zeros(len(products_df), dtype=bool)
+    for column in columns:
+        if column not in products_df.columns:
+            return np.ones(len(products_df), dtype=bool)
+        values = products_df[column]
+        missing |= (values.isna() | (values.astype(str) == '')).to_numpy()
+    return missing
+
+
+def _encode_group(products_df: pd.DataFrame, columns):
+    """
+    Integer-codes the products by a tuple of attribute columns.
+
+    Returns:
+        Tuple: (group_id, group_keys)
+               group_id: int array aligned with products_df, -1 when an attribute is missing.
+               group_keys: list of attribute tuples, group_keys[g] is the key of group g.
+    """
+    group_id = np.full(len(products_df), -1, dtype=np.int64)
+    valid = ~_missing_mask(products_df, columns)
+    if not valid.any():
+        return group_id, []
+
+    frame = products_df.loc[valid, list(columns)].astype(str)
+    codes, uniques = pd.MultiIndex.from_frame(frame).factorize()
+    group_id[valid] = codes
+    return group_id, list(uniques)
+
+
+def encode_product_attributes(products_df: pd.DataFrame) -> dict:
+    """
+    Columnar preprocessing of the product attributes used by the model builder.
+
+    Builds, in one pass over the columns, the ABC class codes and the integer-coded
+    outlet capacity (division, axe) and outlet assortment (metier, subaxis, brand) groups.
+
+    Args:
+        products_df: DataFrame indexed by SKU.
+
+    Returns:
+        Dictionary with:
+            'abc_code': int8 array, index into ABC_CLASSES or -1 when missing.
+            'capacity_group_id' / 'capacity_group_keys': (division, axe) coding, see _encode_group.
+            'assortment_group_id' / 'assortment_group_keys': (metier, subaxis, brand) coding.
+    """
+    if 'abc_class' in products_df.columns:
+        abc_code = pd.Categorical(products_df['abc_class'], categories=ABC_CLASSES).codes.astype(np.int8)
+    else:
+        abc_code = np.full(len(products_df), -1, dtype=np.int8)
+
+    capacity_group_id, capacity_group_keys = _encode_group(products_df, CAPACITY_GROUP_COLUMNS)
+    assortment_group_id, assortment_group_keys = _encode_group(products_df, ASSORTMENT_GROUP_COLUMNS)
+
+    return {
+        'abc_code': abc_code,
+        'capacity_group_id': capacity_group_id,
+        'capacity_group_keys': capacity_group_keys,
+        'assortment_group_id': assortment_group_id,
+        'assortment_group_keys': assortment_group_keys,
+    }
+
+
+def group_pairs(channel_idx: np.ndarray, pair_group_id: np.ndarray, mask: np.ndarray = None) -> dict:
+    """
+    Groups eligible pairs by (channel position, group id).
+
+    Args:
+        channel_idx: int array, channel position of each pair.
+        pair_group_id: int array, group id of each pair's product (-1 = no group).
+        mask: Optional boolean array restricting the pairs considered (e.g. outlet channels only).
+
+    Returns:
+        Dictionary {(channel position, group id): array of pair positions}, sorted by channel then group.
+    """
+    selected = pair_group_id >= 0
+    if mask is not None:
+        selected &= mask
+    positions = np.flatnonzero(selected)
+    if positions.size == 0:
+        return {}
+    frame = pd.DataFrame({'channel': channel_idx[positions], 'group': pair_group_id[positions]})
+    return {key: positions[rows] for key, rows in frame.groupby(['channel', 'group'], sort=True).indices.items()}
@@ -0,0 +1,141 @@
+"""
+Query plans of the hot queries before and after the 0002_query_indexes migration.
+
+Seeds a database (SQLite or PostgreSQL), drops the query indexes, records EXPLAIN output
+and timings of the queries issued by main.py, data_loader, allocation_store and jobs,
+re-applies the migration and records them again.
+
+Usage:
+    python -m backend.query_plan_benchmark --database-url sqlite:///data/instance/plan_benchmark.db --rows 200000
+"""
+import argparse
+import time
+from datetime import datetime, timedelta
+import numpy as np
+from sqlalchemy import create_engine, func, select
+from backend.models import db, Product, Inventory, Channel, Allocation, AllocationRun, AllocationJob
+from backend.migrations import upgrade, drop_query_indexes
+
+
+def seed(engine, rows: int, seed_value: int = 0):
+    """Fills an empty database with rows inventory rows and as many allocation rows."""
+    with engine.begin() as connection:
+        if connection.execute(select(func.count()).select_from(Inventory.__table__)).scalar():
+            return
+        rng = np.random.default_rng(seed_value)
+        num_products = max(rows // 10, 1)
+        now = datetime.now()
+        connection.execute(Product.__table__.insert(), [
+            {'item_id': f"SKU{i:07d}", 'brand': f"Brand{i % 40}", 'division': f"D{i % 4}", 'axe': f"Axe{i % 12}"}
+            for i in range(num_products)])
+        connection.execute(Channel.__table__.insert(), [
+            {'name': f"Channel {j}", 'channel_type': ('store', 'outlet', 'donation', 'secondlife')[j % 4],
+             'country': ('FR', 'DE', 'IT', 'ES')[j % 4], 'capacity': 1000} for j in range(200)])
+        product_ids = rng.integers(1, num_products + 1, rows)
+        expiry_days = rng.integers(0, 720, rows)
+        connection.execute(Inventory.__table__.insert(), [
+            {'product_id': int(product_ids[k]), 'quantity': int(k % 50),
+             'status': ('excess', 'obsolete', 'returned', 'ok', 'ok', 'ok', 'ok', 'ok')[k % 8],
+             'country': ('FR', 'DE', 'IT', 'ES', 'PL', 'NL', 'BE', 'PT')[k // 8 % 8],
+             'expiry_date': now + timedelta(days=int(expiry_days[k]))} for k in range(rows)])
+
+        num_runs = 20
+        run_ids = connection.execute(AllocationRun.__table__.insert().returning(AllocationRun.__table__.c.id),
+                                     [{'engine': 'cbc', 'row_count': rows // num_runs} for _ in range(num_runs)]).scalars().all()
+        connection.execute(Allocation.__table__.insert(), [
+            {'run_id': run_ids[k % num_runs], 'product_id': int(product_ids[k]), 'channel_id': k % 200 + 1,
+             'quantity': 1, 'allocation_date': now - timedelta(days=num_runs - k % num_runs)} for k in range(rows)])
+        connection.execute(AllocationJob.__table__.insert(), [
+            {'id': f"{i:032x}", 'status': 'done' if i % 100 else 'queued', 'created_at': now - timedelta(seconds=i)}
+            for i in range(rows // 10)])
+
+
+def hot_queries(now: datetime = None) -> dict:
+    """The filters and joins issued by the application, with representative parameters."""
+    now = now or datetime.now()
+    return {
+        'inventory_scope (data_loader)': select(Product.item_id, func.sum(Inventory.quantity))
+            .join(Product, Inventory.product_id == Product.id)
+            .where(Inventory.country == 'FR', Inventory.status.in_(['excess', 'obsolete']))
+            .group_by(Product.item_id),
+        'inventory_status (dashboard)': select(func.count()).select_from(Inventory).where(Inventory.status == 'excess'),
+        'inventory_expiring (dashboard)': select(func.count()).select_from(Inventory)
+            .where(Inventory.expiry_date <= now + timedelta(days=90)),
+        'channel_type (secondlife)': select(Channel.id).where(Channel.channel_type == 'secondlife'),
+        'allocation_latest_date (allocation_store)': select(func.max(Allocation.allocation_date)),
+        'allocation_run (allocation_store)': select(Allocation.product_id, Allocation.quantity).where(Allocation.run_id == 3),
+        'allocation_channel_history': select(Allocation.product_id, Allocation.quantity)
+            .where(Allocation.channel_id == 7, Allocation.allocation_date >= now - timedelta(days=5)),
+        'allocation_product': select(Allocation.channel_id).where(Allocation.product_id == 42),
+        'job_claim (jobs)': select(AllocationJob.id).where(AllocationJob.status == 'queued')
+            .order_by(AllocationJob.created_at).limit(1),
+    }
+
+
+def explain(connection, statement) -> list:
+    """EXPLAIN QUERY PLAN (SQLite) / EXPLAIN (PostgreSQL) lines of a select."""
+    compiled = statement.compile(dialect=connection.dialect, compile_kwargs={'render_postcompile': True})
+    if connection.dialect.name == 'sqlite':
+        params = tuple(compiled.params[name] for name in compiled.positiontup)
+        rows = connection.exec_driver_sql(f"EXPLAIN QUERY PLAN {compiled}", params).all()
+        return [row[-1] for row in rows]
+    rows = connection.exec_driver_sql(f"EXPLAIN {compiled}", compiled.params).all()
+    return [row[0] for row in rows]
+
+
+def uses_index(plan: list) -> bool:
+    """True when no step of the plan scans a whole table."""
+    for line in plan:
+        if line.startswith(('SCAN', 'SEARCH')) and 'USING' not in line and 'CONSTANT ROW' not in line: # SQLite
+            return False
+        if 'Seq Scan' in line: # PostgreSQL
+            return False
+    return True
+
+
+def measure(engine, repeat: int = 5) -> dict:
+    """Plan and best-of-repeat time in ms per hot query."""
+    results = {}
+    with engine.connect() as connection:
+        for name, statement in hot_queries().items():
+            plan = explain(connection, statement)
+            timings = []
+            for _ in range(repeat):
+                start = time.perf_counter()
+                connection.execute(statement).all()
+                timings.append((time.perf_counter() - start) * 1000)
+            results[name] = {'plan': plan, 'indexed': uses_index(plan), 'ms': min(timings)}
+    return results
+
+
+def run(database_url: str, rows: int) -> dict:
+    engine = create_engine(database_url)
+    upgrade(engine)
+    seed(engine, rows)
+    drop_query_indexes(engine)
+    with engine.begin() as connection:
+        connection.exec_driver_sql('ANALYZE')
+    before = measure(engine)
+    upgrade(engine)
+    with engine.begin() as connection:
+        connection.exec_driver_sql('ANALYZE')
+    after = measure(engine)
+    return {name: (before[name], after[name]) for name in before}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--database-url', default='sqlite:///data/instance/plan_benchmark.db')
+    parser.add_argument('--rows', type=int, default=200000)
+    args = parser.parse_args()
+
+    for name, (before, after) in run(args.database_url, args.rows).items():
+        print(f"{name}: {before['ms']:.1f} ms -> {after['ms']:.1f} ms")
+        for label, result in (('before', before), ('after', after)):
+            print(f"  {label} ({'index' if result['indexed'] else 'seq scan'}):")
+            for line in result['plan']:
+                print(f"    {line}")
+
+
+if __name__ == '__main__':
+    main()
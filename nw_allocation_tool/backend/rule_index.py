@@ -0,0 +1,175 @@
+import numpy as np
+import pandas as pd
+from preprocessing import ABC_CLASSES
+
+WILDCARD = '*'
+
+# Specificity of the channel key of a rule: an explicit channel beats a channel-type default,
+# which beats a rule for every channel
+CHANNEL_ID_LEVEL, CHANNEL_TYPE_LEVEL, ANY_CHANNEL_LEVEL = 2, 1, 0
+
+
+def _channel_selector(rule, channel_pos: dict, channels_by_type: dict):
+    """(level, channel codes or None = every channel) of a channel-keyed rule."""
+    if rule.channel_id != WILDCARD:
+        j = channel_pos.get(rule.channel_id)
+        return CHANNEL_ID_LEVEL, np.array([] if j is None else [j], dtype=np.int64)
+    if getattr(rule, 'channel_type', None):
+        return CHANNEL_TYPE_LEVEL, channels_by_type.get(rule.channel_type, np.empty(0, dtype=np.int64))
+    return ANY_CHANNEL_LEVEL, None
+
+
+def _group_selector(values: tuple, group_pos: dict, key_columns: np.ndarray):
+    """(number of explicit fields, group codes or None = every group) of an attribute key with wildcards."""
+    explicit = [f for f, value in enumerate(values) if value != WILDCARD]
+    if len(explicit) == len(values):
+        g = group_pos.get(values)
+        return len(explicit), np.array([] if g is None else [g], dtype=np.int64)
+    if not explicit:
+        return 0, None
+    mask = np.ones(key_columns.shape[1], dtype=bool)
+    for f in explicit:
+        mask &= key_columns[f] == values[f]
+    return len(explicit), np.flatnonzero(mask)
+
+
+def _key_columns(group_keys: list, n_fields: int) -> np.ndarray:
+    """Attribute tuples of the groups as an object array of shape (n_fields, n_groups)."""
+    columns = np.empty((n_fields, len(group_keys)), dtype=object)
+    for g, key in enumerate(group_keys):
+        columns[:, g] = key
+    return columns
+
+
+def _apply_rules(table: np.ndarray, selectors: list, values: list):
+    """
+    Writes the rule values into a dense table, least specific rules first.
+
+    Args:
+        table: Array to fill (NaN = no rule), one axis per rule key.
+        selectors: Per rule (level, [codes or None per axis]); level is a tuple compared lexicographically.
+        values: Per rule value.
+
+    Rules are written by increasing level, so a more specific rule overwrites a general one and,
+    among equally specific rules, the later one wins. The rules of the highest level are written
+    last by one scatter (the bulk of a rule file) when each of them is a single cell; a lower
+    level rule hitting a single cell (a channel type with one channel) keeps its place in the order.
+    """
+    rules = [r for r, (_, axes) in enumerate(selectors) if all(codes is None or len(codes) for codes in axes)]
+    top_level = max((selectors[r][0] for r in rules), default=None)
+    top = [r for r in rules if selectors[r][0] == top_level]
+    exact = top if all(codes is not None and len(codes) == 1 for r in top for codes in selectors[r][1]) else []
+    exact_set = set(exact)
+    general = sorted((r for r in rules if r not in exact_set), key=lambda r: selectors[r][0])
+    for r in general:
+        _, axes = selectors[r]
+        table[np.ix_(*[np.arange(size) if codes is None else codes for codes, size in zip(axes, table.shape)])] = values[r]
+
+    if exact:
+        flat = np.ravel_multi_index(tuple(np.array([selectors[r][1][axis][0] for r in exact], dtype=np.int64)
+                                          for axis in range(table.ndim)), table.shape)
+        _, last = np.unique(flat[::-1], return_index=True) # Later duplicates win
+        keep = len(flat) - 1 - last
+        table.flat[flat[keep]] = np.asarray(values, dtype=float)[np.asarray(exact)[keep]]
+    return table
+
+
+def compile_coverage_days(channels: pd.Index, channel_types: np.ndarray, coverage_days_rules) -> np.ndarray:
+    """
+    Dense (channel, ABC class) lookup of coverage days.
+
+    Returns:
+        Float array of shape (len(channels), len(ABC_CLASSES)), NaN where no rule applies.
+    """
+    table = np.full((len(channels), len(ABC_CLASSES)), np.nan)
+    if not coverage_days_rules:
+        return table
+    channel_pos, channels_by_type = _channel_lookups(channels, channel_types)
+    selectors, values = [], []
+    for rule in coverage_days_rules:
+        channel_level, channel_codes = _channel_selector(rule, channel_pos, channels_by_type)
+        abc_codes = None if rule.abc_class == WILDCARD else np.array([ABC_CLASSES.index(rule.abc_class)])
+        selectors.append(((channel_level, int(abc_codes is not None)), [channel_codes, abc_codes]))
+        values.append(rule.coverage_days)
+    return _apply_rules(table, selectors, values)
+
+
+def compile_outlet_capacity(channels: pd.Index, channel_types: np.ndarray, group_keys: list, outlet_sku_capacity_rules) -> np.ndarray:
+    """
+    Dense (channel, (division, axe) group) lookup of the outlet max SKU counts.
+
+    Returns:
+        Float array of shape (len(channels), len(group_keys)), NaN where no rule applies.
+    """
+    table = np.full((len(channels), len(group_keys)), np.nan)
+    if not outlet_sku_capacity_rules or not len(group_keys):
+        return table
+    channel_pos, channels_by_type = _channel_lookups(channels, channel_types)
+    group_pos = {key: g for g, key in enumerate(group_keys)}
+    key_columns = _key_columns(group_keys, 2)
+    selectors, values = [], []
+    for rule in outlet_sku_capacity_rules:
+        channel_level, channel_codes = _channel_selector(rule, channel_pos, channels_by_type)
+        group_level, group_codes = _group_selector((rule.division, rule.axe), group_pos, key_columns)
+        selectors.append(((channel_level, group_level), [channel_codes, group_codes]))
+        values.append(rule.max_skus)
+    return _apply_rules(table, selectors, values)
+
+
+def compile_outlet_assortment(group_keys: list, outlet_assortment_rules) -> np.ndarray:
+    """
+    Dense lookup of the outlet max SKU counts per (metier, subaxis, brand) group (all outlets).
+
+    Returns:
+        Float array of shape (len(group_keys),), NaN where no rule applies.
+    """
+    table = np.full(len(group_keys), np.nan)
+    if not outlet_assortment_rules or not len(group_keys):
+        return table
+    group_pos = {key: g for g, key in enumerate(group_keys)}
+    key_columns = _key_columns(group_keys, 3)
+    selectors, values = [], []
+    for rule in outlet_assortment_rules:
+        group_level, group_codes = _group_selector((rule.metier, rule.subaxis, rule.brand), group_pos, key_columns)
+        selectors.append(((group_level,), [group_codes]))
+        values.append(rule.max_skus)
+    return _apply_rules(table, selectors, values)
+
+
+def _channel_lookups(channels: pd.Index, channel_types: np.ndarray):
+    channel_pos = {c: j for j, c in enumerate(channels)}
+    types = pd.Series(channel_types, dtype=object).astype(str)
+    channels_by_type = {t: np.asarray(codes, dtype=np.int64) for t, codes in types.groupby(types).indices.items()}
+    return channel_pos, channels_by_type
+
+
+def compile_rule_index(channels: pd.Index, channel_types: np.ndarray, attributes: dict, parameters) -> dict:
+    """
+    Resolves the parameter rules once into dense lookup arrays over integer codes.
+
+    Each rule key may use the wildcard '*', and channel-keyed rules may target a channel type
+    (channel_id '*' with channel_type), so a rule file can hold per-type defaults with
+    per-channel overrides. Where several rules match a cell, the most specific one wins:
+    first by channel (channel ID > channel type > any channel), then by the number of
+    explicit attribute fields; among equally specific rules the later one wins.
+
+    Args:
+        channels: Index of channel IDs.
+        channel_types: Array of channel types aligned with channels.
+        attributes: Output of preprocessing.encode_product_attributes (group keys).
+        parameters: OptimizationParameters.
+
+    Returns:
+        Dictionary with:
+            'coverage_days': (channel, ABC class) float array.
+            'outlet_capacity': (channel, capacity group) float array of max SKUs.
+            'outlet_assortment': (assortment group,) float array of max SKUs.
+            NaN where no rule applies.
+    """
+    return {
+        'coverage_days': compile_coverage_days(channels, channel_types, parameters.coverage_days_rules),
+        'outlet_capacity': compile_outlet_capacity(channels, channel_types, attributes['capacity_group_keys'],
+                                                   parameters.outlet_sku_capacity_rules),
+        'outlet_assortment': compile_outlet_assortment(attributes['assortment_group_keys'],
+                                                       parameters.outlet_assortment_rules),
+    }
@@ -0,0 +1,226 @@
+import json
+import logging
+import os
+import threading
+import time
+from contextlib import contextmanager
+import numpy as np
+
+try:
+    import resource # Unix only: peak RSS
+except ImportError:
+    resource = None
+
+logger = logging.getLogger(__name__)
+
+# Phases of an allocation run, in execution order
+PHASES = ('prepare', 'region', 'warm_start', 'build', 'solve', 'export', 'extract')
+
+
+def model_size(data: dict) -> dict:
+    """
+    Size of the allocation model of prepared data, per constraint family.
+
+    Counts the rows of the formulation built by build_pulp_model / build_matrix_model (same
+    family names as MatrixModel.row_families), so it is engine independent.
+
+    Args:
+        data: Output of prepare_allocation_data.
+
+    Returns:
+        Dictionary with 'variables', 'binaries', 'rows', 'nonzeros' (totals) and
+        'families' {family: {'rows', 'nonzeros'}}.
+    """
+    n = len(data['eligible_pairs'])
+    m = len(data['binary_pairs'])
+    pair_supply = data['supply_limit'][data['product_idx']]
+    limited = ~np.isnan(pair_supply)
+    pair_capacity = data['channel_capacity'][data['channel_idx']]
+    capped = ~np.isnan(pair_capacity)
+    families = {
+        'Supply_Product': (len(np.unique(data['product_idx'][limited])), int(limited.sum())),
+        'Capacity_Channel': (len(np.unique(data['channel_idx'][capped])), int(capped.sum())),
+        'Outlet_Capacity_SKU': (len(data['outlet_capacity_rows']),
+                                sum(len(positions) for _, positions, _ in data['outlet_capacity_rows'])),
+        'Outlet_Assortment': (len(data['outlet_assortment_rows']),
+                              sum(len(positions) for _, positions, _ in data['outlet_assortment_rows'])),
+        'Link_x_y': (m, 2 * m),
+    }
+    return {
+        'variables': n + m,
+        'binaries': m,
+        'rows': sum(rows for rows, _ in families.values()),
+        'nonzeros': sum(nonzeros for _, nonzeros in families.values()),
+        'families': {family: {'rows': rows, 'nonzeros': nonzeros} for family, (rows, nonzeros) in families.items()},
+    }
+
+
+def peak_rss_bytes(children: bool = False):
+    """Peak resident set size of this process (or of its waited-for children, e.g. CBC), None off Unix."""
+    if resource is None:
+        return None
+    usage = resource.getrusage(resource.RUSAGE_CHILDREN if children else resource.RUSAGE_SELF)
+    return usage.ru_maxrss * (1 if os.uname().sysname == 'Darwin' else 1024) # kB on Linux, bytes on macOS
+
+
+def _cpu_seconds() -> float:
+    """CPU time of this process and its finished children (the CBC subprocess)."""
+    times = os.times()
+    return times.user + times.system + times.children_user + times.children_system
+
+
+class RunReport:
+    """
+    Structured report of one allocation run: wall and CPU time per phase, model size and
+    peak memory, completed with the solver statistics by finish().
+
+    Phases are timed with `with report.phase('build'): ...`; a phase entered several times
+    (e.g. once per solved part) accumulates.
+    """
+
+    def __init__(self):
+        self.phases = {}
+        self.model_size = None
+        self.artifact = None # {'id', 'format', 'path'} of the model export, see artifact_store
+        self._started = time.perf_counter()
+        self._started_cpu = _cpu_seconds()
+
+    @contextmanager
+    def phase(self, name: str):
+        start, start_cpu = time.perf_counter(), _cpu_seconds()
+        try:
+            yield
+        finally:
+            timing = self.phases.setdefault(name, {'wall_seconds': 0.0, 'cpu_seconds': 0.0})
+            timing['wall_seconds'] += time.perf_counter() - start
+            timing['cpu_seconds'] += _cpu_seconds() - start_cpu
+
+    def record_model_size(self, data: dict):
+        self.model_size = model_size(data)
+
+    def finish(self, solver_stats: dict) -> dict:
+        """Closes the report, logs it as one JSON line and returns it (plain JSON types)."""
+        report = {
+            'engine': solver_stats.get('engine'),
+            'status': solver_stats.get('status'),
+            'wall_seconds': time.perf_counter() - self._started,
+            'cpu_seconds': _cpu_seconds() - self._started_cpu,
+            'phases': {name: self.phases[name] for name in sorted(self.phases, key=_phase_order)},
+            'model_size': self.model_size,
+            'peak_rss_bytes': peak_rss_bytes(),
+            'peak_child_rss_bytes': peak_rss_bytes(children=True),
+            'solver_stats': solver_stats,
+            'artifact': self.artifact,
+        }
+        logger.info("allocation run %s", json.dumps(report, default=str))
+        return report
+
+
+def _phase_order(name: str) -> int:
+    return PHASES.index(name) if name in PHASES else len(PHASES)
+
+
+# --- Prometheus exposition ---
+
+SECONDS_BUCKETS = (0.01, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0, 120.0, 300.0, 900.0)
+SIZE_BUCKETS = (100, 1000, 10000, 100000, 1000000, 10000000)
+
+
+def _labels(labels: tuple) -> str:
+    if not labels:
+        return ''
+    return '{' + ','.join(f'{key}="{str(value)}"' for key, value in labels) + '}'
+
+
+class _Histogram:
+    def __init__(self, name: str, help_text: str, buckets: tuple):
+        self.name, self.help_text, self.buckets = name, help_text, buckets
+        self.series = {} # labels -> [bucket counts..., sum, count]
+
+    def observe(self, value: float, **labels):
+        key = tuple(sorted(labels.items()))
+        series = self.series.setdefault(key, [0] * len(self.buckets) + [0.0, 0])
+        for i, bound in enumerate(self.buckets):
+            if value <= bound:
+                series[i] += 1
+        series[-2] += value
+        series[-1] += 1
+
+    def render(self) -> list:
+        lines = [f"# HELP {self.name} {self.help_text}", f"# TYPE {self.name} histogram"]
+        for key, series in sorted(self.series.items()):
+            for bound, count in zip(self.buckets, series):
+                lines.append(f"{self.name}_bucket{_labels(key + (('le', bound),))} {count}")
+            lines.append(f"{self.name}_bucket{_labels(key + (('le', '+Inf'),))} {series[-1]}")
+            lines.append(f"{self.name}_sum{_labels(key)} {series[-2]}")
+            lines.append(f"{self.name}_count{_labels(key)} {series[-1]}")
+        return lines
+
+
+class RunMetrics:
+    """
+    Aggregates RunReports into Prometheus text-format metrics (no client library needed).
+
+    Exposes histograms of the run and phase wall/CPU times and of the model size, a counter
+    of runs per engine and status, and the last peak RSS.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.run_seconds = _Histogram('allocation_run_seconds', 'Wall time of allocation runs.', SECONDS_BUCKETS)
+        self.phase_seconds = _Histogram('allocation_phase_seconds', 'Wall time per allocation run phase.', SECONDS_BUCKETS)
+        self.phase_cpu_seconds = _Histogram('allocation_phase_cpu_seconds', 'CPU time per allocation run phase (CBC included).',
+                                            SECONDS_BUCKETS)
+        self.model_variables = _Histogram('allocation_model_variables', 'Variables of the allocation model.', SIZE_BUCKETS)
+        self.model_rows = _Histogram('allocation_model_rows', 'Rows per constraint family of the allocation model.', SIZE_BUCKETS)
+        self.model_nonzeros = _Histogram('allocation_model_nonzeros', 'Non-zeros of the allocation model.', SIZE_BUCKETS)
+        self.runs = {} # (engine, status) -> count
+        self.peak_rss_bytes = None
+
+    def observe(self, report: dict):
+        """Adds one RunReport.finish() result; None (e.g. a cache hit) is ignored."""
+        if not report:
+            return
+        with self._lock:
+            engine = report.get('engine') or 'unknown'
+            self.run_seconds.observe(report['wall_seconds'], engine=engine)
+            for name, timing in report['phases'].items():
+                self.phase_seconds.observe(timing['wall_seconds'], engine=engine, phase=name)
+                self.phase_cpu_seconds.observe(timing['cpu_seconds'], engine=engine, phase=name)
+            size = report.get('model_size')
+            if size:
+                self.model_variables.observe(size['variables'])
+                self.model_nonzeros.observe(size['nonzeros'])
+                for family, counts in size['families'].items():
+                    self.model_rows.observe(counts['rows'], family=family)
+            key = (engine, report.get('status') or 'unknown')
+            self.runs[key] = self.runs.get(key, 0) + 1
+            if report.get('peak_rss_bytes') is not None:
+                self.peak_rss_bytes = report['peak_rss_bytes']
+
+    def render(self, counters: dict = None) -> str:
+        """
+        Prometheus text exposition (version 0.0.4).
+
+        Args:
+            counters: Optional {metric_name: {label_value: count}} of extra counters rendered
+                      with an 'event' label, e.g. the solve-cache counters.
+        """
+        with self._lock:
+            lines = []
+            for histogram in (self.run_seconds, self.phase_seconds, self.phase_cpu_seconds,
+                              self.model_variables, self.model_rows, self.model_nonzeros):
+                lines.extend(histogram.render())
+            lines += ["# HELP allocation_runs_total Allocation runs per engine and status.",
+                      "# TYPE allocation_runs_total counter"]
+            for (engine, status), count in sorted(self.runs.items()):
+                lines.append(f"allocation_runs_total{_labels((('engine', engine), ('status', status)))} {count}")
+            if self.peak_rss_bytes is not None:
+                lines += ["# HELP allocation_peak_rss_bytes Peak RSS of the solving process at the last run.",
+                          "# TYPE allocation_peak_rss_bytes gauge",
+                          f"allocation_peak_rss_bytes {self.peak_rss_bytes}"]
+        for name, values in (counters or {}).items():
+            lines += [f"# TYPE {name} counter"]
+            for event, count in sorted(values.items()):
+                lines.append(f"{name}{_labels((('event', event),))} {count}")
+        return '\n'.join(lines) + '\n'
@@ -0,0 +1,210 @@
+import dataclasses
+import os
+from concurrent.futures import ProcessPoolExecutor
+import numpy as np
+import pandas as pd
+from allocation_data import prepare_allocation_data, extract_allocations, scope_binaries
+from matrix_model import build_matrix_model, solve_matrix_model
+from run_report import RunReport, model_size
+from solver import highs_options, has_usable_solution, reported_status
+
+# Parameter fields a ScenarioVariant may replace (anything else, e.g. the solver block, comes from the base)
+VARIANT_FIELDS = ('restricted_brands_for_donation', 'coverage_days_rules', 'outlet_sku_capacity_rules',
+                  'outlet_assortment_rules')
+OUTLET_ROW_FAMILIES = (('outlet_capacity_rows', 'Outlet_Capacity_SKU'), ('outlet_assortment_rows', 'Outlet_Assortment'))
+SCENARIO_ENGINE = 'highs'
+
+
+def variant_parameters(base, variant):
+    """OptimizationParameters of a variant: the rule families the variant sets (not None) replace those of base."""
+    return base.model_copy(update={field: getattr(variant, field) for field in VARIANT_FIELDS
+                                   if getattr(variant, field) is not None})
+
+
+def validate_scenarios(parameters, variants: list) -> list:
+    """
+    Checks a comparison request and returns the scenario names, 'base' first.
+
+    Scenarios are solved with HiGHS only (bound changes on one matrix model): a base solver block
+    that explicitly asks for another engine is rejected rather than silently ignored.
+
+    Raises:
+        ValueError: Duplicate scenario names or an explicit engine other than 'highs'.
+    """
+    settings = parameters.solver
+    if 'engine' in settings.model_fields_set and settings.engine != SCENARIO_ENGINE:
+        raise ValueError(f"Scenarios are solved with the '{SCENARIO_ENGINE}' engine, got solver.engine '{settings.engine}'.")
+    names = ['base'] + [variant.name for variant in variants]
+    if len(set(names)) != len(names):
+        raise ValueError(f"Scenario names must be unique (and not 'base'), got {names}.")
+    return names
+
+
+def build_scenario_structure(variant_data: list) -> tuple:
+    """
+    Merges the prepared data of several parameter variants into one structural model.
+
+    The structure holds the union of the variants' eligible pairs and rows, so every variant is
+    the same matrix with its own column upper bounds and row right-hand sides:
+    - a pair missing from a variant (restricted brand, coverage rule without demand, ...) has
+      upper bound 0 in that variant;
+    - supply and capacity rows only depend on the inventory and the channels, so they keep one
+      right-hand side; a row that cannot bind in a variant stays harmless there;
+    - an outlet SKU-count row that a variant does not have (no rule, or one that cannot bind)
+      gets the row's pair count as right-hand side, i.e. it cannot bind either;
+    - the big-M of the x/y linking rows is the largest pair bound over the variants (the
+      linking coefficients are part of the matrix).
+
+    Args:
+        variant_data: Outputs of prepare_allocation_data for the same products and channels.
+
+    Returns:
+        Tuple: (data, pair_bounds, row_bounds)
+               data: Allocation data over the union, for build_matrix_model and extract_allocations.
+               pair_bounds: Per variant, float array of upper bounds over data['eligible_pairs'].
+               row_bounds: Per variant, {row data key: max_skus array aligned with data[key]}.
+    """
+    first = variant_data[0]
+    products, channels = first['products'], first['channels']
+    variant_keys = [variant['product_idx'] * len(channels) + variant['channel_idx'] for variant in variant_data]
+    pair_keys = np.unique(np.concatenate(variant_keys))
+    variant_positions = [np.searchsorted(pair_keys, keys) for keys in variant_keys]
+
+    pair_bounds = []
+    for variant, positions in zip(variant_data, variant_positions):
+        bounds = np.zeros(len(pair_keys))
+        bounds[positions] = variant['pair_upper_bound']
+        pair_bounds.append(bounds)
+
+    product_idx, channel_idx = pair_keys // len(channels), pair_keys % len(channels)
+    data = {
+        'products': products,
+        'channels': channels,
+        'inventory_quantity': first['inventory_quantity'],
+        'supply': first['supply'],
+        'product_idx': product_idx,
+        'channel_idx': channel_idx,
+        'eligible_pairs': list(zip(products[product_idx], channels[channel_idx])),
+        'pair_upper_bound': np.max(pair_bounds, axis=0),
+        # NaN where the row cannot bind in any variant (the limit itself is the same in all of them)
+        'supply_limit': np.fmax.reduce([variant['supply_limit'] for variant in variant_data]),
+        'channel_capacity': np.fmax.reduce([variant['channel_capacity'] for variant in variant_data]),
+    }
+
+    row_bounds = [{} for _ in variant_data]
+    for key, _ in OUTLET_ROW_FAMILIES:
+        rows = {} # name -> ([pair positions per variant having it], {variant: max_skus})
+        for v, (variant, positions) in enumerate(zip(variant_data, variant_positions)):
+            for name, pair_positions, max_skus in variant[key]:
+                row = rows.setdefault(name, ([], {}))
+                row[0].append(positions[pair_positions])
+                row[1][v] = max_skus
+        data[key] = []
+        for v in range(len(variant_data)):
+            row_bounds[v][key] = np.empty(len(rows))
+        for i, (name, (position_parts, max_skus)) in enumerate(rows.items()):
+            pair_positions = np.unique(np.concatenate(position_parts))
+            data[key].append((name, pair_positions, max(max_skus.values())))
+            for v in range(len(variant_data)):
+                row_bounds[v][key][i] = max_skus.get(v, len(pair_positions))
+    return scope_binaries(data), pair_bounds, row_bounds
+
+
+def variant_bounds(model, pair_bounds: np.ndarray, row_bounds: dict) -> tuple:
+    """(ub, row_ub) of the structural MatrixModel for one variant."""
+    ub = model.ub.copy()
+    ub[:model.num_pairs] = pair_bounds
+    row_ub = model.row_ub.copy()
+    families = {family: (first, last) for family, first, last in model.row_families}
+    for key, family in OUTLET_ROW_FAMILIES:
+        if family in families:
+            first, last = families[family]
+            row_ub[first:last] = row_bounds[key]
+    return ub, row_ub
+
+
+# --- Worker processes: the structural model is sent once per worker, each task only carries bounds ---
+
+_structure = None
+
+
+def _init_worker(model):
+    global _structure
+    _structure = model
+
+
+def _solve_variant(ub: np.ndarray, row_ub: np.ndarray, options: dict):
+    model = dataclasses.replace(_structure, ub=ub, row_ub=row_ub)
+    status_string = solve_matrix_model(model, options)
+    solution = None if model.solution is None else model.solution[:model.num_pairs]
+    return status_string, model.solver_stats, solution
+
+
+def run_scenarios(products_df: pd.DataFrame,
+                  channels_df: pd.DataFrame,
+                  inventory_df: pd.DataFrame,
+                  demand_dict: dict,
+                  parameters,
+                  variants: list,
+                  max_workers: int = None,
+                  include_allocations: bool = False) -> dict:
+    """
+    Solves the base parameters and each what-if variant on one structural model.
+
+    The model is assembled once (see build_scenario_structure) and each scenario only changes
+    column upper bounds and outlet row right-hand sides, then the scenarios are solved in
+    parallel worker processes with HiGHS, under the base solver limits (see validate_scenarios).
+
+    Args:
+        products_df, channels_df, inventory_df, demand_dict: As for optimize_allocation.
+        parameters: Base OptimizationParameters (scenario 'base').
+        variants: List of ScenarioVariant.
+        max_workers: Upper bound on the worker processes (e.g. a server limit); the count is
+                     parameters.solver.workers, else the number of CPUs, at most one per scenario.
+                     1 solves the scenarios in this process.
+        include_allocations: Add each scenario's allocation list to its row.
+
+    Returns:
+        Dictionary with 'engine', 'scenarios' (comparison rows: 'name', 'status', 'solution_status',
+        'objective', 'gap', 'solve_seconds', 'allocated_units', 'units_by_channel_type'
+        and optionally 'allocations'), 'model_size' of the structure and 'phases' (wall and
+        CPU time of prepare, build and solve).
+    """
+    settings = parameters.solver
+    names = validate_scenarios(parameters, variants)
+
+    report = RunReport()
+    with report.phase('prepare'):
+        variant_data = [prepare_allocation_data(products_df, channels_df, inventory_df, demand_dict, scenario_parameters)
+                        for scenario_parameters in [parameters] + [variant_parameters(parameters, variant) for variant in variants]]
+        data, pair_bounds, row_bounds = build_scenario_structure(variant_data)
+    with report.phase('build'):
+        model = build_matrix_model(data)
+        scenario_bounds = [variant_bounds(model, bounds, rows) for bounds, rows in zip(pair_bounds, row_bounds)]
+
+    options = highs_options(settings)
+    workers = min(settings.workers or os.cpu_count() or 1, max_workers or len(names), len(names))
+    with report.phase('solve'):
+        if workers == 1:
+            _init_worker(model)
+            results = [_solve_variant(ub, row_ub, options) for ub, row_ub in scenario_bounds]
+        else:
+            with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker, initargs=(model,)) as executor:
+                results = list(executor.map(_solve_variant, *zip(*scenario_bounds), [options] * len(names)))
+
+    channel_types = channels_df['channel_type'].astype(str).to_numpy()[data['channel_idx']]
+    scenarios = []
+    for name, (status_string, stats, solution) in zip(names, results):
+        row = {'name': name, 'status': reported_status(status_string, stats, settings), 'solution_status': stats['solution_status'],
+               'objective': stats['objective'], 'gap': stats['gap'], 'solve_seconds': stats['wall_time_seconds'],
+               'allocated_units': None, 'units_by_channel_type': None}
+        if solution is not None and has_usable_solution(stats, settings):
+            units = np.round(np.where(solution > 0.1, solution, 0.0)) # Same rounding as extract_allocations
+            row['allocated_units'] = int(units.sum())
+            row['units_by_channel_type'] = {channel_type: int(units[channel_types == channel_type].sum())
+                                            for channel_type in np.unique(channel_types)}
+            if include_allocations:
+                row['allocations'] = extract_allocations(data, solution)
+        scenarios.append(row)
+
+    return {'engine': SCENARIO_ENGINE, 'scenarios': scenarios, 'model_size': model_size(data), 'phases': report.phases}
@@ -1,5 +1,5 @@
 from pydantic import BaseModel, Field, field_validator, conint, confloat, constr, model_validator
-from typing import List, Literal, Dict, Optional
+from typing import List, Literal, Dict, Optional, Tuple
 
 class ProductInput(BaseModel):
     sku: constr(min_length=1) = Field(..., description="Unique Stock Keeping Unit")
@@ -32,13 +32,18 @@ class DemandInput(BaseModel):
 
 # --- New Parameter Structures ---
 
+# Rule keys accept the wildcard '*'. A channel-keyed rule with channel_id '*' and a channel_type
+# is a default for every channel of that type. The most specific matching rule wins (see rule_index.py).
+
 class CoverageDaysRule(BaseModel):
-    channel_id: constr(min_length=1)
-    abc_class: Literal['A', 'B', 'C']
+    channel_id: constr(min_length=1) = '*'
+    channel_type: Optional[constr(min_length=1)] = Field(None, description="With channel_id '*': applies to the channels of this type")
+    abc_class: Literal['A', 'B', 'C', '*']
     coverage_days: conint(ge=0)
 
 class OutletSKUCapacityRule(BaseModel):
-    channel_id: constr(min_length=1) # Should be an outlet channel
+    channel_id: constr(min_length=1) = '*' # Should be an outlet channel
+    channel_type: Optional[constr(min_length=1)] = Field(None, description="With channel_id '*': applies to the channels of this type")
     division: constr(min_length=1)
     axe: constr(min_length=1)
     max_skus: conint(ge=0)
@@ -51,6 +56,28 @@ class OutletAssortmentRule(BaseModel):
     max_skus: conint(ge=0)
 
 
+class SolverSettings(BaseModel):
+    """Controls passed to the MILP engine."""
+    engine: Literal['cbc', 'highs', 'greedy'] = Field('cbc', description="'cbc' (PuLP model solved by CBC), 'highs' (sparse matrices solved in-process by HiGHS) or 'greedy' (heuristic fill, no optimality proof)")
+    time_limit_seconds: Optional[confloat(gt=0)] = Field(None, description="Wall-clock limit for the solve; None means no limit")
+    mip_gap_rel: Optional[confloat(ge=0)] = Field(None, description="Relative MIP gap at which the solver stops (e.g. 0.001 = 0.1%)")
+    mip_gap_abs: Optional[confloat(ge=0)] = Field(None, description="Absolute MIP gap at which the solver stops (CBC only)")
+    threads: Optional[conint(ge=1)] = Field(None, description="Number of solver threads (CBC only)")
+    presolve: bool = Field(True, description="Run the solver's presolve")
+    decompose: bool = Field(False, description="Split the model into independent components and solve them in parallel worker processes")
+    workers: Optional[conint(ge=1)] = Field(None, description="Worker processes for decompose (default: number of CPUs)")
+    anytime: bool = Field(True, description="Return the best incumbent when the solver stops on a time or gap limit; if False only proven optima are returned")
+    mip_start: Optional[Literal['greedy', 'previous']] = Field(None, description="Initial solution passed to CBC: 'greedy' seeds branch-and-bound with the heuristic fill, 'previous' with the latest stored allocation run repaired against the current data")
+    export_model: Optional[Literal['lp', 'mps']] = Field(None, description="Export the CBC model of the run to the artifact store (gzip, written in the background); runs may also be sampled server-side")
+
+
+class AllocationDelta(BaseModel):
+    """Changes since the previous allocation run, for incremental re-optimization."""
+    product_skus: List[constr(min_length=1)] = Field(default_factory=list, description="SKUs whose inventory or attributes changed; an assortment rule or restricted brand change lists the SKUs it covers")
+    demand_keys: List[Tuple[str, str]] = Field(default_factory=list, description="(product_sku, channel_id) demand entries that changed, appeared or disappeared")
+    channel_ids: List[constr(min_length=1)] = Field(default_factory=list, description="Channels whose capacity, coverage rules or outlet SKU-capacity rules changed")
+
+
 # --- Optimization Parameters ---
 
 class OptimizationParameters(BaseModel):
@@ -73,8 +100,21 @@ class OptimizationParameters(BaseModel):
         default_factory=list,
         description="List of rules defining maximum SKU assortment for outlets based on metier, subaxis, and brand (signature)."
     )
+    solver: SolverSettings = Field(
+        default_factory=SolverSettings,
+        description="Engine choice and solver limits (time limit, gaps, threads, presolve)."
+    )
     # Add other parameters as needed, e.g., max_stock_limit_override, etc.
 
+class ScenarioVariant(BaseModel):
+    """One what-if variant of the base parameters: the rule families it sets replace the base ones."""
+    name: constr(min_length=1) = Field(..., description="Label of the variant in the comparison table")
+    restricted_brands_for_donation: Optional[List[constr(min_length=1)]] = Field(None, description="Replaces the restricted brands (an empty list lifts every restriction)")
+    coverage_days_rules: Optional[List[CoverageDaysRule]] = Field(None, description="Replaces the coverage days rules, e.g. other days per ABC class")
+    outlet_sku_capacity_rules: Optional[List[OutletSKUCapacityRule]] = Field(None, description="Replaces the outlet SKU caps per (division, axe)")
+    outlet_assortment_rules: Optional[List[OutletAssortmentRule]] = Field(None, description="Replaces the outlet assortment caps per (metier, subaxis, brand)")
+
+
 # --- Main Allocation Request ---
 
 class AllocationRequest(BaseModel):
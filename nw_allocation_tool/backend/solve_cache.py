@@ -0,0 +1,196 @@
+import gzip
+import hashlib
+import json
+import os
+import threading
+from collections import OrderedDict
+from dataclasses import dataclass
+import numpy as np
+import pandas as pd
+from matrix_model import SOLUTION_OPTIMAL, SOLUTION_INFEASIBLE
+from solver import optimize_allocation
+
+CACHE_VERSION = 1 # Bump when the model formulation changes, so old entries are never served
+
+
+@dataclass
+class CachedModel:
+    """Stand-in model returned on a cache hit (no solver was run)."""
+    name: str
+    fingerprint: str
+    solver_stats: dict = None
+    run_report: dict = None # Set by optimize_allocation, see run_report.RunReport
+
+
+def _hash_frame(hasher, frame: pd.DataFrame):
+    """Feeds the columns, dtypes and row hashes of a frame into hasher."""
+    hasher.update(json.dumps([[str(column), str(dtype)] for column, dtype in frame.dtypes.items()]).encode())
+    hasher.update(pd.util.hash_pandas_object(frame, index=True).to_numpy().tobytes())
+
+
+def allocation_fingerprint(products_df: pd.DataFrame,
+                           channels_df: pd.DataFrame,
+                           inventory_df: pd.DataFrame,
+                           demand_dict: dict,
+                           parameters,
+                           engine: str = None,
+                           previous_allocation: dict = None) -> str:
+    """
+    SHA-256 of the canonicalized inputs of optimize_allocation.
+
+    Canonical form: products and channels indexed by str ID, rows and columns sorted;
+    inventory aggregated per SKU (the model only uses the total); demand sorted by key;
+    parameters as JSON including the solver block; the resolved engine; the previous run only
+    when it is used as warm start. Row order and duplicate inventory lines therefore do not
+    change the fingerprint.
+    """
+    hasher = hashlib.sha256(f"allocation-cache-v{CACHE_VERSION}".encode())
+    for frame in (products_df, channels_df):
+        frame = frame.copy()
+        frame.index = frame.index.astype(str)
+        _hash_frame(hasher, frame.sort_index().reindex(sorted(frame.columns, key=str), axis=1))
+
+    if len(inventory_df):
+        inventory = inventory_df.groupby(inventory_df['product_sku'].astype(str))['quantity'].sum().sort_index()
+    else:
+        inventory = pd.Series(dtype=float)
+    hasher.update(pd.util.hash_pandas_object(inventory, index=True).to_numpy().tobytes())
+
+    demand = sorted((str(p), str(c), float(q)) for (p, c), q in demand_dict.items())
+    hasher.update(json.dumps(demand).encode())
+
+    hasher.update(parameters.model_dump_json().encode())
+    hasher.update(str(engine or parameters.solver.engine).encode())
+    if parameters.solver.mip_start == 'previous' and previous_allocation:
+        hasher.update(json.dumps(sorted((str(p), str(c), float(q)) for (p, c), q in previous_allocation.items())).encode())
+    return hasher.hexdigest()
+
+
+def is_cacheable(solver_stats: dict) -> bool:
+    """Only deterministic outcomes are cached: proven optima, proven infeasibility and greedy runs."""
+    return (solver_stats['solution_status'] in (SOLUTION_OPTIMAL, SOLUTION_INFEASIBLE)
+            or solver_stats['engine'] == 'greedy')
+
+
+class SolveCache:
+    """
+    Two-tier cache of solve results keyed by allocation_fingerprint.
+
+    The memory tier is an LRU of at most max_entries results. The optional disk tier stores one
+    gzipped JSON file per fingerprint in directory and evicts the least recently used files
+    (by modification time, refreshed on every hit) once their total size exceeds max_disk_bytes.
+    Hits, misses and evictions are counted in counters.
+
+    Values are dictionaries {'status', 'allocations', 'solver_stats'}.
+    """
+
+    def __init__(self, max_entries: int = 128, directory: str = None, max_disk_bytes: int = 256 * 1024 * 1024):
+        self.max_entries = max_entries
+        self.directory = directory
+        self.max_disk_bytes = max_disk_bytes
+        self.counters = {'memory_hits': 0, 'disk_hits': 0, 'misses': 0, 'memory_evictions': 0, 'disk_evictions': 0}
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+
+    def _path(self, key: str) -> str:
+        return os.path.join(self.directory, f"{key}.json.gz")
+
+    def get(self, key: str):
+        """Returns a copy of the cached value, or None."""
+        with self._lock:
+            value = self._entries.get(key)
+            if value is not None:
+                self._entries.move_to_end(key)
+                self.counters['memory_hits'] += 1
+                return _copy_value(value)
+
+        if self.directory:
+            try:
+                with gzip.open(self._path(key), 'rt') as cache_file:
+                    value = json.load(cache_file)
+                os.utime(self._path(key)) # Most recently used
+            except (OSError, ValueError):
+                value = None
+            if value is not None:
+                with self._lock:
+                    self.counters['disk_hits'] += 1
+                    self._remember(key, value)
+                return _copy_value(value)
+
+        with self._lock:
+            self.counters['misses'] += 1
+        return None
+
+    def put(self, key: str, value: dict):
+        with self._lock:
+            self._remember(key, _copy_value(value))
+        if self.directory:
+            temporary_path = f"{self._path(key)}.{os.getpid()}.tmp"
+            with gzip.open(temporary_path, 'wt') as cache_file:
+                json.dump(value, cache_file, default=_json_default)
+            os.replace(temporary_path, self._path(key)) # Atomic, readers never see a partial file
+            self._evict_disk()
+
+    def _remember(self, key: str, value: dict):
+        """Inserts into the memory tier (lock held)."""
+        self._entries[key] = value
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+            self.counters['memory_evictions'] += 1
+
+    def _evict_disk(self):
+        files = []
+        for entry in os.scandir(self.directory):
+            if entry.name.endswith('.json.gz'):
+                stat = entry.stat()
+                files.append((stat.st_mtime, stat.st_size, entry.path))
+        total_size = sum(size for _, size, _ in files)
+        for _, size, path in sorted(files):
+            if total_size <= self.max_disk_bytes:
+                break
+            try:
+                os.remove(path)
+            except OSError:
+                continue
+            total_size -= size
+            with self._lock:
+                self.counters['disk_evictions'] += 1
+
+
+def _copy_value(value: dict) -> dict:
+    """Copy deep enough that callers can modify the returned allocations."""
+    return {'status': value['status'],
+            'allocations': [dict(allocation) for allocation in value['allocations']],
+            'solver_stats': dict(value['solver_stats'])}
+
+
+def _json_default(value):
+    if isinstance(value, np.generic):
+        return value.item()
+    return str(value)
+
+
+def cached_optimize_allocation(cache: SolveCache, products_df, channels_df, inventory_df, demand_dict, parameters,
+                               engine: str = None, previous_allocation: dict = None, **kwargs):
+    """
+    optimize_allocation behind a SolveCache.
+
+    On a hit the stored result is returned with a CachedModel, without building or solving
+    anything; on a miss the solve runs and its result is stored if it is deterministic
+    (see is_cacheable). Same arguments and return value as optimize_allocation.
+    """
+    key = allocation_fingerprint(products_df, channels_df, inventory_df, demand_dict, parameters,
+                                 engine, previous_allocation)
+    value = cache.get(key)
+    if value is not None:
+        return CachedModel(name="InventoryAllocation", fingerprint=key, solver_stats=value['solver_stats']), \
+            value['status'], value['allocations']
+
+    model, status, allocations = optimize_allocation(products_df, channels_df, inventory_df, demand_dict, parameters,
+                                                     engine=engine, previous_allocation=previous_allocation, **kwargs)
+    if is_cacheable(model.solver_stats):
+        cache.put(key, {'status': status, 'allocations': allocations, 'solver_stats': model.solver_stats})
+    return model, status, allocations
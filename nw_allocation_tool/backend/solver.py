@@ -1,64 +1,126 @@
+import os
+import re
+import time
+import tempfile
 import pulp
+import numpy as np
 import pandas as pd
 from schemas import OptimizationParameters, CoverageDaysRule, OutletSKUCapacityRule, OutletAssortmentRule
 from collections import defaultdict
+from allocation_data import prepare_allocation_data, extract_allocations
+from matrix_model import build_matrix_model, solve_matrix_model, SOLUTION_OPTIMAL, SOLUTION_FEASIBLE
+from decomposition import DecomposedModel, find_components, assign_batches, partition_allocation_data
+from heuristic import greedy_allocation, repair_allocation, solve_greedy
+from run_report import RunReport
+from artifact_store import model_artifacts
+from concurrent.futures import ProcessPoolExecutor
+
+ENGINES = ('cbc', 'highs', 'greedy')
+
+# Summary lines printed by CBC at the end of a branch-and-bound run
+CBC_LOG_PATTERNS = {
+    'objective': re.compile(r'^Objective value:\s+(\S+)', re.M),
+    'best_bound': re.compile(r'^(?:Lower|Upper) bound:\s+(\S+)', re.M),
+    'node_count': re.compile(r'^Enumerated nodes:\s+(\d+)', re.M),
+}
+
+
+def _cbc_command(settings, log_path: str, warm_start: bool = False):
+    """Builds the PuLP CBC command from the SolverSettings of OptimizationParameters."""
+    return pulp.PULP_CBC_CMD(
+        msg=False,
+        warmStart=warm_start,
+        timeLimit=settings.time_limit_seconds,
+        gapRel=settings.mip_gap_rel,
+        gapAbs=settings.mip_gap_abs,
+        threads=settings.threads,
+        # PuLP only knows how to switch presolve on, 'presolve off' goes through the raw options
+        presolve=True if settings.presolve else None,
+        options=[] if settings.presolve else ['presolve off'],
+        logPath=log_path,
+    )
 
-def optimize_allocation(products_df: pd.DataFrame,
-                        channels_df: pd.DataFrame,
-                        inventory_df: pd.DataFrame,
-                        demand_dict: dict, # Assumes demand_quantity is WEEKLY demand
-                        parameters: OptimizationParameters):
+
+def highs_options(settings) -> dict:
+    """Maps SolverSettings onto scipy.optimize.milp options (threads and absolute gap are not exposed by scipy)."""
+    options = {'disp': False, 'presolve': settings.presolve}
+    if settings.time_limit_seconds is not None:
+        options['time_limit'] = settings.time_limit_seconds
+    if settings.mip_gap_rel is not None:
+        options['mip_rel_gap'] = settings.mip_gap_rel
+    return options
+
+
+def relative_gap(objective, best_bound):
+    """Relative MIP gap |bound - objective| / |objective| (None if either value is unknown)."""
+    if objective is None or best_bound is None:
+        return None
+    return abs(best_bound - objective) / max(abs(objective), 1e-10)
+
+
+def has_usable_solution(solver_stats: dict, settings) -> bool:
     """
-    Optimizes the allocation of inventory to different channels using Mixed Integer Programming.
+    Whether allocations should be extracted from a solve.
 
-    Args:
-        products_df: DataFrame containing product information (indexed by SKU, columns: 'brand', 'division', 'axe', 'subaxis', 'metier', 'abc_class', etc.)
-        channels_df: DataFrame containing channel information (indexed by channel ID, columns: 'capacity', 'channel_type', etc.)
-        inventory_df: DataFrame containing inventory information (columns: 'product_sku', 'quantity')
-        demand_dict: Dictionary of WEEKLY demand {(product_sku, channel_id): demand_quantity}
-        parameters: OptimizationParameters object containing control parameters (coverage rules, capacity rules, assortment rules, etc.).
+    A proven optimum is always used; an integer-feasible incumbent (time or gap limit reached)
+    is used in anytime mode.
+    """
+    if solver_stats['solution_status'] == SOLUTION_OPTIMAL:
+        return True
+    return settings.anytime and solver_stats['solution_status'] == SOLUTION_FEASIBLE
 
-    Returns:
-        Tuple: (model, status, list_of_allocation_decisions)
-               model: The PuLP model object.
-               status: PuLP solver status string.
-               list_of_allocation_decisions: List of dictionaries representing allocations.
+
+def reported_status(status_string: str, solver_stats: dict, settings) -> str:
     """
+    Status of a solve as returned to callers: 'Optimal' only when allocations are extracted.
 
-    # --- Data Preparation ---
-    # --- Data Preparation & Parameter Processing ---
-    products_df.index = products_df.index.astype(str)
-    channels_df.index = channels_df.index.astype(str)
+    Both engines report an incumbent found before a limit as 'Optimal'; outside anytime mode that
+    incumbent is discarded, so the run is reported as 'Not Solved' instead of an empty optimum.
+    """
+    if status_string == 'Optimal' and not has_usable_solution(solver_stats, settings):
+        return 'Not Solved'
+    return status_string
 
-    products = products_df.index.tolist() # List of SKUs
-    channels = channels_df.index.tolist() # List of Channel IDs
 
-    # Aggregate inventory by product SKU
-    inventory_quantity = inventory_df.groupby('product_sku')['quantity'].sum().to_dict()
+def parse_cbc_log(log_text: str) -> dict:
+    """
+    Extracts the final objective, bound and node count from a CBC log.
 
-    # Process parameter rules into efficient lookup dictionaries
-    coverage_rules_dict = {(rule.channel_id, rule.abc_class): rule.coverage_days for rule in parameters.coverage_days_rules}
-    outlet_capacity_dict = {(rule.channel_id, rule.division, rule.axe): rule.max_skus for rule in parameters.outlet_sku_capacity_rules}
-    # Assuming assortment rules apply across all outlets unless channel_id is added to OutletAssortmentRule schema
-    outlet_assortment_dict = {(rule.metier, rule.subaxis, rule.brand): rule.max_skus for rule in parameters.outlet_assortment_rules}
+    Returns:
+        Dictionary with keys 'objective', 'best_bound', 'node_count' (None when not printed).
+    """
+    stats = {}
+    for key, pattern in CBC_LOG_PATTERNS.items():
+        match = pattern.search(log_text)
+        stats[key] = None
+        if match:
+            try:
+                stats[key] = int(match.group(1)) if key == 'node_count' else float(match.group(1))
+            except ValueError:
+                pass
+    return stats
+
+def build_pulp_model(data: dict):
+    """
+    Builds the PuLP formulation over the eligible pairs of prepare_allocation_data.
 
-    # Pre-group products by attributes needed for constraints
-    products_by_outlet_capacity_group = defaultdict(list)
-    products_by_outlet_assortment_group = defaultdict(list)
-    outlet_channels = channels_df[channels_df['channel_type'] == 'outlet'].index.tolist()
+    Args:
+        data: Output of prepare_allocation_data.
 
-    for p in products:
-        # Ensure product attributes exist, handle missing values if necessary (e.g., assign to a default group or skip)
-        division = products_df.loc[p].get('division')
-        axe = products_df.loc[p].get('axe')
-        metier = products_df.loc[p].get('metier')
-        subaxis = products_df.loc[p].get('subaxis')
-        brand = products_df.loc[p].get('brand')
+    Returns:
+        Tuple: (model, x, y)
+               model: The PuLP model object.
+               x: Dictionary {(p, c): LpVariable} of allocated quantities.
+               y: Dictionary {(p, c): LpVariable} of allocation binaries (data['binary_pairs'] only).
+    """
+    eligible_pairs = data['eligible_pairs']
+    pair_upper_bound = data['pair_upper_bound']
 
-        if division and axe:
-            products_by_outlet_capacity_group[(division, axe)].append(p)
-        if metier and subaxis and brand:
-            products_by_outlet_assortment_group[(metier, subaxis, brand)].append(p)
+    channels_by_product = defaultdict(list)
+    products_by_channel = defaultdict(list)
+    for p, c in eligible_pairs:
+        channels_by_product[p].append(c)
+        products_by_channel[c].append(p)
 
 
     # --- Model Definition ---
@@ -66,16 +128,21 @@ def optimize_allocation(products_df: pd.DataFrame,
 
     # --- Decision Variables ---
 
-    # x[p, c]: Quantity of product p allocated to channel c
+    # x[p, c]: Quantity of product p allocated to channel c (eligible pairs only)
+    #          Upper bound = min(inventory, coverage cap, channel capacity), see tighten_bounds.
+    #          Continuous when no pair needs a binary: the LP is then integral (see scope_binaries).
+    binary_pairs = [eligible_pairs[k] for k in data['binary_pairs']]
     x = pulp.LpVariable.dicts("allocation_qty",
-                             ((p, c) for p in products for c in channels),
+                             eligible_pairs,
                              lowBound=0,
-                             cat='Integer')
+                             cat='Integer' if binary_pairs else 'Continuous')
+    for pair, upper_bound in zip(eligible_pairs, pair_upper_bound):
+        x[pair].upBound = upper_bound
 
     # y[p, c]: Binary variable, 1 if product p is allocated to channel c, 0 otherwise
-    # Needed for constraints like minimum SKUs per store.
+    # Needed for the outlet SKU-count constraints, so only created for pairs in one of their rows.
     y = pulp.LpVariable.dicts("is_allocated",
-                             ((p, c) for p in products for c in channels),
+                             binary_pairs,
                               cat='Binary')
 
 
@@ -84,7 +151,7 @@ def optimize_allocation(products_df: pd.DataFrame,
 
     # --- Objective Function ---
     # Objective: Maximize total allocated quantity (Sell-Through)
-    total_quantity = pulp.lpSum(x[p, c] for p in products for c in channels)
+    total_quantity = pulp.lpSum(x[p, c] for p, c in eligible_pairs)
 
     model += (total_quantity, "Maximize_Total_Allocation")
 
@@ -100,59 +167,33 @@ def optimize_allocation(products_df: pd.DataFrame,
     # --- Constraints ---
 
     # 1. Supply Constraints: Cannot allocate more than available inventory for each product.
-    for p in products:
-        model += pulp.lpSum(x[p, c] for c in channels) <= inventory_quantity.get(p, 0), f"Supply_Product_{p}"
+    #    (Only where the pairs' upper bounds could exceed the inventory, NaN = row cannot bind.)
+    supply_limit = dict(zip(data['products'], data['supply_limit']))
+    for p, product_channels in channels_by_product.items():
+        if pd.notna(supply_limit[p]):
+            model += pulp.lpSum(x[p, c] for c in product_channels) <= supply_limit[p], f"Supply_Product_{p}"
 
     # 2. Channel Capacity Constraints: Different logic for outlets vs other channels.
-    for c in channels:
-        channel_type = channels_df.loc[c, 'channel_type']
-
-        if channel_type == 'outlet':
-            # Outlet Capacity: Max SKUs per (Division, Axe)
-            for (division, axe), group_products in products_by_outlet_capacity_group.items():
-                # Find the max SKU rule for this specific outlet, division, axe
-                max_skus = outlet_capacity_dict.get((c, division, axe)) # Lookup using channel ID
-                if max_skus is not None and max_skus >= 0: # Apply if rule exists
-                    model += pulp.lpSum(y[p, c] for p in group_products) <= max_skus, f"Outlet_Capacity_SKU_{c}_{division}_{axe}"
-            # Note: If a product's division/axe doesn't match any rule for this outlet, it's not constrained by *this* rule.
-            # Consider adding a default capacity rule or handling products not matching any rule.
+    # Outlet Capacity: Max SKUs per (Division, Axe)
+    for name, pair_positions, max_skus in data['outlet_capacity_rows']:
+        model += pulp.lpSum(y[eligible_pairs[k]] for k in pair_positions) <= max_skus, name
+    # Note: If a product's division/axe doesn't match any rule for this outlet, it's not constrained by *this* rule.
+    # Consider adding a default capacity rule or handling products not matching any rule.
 
-        else:
-            # Non-Outlet Capacity: Max total quantity
-            capacity = pd.to_numeric(channels_df.loc[c, 'capacity'], errors='coerce')
-            if pd.notna(capacity) and capacity >= 0:
-                 model += pulp.lpSum(x[p, c] for p in products) <= capacity, f"Capacity_Channel_{c}"
-            # else: handle cases where capacity might be missing or invalid if needed
+    # Non-Outlet Capacity: Max total quantity (NaN for outlets, missing/invalid and non-binding capacities)
+    channel_capacity = dict(zip(data['channels'], data['channel_capacity']))
+    for c, channel_products in products_by_channel.items():
+        capacity = channel_capacity[c]
+        if pd.notna(capacity):
+             model += pulp.lpSum(x[p, c] for p in channel_products) <= capacity, f"Capacity_Channel_{c}"
 
 
     # 3. Maximum Coverage (in Days) Constraints: Allocation <= Daily_Demand * Coverage_Days
-    for c in channels:
-        for p in products:
-            abc_class = products_df.loc[p].get('abc_class')
-            # Find the coverage days rule for this specific channel and product class
-            coverage_days = coverage_rules_dict.get((c, abc_class))
-
-            if coverage_days is not None and coverage_days >= 0: # Apply if rule exists
-                weekly_demand_qty = demand_dict.get((p, c), 0)
-                if weekly_demand_qty > 0:
-                    daily_demand = weekly_demand_qty / 7.0
-                    max_allowed_allocation = daily_demand * coverage_days
-                    model += x[p, c] <= max_allowed_allocation, f"Max_Coverage_Days_{p}_{c}"
-                else:
-                    # If weekly demand is 0, max coverage implies allocation should be 0
-                    model += x[p, c] <= 0, f"Max_Coverage_Days_Zero_Demand_{p}_{c}"
-            # else: Handle cases where abc_class is missing or no rule exists (currently no constraint applied)
+    #    Single-variable rows, folded into the upper bound of x[p, c] (see tighten_bounds).
 
 
     # 4. Donation Eligibility Constraints (Brand-Level Only):
-    donation_channels = channels_df[channels_df['channel_type'] == 'donation'].index.tolist()
-    if parameters.restricted_brands_for_donation and donation_channels:
-        restricted_brands = set(parameters.restricted_brands_for_donation) # These are 'brand'/'signature' names
-        for p in products:
-            product_brand = products_df.loc[p].get('brand')
-            if product_brand in restricted_brands:
-                 for c in donation_channels:
-                    model += x[p, c] == 0, f"Restricted_Brand_{product_brand}_Prod_{p}_Chan_{c}"
+    #    Restricted brands never get a (p, donation channel) variable, see build_eligible_pairs.
 
 #si pb de data quality : pas de marque pour un EAN => ne pas l'allouer et l'utilisateur le fera à la main
 #élargir à sub brand - axis (voir clearance norm : ex Armani Privé pas en outlet ou Armani Skincare)
@@ -161,52 +202,296 @@ def optimize_allocation(products_df: pd.DataFrame,
     # 5. Outlet Assortment Constraint: Max SKUs per (Metier, Subaxis, Brand/Signature) across all outlets.
     #    (Assumes rules in outlet_assortment_rules apply globally to the outlet channel type,
     #     modify if rules need to be per specific outlet channel ID).
-    for c in outlet_channels: # Apply constraint per outlet
-        for (metier, subaxis, brand), group_products in products_by_outlet_assortment_group.items():
-            # Find the max SKU rule for this specific metier, subaxis, brand
-            max_skus = outlet_assortment_dict.get((metier, subaxis, brand))
-            if max_skus is not None and max_skus >= 0: # Apply if rule exists
-                model += pulp.lpSum(y[p, c] for p in group_products) <= max_skus, f"Outlet_Assortment_{c}_{metier}_{subaxis}_{brand}"
-        # Note: If a product's attributes don't match any rule, it's not constrained by *this* rule.
+    for name, pair_positions, max_skus in data['outlet_assortment_rows']: # Applied per outlet
+        model += pulp.lpSum(y[eligible_pairs[k]] for k in pair_positions) <= max_skus, name
+    # Note: If a product's attributes don't match any rule, it's not constrained by *this* rule.
 
 
     # 6. Linking Constraints (x and y): If any quantity of product p is allocated to channel c (x > 0), then y must be 1.
     #    Use a 'Big M' approach. M should be larger than any possible value of x[p, c].
-    #    Using individual product inventory quantity as M is a safe upper bound.
-    for p in products:
-        M = inventory_quantity.get(p, 0) # Max quantity of product p
-        if M > 0: # Only add constraint if there's inventory
-            for c in channels:
-                model += x[p, c] <= M * y[p, c], f"Link_x_y_Prod_{p}_Chan_{c}"
-        else: # If no inventory, ensure y is also 0
-             for c in channels:
-                 model += y[p, c] == 0, f"Force_y_zero_Prod_{p}_Chan_{c}"
+    #    The pair's upper bound min(inventory, coverage cap, channel capacity) is the tightest safe M.
+    #    Eligible pairs always have a bound >= 1, so no Force_y_zero rows are needed.
+    for k in data['binary_pairs']:
+        p, c = eligible_pairs[k]
+        model += x[p, c] <= pair_upper_bound[k] * y[p, c], f"Link_x_y_Prod_{p}_Chan_{c}"
 
+    return model, x, y
 
-    # --- Solve the Model ---
-    # Write the model formulation to an .lp file for inspection/debugging
-    model.writeLP("allocation_model.lp")
-    # You might want to specify a solver, e.g., model.solve(pulp.PULP_CBC_CMD(msg=0))
-    solver_status = model.solve()
-    status_string = pulp.LpStatus[solver_status]
+
+def optimize_allocation(products_df: pd.DataFrame,
+                        channels_df: pd.DataFrame,
+                        inventory_df: pd.DataFrame,
+                        demand_dict: dict, # Assumes demand_quantity is WEEKLY demand
+                        parameters: OptimizationParameters,
+                        engine: str = None,
+                        previous_allocation: dict = None,
+                        progress=None):
+    """
+    Optimizes the allocation of inventory to different channels using Mixed Integer Programming.
+
+    Args:
+        products_df: DataFrame containing product information (indexed by SKU, columns: 'brand', 'division', 'axe', 'subaxis', 'metier', 'abc_class', etc.)
+        channels_df: DataFrame containing channel information (indexed by channel ID, columns: 'capacity', 'channel_type', etc.)
+        inventory_df: DataFrame containing inventory information (columns: 'product_sku', 'quantity')
+        demand_dict: Dictionary of WEEKLY demand {(product_sku, channel_id): demand_quantity}
+        parameters: OptimizationParameters object containing control parameters (coverage rules, capacity rules, assortment rules, etc.).
+        engine: 'cbc' builds a PuLP model solved by CBC, 'highs' builds sparse matrices solved in-process
+                by HiGHS (scipy.optimize.milp), 'greedy' runs the heuristic fill of heuristic.greedy_allocation
+                (feasible, no optimality proof). Defaults to parameters.solver.engine.
+        previous_allocation: Optional {(product_sku, channel_id): quantity} of the previous run. With
+                parameters.solver.mip_start == 'previous' it is repaired against the current supply,
+                capacities and rules, topped up greedily and used as the initial solution.
+        progress: Optional callable progress(phase, fraction) called with 'building' when the model
+                preparation starts and 'solving' when the solver starts (fraction = share of the
+                decomposed batches solved so far, 0.0 for a monolithic solve).
+
+    Returns:
+        Tuple: (model, status, list_of_allocation_decisions)
+               model: The PuLP model object ('cbc'), MatrixModel ('highs'), HeuristicModel ('greedy')
+                      or DecomposedModel (parameters.solver.decompose with more than one component).
+                      model.solver_stats holds engine, status, solution_status, objective,
+                      best_bound, gap, node_count and wall_time_seconds of the solve.
+                      model.run_report holds the RunReport of the run: wall and CPU time per phase
+                      (prepare, warm_start, build, solve, export, extract), model size per
+                      constraint family, peak RSS, the solver_stats and the 'artifact'
+                      ({'id', 'format', 'path'} of the LP/MPS export, see artifact_store, or None).
+               status: PuLP solver status string.
+               list_of_allocation_decisions: List of dictionaries representing allocations.
+                      With parameters.solver.anytime, this is the best incumbent when the solver
+                      stopped on a limit ('Solution Found') rather than a proven optimum.
+    """
+    settings = parameters.solver
+    engine = engine or settings.engine
+    if engine not in ENGINES:
+        raise ValueError(f"Unknown engine '{engine}', expected one of {ENGINES}.")
+
+    # --- Data Preparation & Parameter Processing ---
+    report = RunReport()
+    if progress:
+        progress('building', 0.0)
+    with report.phase('prepare'):
+        data = prepare_allocation_data(products_df, channels_df, inventory_df, demand_dict, parameters)
+    report.record_model_size(data)
+
+    # --- Warm start from the previous run (without one, 'previous' falls back to the greedy start) ---
+    initial_values = None
+    if settings.mip_start == 'previous' and previous_allocation:
+        with report.phase('warm_start'):
+            initial_values = greedy_allocation(data, repair_allocation(data, previous_allocation))
+
+    # --- Build & Solve (monolithic, or independent components in worker processes) ---
+    # Requested or sampled runs export their CBC model to the artifact store, in the background
+    artifact_format = model_artifacts().export_format(settings.export_model)
+    if settings.decompose:
+        model, status_string, pair_values = solve_decomposed(data, settings, engine, initial_values, progress, report,
+                                                             artifact_format)
+    else:
+        model, status_string, pair_values = solve_prepared_data(data, settings, engine, artifact_format=artifact_format,
+                                                                initial_values=initial_values, progress=progress,
+                                                                report=report)
 
     # --- Extract Results ---
+    # Anytime: an incumbent found before a time/gap limit is returned, tagged by solver_stats['solution_status']
     allocation_results = []
-    if status_string == 'Optimal':
-        for p in products:
-            for c in channels:
-                allocated_qty = x[p, c].value()
-                if allocated_qty is not None and allocated_qty > 0.1: # Use tolerance for float comparison
-                    allocation_results.append({
-                        'product_sku': p,
-                        'channel_id': c,
-                        'quantity': int(round(allocated_qty)) # Round and convert to int
-                        # 'revenue': revenue_dict.get((p, c), 0) * allocated_qty # Removed revenue calculation
-                    })
+    with report.phase('extract'):
+        if pair_values is not None:
+            allocation_results = extract_allocations(data, pair_values)
+    model.run_report = report.finish(model.solver_stats)
 
     # Return the model object along with status and results
     return model, status_string, allocation_results
 
+
+def solve_prepared_data(data: dict, settings, engine: str, artifact_format: str = None, initial_values=None, progress=None,
+                        report: RunReport = None):
+    """
+    Builds and solves the model of prepared allocation data with one engine.
+
+    Args:
+        data: Output of prepare_allocation_data (or one part of partition_allocation_data).
+        settings: SolverSettings.
+        engine: 'cbc', 'highs' or 'greedy'.
+        artifact_format: 'lp' or 'mps' to export the PuLP formulation to the artifact store once the
+                         solve is over (CBC only); the export runs in a background thread.
+        initial_values: Optional feasible allocated quantities aligned with data['eligible_pairs'],
+                        passed to CBC as MIP start and topped up by the greedy engine. Computed by
+                        greedy_allocation when settings.mip_start is set and none is given.
+                        Ignored by HiGHS (scipy.optimize.milp has no MIP start).
+        progress: Optional callable, called with ('solving', 0.0) when the solver starts.
+        report: Optional RunReport receiving the build, solve and export phase timings and the artifact.
+
+    Returns:
+        Tuple: (model, status, pair_values)
+               pair_values: float array of allocated quantities aligned with data['eligible_pairs'],
+                            None when the solve has no usable solution (see has_usable_solution).
+    """
+    report = report or RunReport()
+    if engine == 'greedy':
+        if progress:
+            progress('solving', 0.0)
+        with report.phase('solve'):
+            model = solve_greedy(data, initial_values) # A heuristic run is always used, whatever settings.anytime says
+        return model, model.solver_stats['status'], model.solution
+
+    if engine == 'highs':
+        with report.phase('build'):
+            model = build_matrix_model(data)
+        if progress:
+            progress('solving', 0.0)
+        with report.phase('solve'):
+            status_string = solve_matrix_model(model, highs_options(settings))
+        pair_values = None
+        if has_usable_solution(model.solver_stats, settings):
+            pair_values = model.solution[:model.num_pairs]
+        status_string = model.solver_stats['status'] = reported_status(status_string, model.solver_stats, settings)
+        return model, status_string, pair_values
+
+    with report.phase('build'):
+        model, x, y = build_pulp_model(data)
+
+        # --- MIP start (only useful when there are binaries, i.e. branch-and-bound) ---
+        if initial_values is None and settings.mip_start is not None:
+            initial_values = greedy_allocation(data)
+        warm_start = initial_values is not None and len(y) > 0
+        if warm_start:
+            for pair, value in zip(data['eligible_pairs'], initial_values):
+                x[pair].setInitialValue(value)
+                if pair in y:
+                    y[pair].setInitialValue(1 if value > 0 else 0)
+
+    # --- Solve the Model ---
+    if progress:
+        progress('solving', 0.0)
+    log_fd, log_path = tempfile.mkstemp(suffix='.log', prefix='cbc_')
+    os.close(log_fd)
+    try:
+        with report.phase('solve'):
+            start = time.perf_counter()
+            solver_status = model.solve(_cbc_command(settings, log_path, warm_start))
+            wall_time = time.perf_counter() - start
+        with open(log_path) as log_file:
+            cbc_stats = parse_cbc_log(log_file.read())
+    finally:
+        os.remove(log_path)
+        if artifact_format:
+            # Queued once CBC is done with the model (also after a solver error); never waited on
+            with report.phase('export'):
+                report.artifact = model_artifacts().submit(model, artifact_format)
+    status_string = pulp.LpStatus[solver_status]
+
+    solution_status = pulp.LpSolution[model.sol_status]
+    has_incumbent = solution_status in (SOLUTION_OPTIMAL, SOLUTION_FEASIBLE)
+    objective = pulp.value(model.objective) if has_incumbent else None
+    best_bound = cbc_stats['best_bound']
+    if solution_status == SOLUTION_OPTIMAL:
+        best_bound = objective # CBC only prints the bound when it stops before proving optimality
+    model.solver_stats = {
+        'engine': 'cbc',
+        'status': status_string,
+        'solution_status': solution_status,
+        'objective': objective,
+        'best_bound': best_bound,
+        'gap': relative_gap(objective, best_bound),
+        'node_count': cbc_stats['node_count'] if y else 0, # Pure LP: no branch-and-bound
+        'wall_time_seconds': wall_time,
+    }
+
+    pair_values = None
+    if has_usable_solution(model.solver_stats, settings):
+        pair_values = np.array([x[pair].value() or 0.0 for pair in data['eligible_pairs']])
+    status_string = model.solver_stats['status'] = reported_status(status_string, model.solver_stats, settings)
+    return model, status_string, pair_values
+
+
+def _solve_batch(sub_data: dict, settings, engine: str, initial_values=None):
+    """Worker-process entry point: solves one batch of components, returns picklable results only."""
+    model, status_string, pair_values = solve_prepared_data(sub_data, settings, engine, initial_values=initial_values)
+    return status_string, model.solver_stats, pair_values
+
+
+def _merge_solver_stats(engine: str, batch_results: list, wall_time: float) -> dict:
+    """Combines the solver_stats of independent batches into the stats of the full problem."""
+    batch_stats = [stats for _, stats, _ in batch_results]
+    usable = all(pair_values is not None for _, _, pair_values in batch_results)
+    if all(stats['solution_status'] == SOLUTION_OPTIMAL for stats in batch_stats):
+        solution_status = SOLUTION_OPTIMAL
+    elif usable:
+        solution_status = SOLUTION_FEASIBLE
+    else:
+        solution_status = next(stats['solution_status'] for stats in batch_stats
+                               if stats['solution_status'] not in (SOLUTION_OPTIMAL, SOLUTION_FEASIBLE))
+
+    objective = best_bound = None
+    if all(stats['objective'] is not None for stats in batch_stats):
+        objective = sum(stats['objective'] for stats in batch_stats)
+    if all(stats['best_bound'] is not None for stats in batch_stats):
+        best_bound = sum(stats['best_bound'] for stats in batch_stats)
+    return {
+        'engine': engine,
+        'status': 'Optimal' if usable else next(stats['status'] for stats in batch_stats if stats['status'] != 'Optimal'),
+        'solution_status': solution_status,
+        'objective': objective,
+        'best_bound': best_bound,
+        'gap': relative_gap(objective, best_bound),
+        'node_count': sum(stats['node_count'] or 0 for stats in batch_stats),
+        'wall_time_seconds': wall_time,
+    }
+
+
+def solve_decomposed(data: dict, settings, engine: str, initial_values=None, progress=None, report: RunReport = None,
+                     artifact_format: str = None):
+    """
+    Solves the independent components of the constraint graph in parallel worker processes.
+
+    No row spans two components, so the union of the component optima is an optimum of the
+    full model (same objective as a monolithic solve). Components are packed into balanced
+    batches, a few per worker, to keep the per-task overhead low on catalogues with thousands
+    of tiny components. Solver limits (time limit, gaps) apply to each batch, initial_values
+    (see solve_prepared_data) are split along the batches.
+
+    The workers' build and solve time is reported as one 'solve' phase of report. Batches are not
+    exported; artifact_format only applies when the model has a single component.
+
+    Returns:
+        Same (model, status, pair_values) contract as solve_prepared_data; model is a DecomposedModel.
+    """
+    workers = settings.workers or os.cpu_count() or 1
+    num_components, pair_component = find_components(data)
+    if num_components <= 1 or workers == 1:
+        return solve_prepared_data(data, settings, engine, artifact_format, initial_values=initial_values, progress=progress,
+                                   report=report)
+
+    num_batches = min(num_components, 4 * workers)
+    pair_batch = assign_batches(pair_component, num_components, num_batches)
+    parts = partition_allocation_data(data, pair_batch, num_batches)
+
+    report = report or RunReport()
+    start = time.perf_counter()
+    batch_results = []
+    with report.phase('solve'), ProcessPoolExecutor(max_workers=min(workers, len(parts))) as executor:
+        if progress:
+            progress('solving', 0.0)
+        for result in executor.map(_solve_batch, [sub_data for _, sub_data in parts],
+                                   [settings] * len(parts), [engine] * len(parts),
+                                   [None if initial_values is None else initial_values[positions]
+                                    for positions, _ in parts]):
+            batch_results.append(result)
+            if progress:
+                progress('solving', len(batch_results) / len(parts))
+    wall_time = time.perf_counter() - start
+
+    model = DecomposedModel(name="InventoryAllocation",
+                            num_components=num_components,
+                            batch_sizes=[len(positions) for positions, _ in parts])
+    model.solver_stats = _merge_solver_stats(engine, batch_results, wall_time)
+
+    pair_values = None
+    if all(values is not None for _, _, values in batch_results):
+        pair_values = np.zeros(len(data['eligible_pairs']))
+        for (positions, _), (_, _, values) in zip(parts, batch_results):
+            pair_values[positions] = values
+    return model, model.solver_stats['status'], pair_values
+
     # --- Example Usage (for testing purposes) ---
 if __name__ == '__main__':
     # Create sample data matching the expected DataFrame/dict structures
@@ -0,0 +1,328 @@
+"""
+Scaling benchmark of optimize_allocation on seeded synthetic instances.
+
+Sweeps SKUs x channels (1k to 10M pairs by default) for each engine, each case in a fresh
+process (peak RSS per case, CBC killed on timeout). Records the phase timings, memory and
+model size of the run report, appends the run to a JSON history and fails (exit code 1)
+when a phase is slower than the recent history by more than the threshold.
+
+Usage:
+    python backend/solver_benchmark.py --sizes 1000x10,10000x100 --engines cbc,highs --threshold 0.25
+    python backend/solver_benchmark.py --sizes 10000x100 --engines highs --incremental 10
+"""
+import argparse
+import json
+import multiprocessing
+import os
+import platform
+import queue
+import shutil
+import signal
+import statistics
+import sys
+import tempfile
+import time
+import traceback
+from datetime import datetime
+
+# SKUs x channels = 1k, 10k, 100k, 1M and 10M pairs
+DEFAULT_SIZES = ((100, 10), (1000, 10), (1000, 100), (10000, 100), (100000, 100))
+DEFAULT_ENGINES = ('cbc', 'highs', 'greedy')
+# Largest cross product run per engine by default (exact engines beyond this only measure the timeout)
+ENGINE_MAX_PAIRS = {'cbc': 1000000, 'highs': 10000000, 'greedy': 10000000}
+DEFAULT_HISTORY = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'data', 'benchmarks', 'solver_history.json')
+
+
+def run_case(engine: str, num_products: int, num_channels: int, seed: int = 0, time_limit: float = None) -> dict:
+    """
+    Generates one instance and solves it in this process.
+
+    Returns:
+        Result dictionary: the case, 'status', 'generate_seconds', 'phases' {phase: wall seconds},
+        'build_seconds' (prepare + warm_start + build), 'solve_seconds', 'total_seconds',
+        'peak_rss_bytes', 'peak_child_rss_bytes', 'model_size' and 'objective' / 'gap'.
+    """
+    from instance_generator import generate_instance
+    from solver import optimize_allocation
+
+    start = time.perf_counter()
+    instance = generate_instance(num_products, num_channels, seed=seed)
+    generate_seconds = time.perf_counter() - start
+    instance['parameters'].solver.time_limit_seconds = time_limit
+    model, status, _ = optimize_allocation(**instance, engine=engine)
+
+    report = model.run_report
+    phases = {name: timing['wall_seconds'] for name, timing in report['phases'].items()}
+    return {
+        'engine': engine,
+        'products': num_products,
+        'channels': num_channels,
+        'pairs': num_products * num_channels,
+        'seed': seed,
+        'status': status,
+        'generate_seconds': generate_seconds,
+        'phases': phases,
+        'build_seconds': sum(phases.get(name, 0.0) for name in ('prepare', 'warm_start', 'build')),
+        'solve_seconds': phases.get('solve', 0.0),
+        'total_seconds': report['wall_seconds'],
+        'peak_rss_bytes': report['peak_rss_bytes'],
+        'peak_child_rss_bytes': report['peak_child_rss_bytes'],
+        'model_size': {key: report['model_size'][key] for key in ('variables', 'binaries', 'rows', 'nonzeros')},
+        'objective': model.solver_stats['objective'],
+        'gap': model.solver_stats['gap'],
+    }
+
+
+def run_incremental_case(engine: str, num_products: int, num_channels: int, changed_skus: int = 10, seed: int = 0) -> dict:
+    """
+    Full solve of one instance, then an incremental re-optimization after changing the stock of a few SKUs.
+
+    Splits the incremental run into the work that still scales with the catalogue (prepare over
+    every pair, previous allocation aligned with every pair, extraction of the merged solution)
+    and the work that scales with the change (region model build and solve).
+
+    Returns:
+        Result dictionary: the case, 'status', 'full_seconds' (optimize_allocation), 'phases'
+        {phase: wall seconds} and 'total_seconds' of the incremental run, 'catalogue_seconds',
+        'region_seconds', 'region_pairs' and 'total_pairs'.
+    """
+    import numpy as np
+    from instance_generator import generate_instance
+    from solver import optimize_allocation
+    from incremental import reoptimize_allocation
+    from schemas import AllocationDelta
+
+    instance = generate_instance(num_products, num_channels, seed=seed)
+    model, _, allocations = optimize_allocation(**{**instance, 'products_df': instance['products_df'].copy(),
+                                                   'channels_df': instance['channels_df'].copy()}, engine=engine)
+    full_seconds = model.run_report['wall_seconds']
+    previous = {(res['product_sku'], res['channel_id']): res['quantity'] for res in allocations}
+
+    inventory = instance['inventory_df'].copy()
+    stocked = inventory['product_sku'].unique()
+    changed = np.random.default_rng(seed).choice(stocked, size=min(changed_skus, len(stocked)), replace=False)
+    inventory.loc[inventory['product_sku'].isin(changed), 'quantity'] += 5
+    model, status, _ = reoptimize_allocation(instance['products_df'].copy(), instance['channels_df'].copy(), inventory,
+                                             instance['demand_dict'], instance['parameters'], previous,
+                                             AllocationDelta(product_skus=[str(sku) for sku in changed]), engine=engine)
+
+    report = model.run_report
+    phases = {name: timing['wall_seconds'] for name, timing in report['phases'].items()}
+    return {
+        'engine': engine,
+        'products': num_products,
+        'channels': num_channels,
+        'changed_skus': len(changed),
+        'status': status,
+        'full_seconds': full_seconds,
+        'phases': phases,
+        'total_seconds': report['wall_seconds'],
+        'catalogue_seconds': sum(phases.get(name, 0.0) for name in ('prepare', 'region', 'extract')),
+        'region_seconds': sum(phases.get(name, 0.0) for name in ('warm_start', 'build', 'solve')),
+        'region_pairs': model.solver_stats['region_pairs'],
+        'total_pairs': model.solver_stats['total_pairs'],
+    }
+
+
+def _case_process(arguments, results):
+    """Child process entry point: own process group (CBC dies with it) and scratch cwd (CBC temporary files)."""
+    if hasattr(os, 'setpgrp'):
+        os.setpgrp()
+    os.chdir(tempfile.mkdtemp(prefix='solver_benchmark_'))
+    try:
+        results.put(run_case(*arguments))
+    except BaseException: # MemoryError included: that is what the sweep looks for
+        results.put({'status': 'error', 'error': traceback.format_exc()})
+    finally:
+        shutil.rmtree(os.getcwd(), ignore_errors=True)
+
+
+def run_isolated(engine: str, num_products: int, num_channels: int, seed: int = 0,
+                 time_limit: float = None, timeout: float = None) -> dict:
+    """run_case in a fresh process, killed with its CBC subprocess after timeout seconds."""
+    context = multiprocessing.get_context('spawn')
+    results = context.Queue()
+    process = context.Process(target=_case_process,
+                              args=((engine, num_products, num_channels, seed, time_limit), results))
+    process.start()
+    deadline = None if timeout is None else time.monotonic() + timeout
+    while True:
+        try:
+            result = results.get(timeout=1.0)
+            break
+        except queue.Empty:
+            pass
+        if not process.is_alive(): # Killed by the OOM killer, ...
+            try:
+                result = results.get(timeout=1.0)
+            except queue.Empty:
+                result = {'status': 'error', 'error': f"Exit code {process.exitcode}"}
+            break
+        if deadline is not None and time.monotonic() > deadline:
+            result = {'status': 'timeout', 'error': f"No result after {timeout} s"}
+            if hasattr(os, 'killpg'):
+                os.killpg(process.pid, signal.SIGKILL)
+            else:
+                process.kill()
+            break
+    process.join()
+    return {'engine': engine, 'products': num_products, 'channels': num_channels,
+            'pairs': num_products * num_channels, 'seed': seed, **result}
+
+
+def run_sweep(sizes=DEFAULT_SIZES, engines=DEFAULT_ENGINES, seed: int = 0, time_limit: float = None,
+              timeout: float = None, max_pairs: dict = None, log=print) -> list:
+    """Runs every (engine, size) case up to the engine's max_pairs (default ENGINE_MAX_PAIRS), smallest first."""
+    max_pairs = {**ENGINE_MAX_PAIRS, **(max_pairs or {})}
+    results = []
+    for num_products, num_channels in sorted(sizes, key=lambda size: size[0] * size[1]):
+        for engine in engines:
+            if num_products * num_channels > max_pairs.get(engine, float('inf')):
+                continue
+            result = run_isolated(engine, num_products, num_channels, seed, time_limit, timeout)
+            results.append(result)
+            if log:
+                log(format_result(result))
+    return results
+
+
+def format_incremental_result(result: dict) -> str:
+    return (f"{result['engine']:>6} {result['products']:>8} x {result['channels']:<5} {result['status']:<10} "
+            f"full {result['full_seconds']:8.2f} s  incremental {result['total_seconds']:8.2f} s "
+            f"(catalogue {result['catalogue_seconds']:.2f} s, region {result['region_seconds']:.2f} s)  "
+            f"pairs {result['region_pairs']}/{result['total_pairs']}")
+
+
+def format_result(result: dict) -> str:
+    head = f"{result['engine']:>6} {result['products']:>8} x {result['channels']:<5} {result['status']:<10}"
+    if 'total_seconds' not in result:
+        return f"{head} {' '.join((result.get('error') or '').strip().splitlines()[-1:])}"
+    rss = result['peak_rss_bytes'] or 0
+    return (f"{head} build {result['build_seconds']:8.2f} s  solve {result['solve_seconds']:8.2f} s  "
+            f"rss {rss / 2**20:8.0f} MiB  vars {result['model_size']['variables']:>9}  "
+            f"rows {result['model_size']['rows']:>8}  nnz {result['model_size']['nonzeros']:>9}")
+
+
+# --- History and regression check ---
+
+def load_history(path: str) -> list:
+    try:
+        with open(path) as history_file:
+            return json.load(history_file)
+    except FileNotFoundError:
+        return []
+
+
+def append_history(path: str, results: list, label: str = None) -> dict:
+    """Appends one run {created_at, label, host, python, results} to the JSON history file."""
+    run = {
+        'created_at': datetime.now().isoformat(timespec='seconds'),
+        'label': label,
+        'host': platform.node(),
+        'python': platform.python_version(),
+        'results': results,
+    }
+    history = load_history(path)
+    history.append(run)
+    os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+    temporary_path = f"{path}.{os.getpid()}.tmp"
+    with open(temporary_path, 'w') as history_file:
+        json.dump(history, history_file, indent=1)
+    os.replace(temporary_path, path)
+    return run
+
+
+def _timings(result: dict) -> dict:
+    """Timed phases of a result, plus the 'total'."""
+    return {**result.get('phases', {}), 'total': result['total_seconds']}
+
+
+def check_regressions(history: list, results: list, threshold: float = 0.25, min_seconds: float = 0.05,
+                      window: int = 5, host: str = None) -> list:
+    """
+    Phases of results slower than the recent history of the same case.
+
+    The baseline of an (engine, products, channels, seed) case and phase is the median over the
+    last window history runs (of host, when given) where the case succeeded. A phase regresses
+    when it is more than threshold (relative) slower than the baseline and at least min_seconds
+    slower (timer noise on small cases). A case that succeeded in the history and now fails or times out regresses too.
+
+    Returns:
+        List of {'engine', 'products', 'channels', 'phase', 'baseline_seconds', 'seconds', 'ratio'};
+        empty when nothing regressed.
+    """
+    if host is not None:
+        history = [run for run in history if run.get('host') == host]
+    baselines = {}
+    for run in history[-window:]:
+        for result in run['results']:
+            if 'total_seconds' not in result:
+                continue
+            case = (result['engine'], result['products'], result['channels'], result.get('seed', 0))
+            for phase, seconds in _timings(result).items():
+                baselines.setdefault(case, {}).setdefault(phase, []).append(seconds)
+
+    regressions = []
+    for result in results:
+        case = (result['engine'], result['products'], result['channels'], result.get('seed', 0))
+        if case not in baselines:
+            continue
+        if 'total_seconds' not in result:
+            timings = {'total': float('inf')}
+        else:
+            timings = _timings(result)
+        for phase, seconds in timings.items():
+            if phase not in baselines[case]:
+                continue
+            baseline = statistics.median(baselines[case][phase])
+            if seconds > baseline * (1 + threshold) and seconds - baseline >= min_seconds:
+                regressions.append({'engine': case[0], 'products': case[1], 'channels': case[2], 'phase': phase,
+                                    'baseline_seconds': baseline, 'seconds': seconds,
+                                    'ratio': seconds / baseline if baseline else float('inf')})
+    return regressions
+
+
+def parse_sizes(text: str) -> list:
+    """'1000x10,10000x100' -> [(1000, 10), (10000, 100)] (SKUs x channels)."""
+    return [tuple(int(value) for value in size.lower().split('x')) for size in text.split(',') if size]
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--sizes', type=parse_sizes, default=list(DEFAULT_SIZES), help="SKUsxchannels list, e.g. 1000x10,10000x100")
+    parser.add_argument('--engines', default=','.join(DEFAULT_ENGINES))
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--time-limit', type=float, default=600, help="Solver time limit per case (seconds)")
+    parser.add_argument('--timeout', type=float, default=1800, help="Wall-clock limit per case, generation included (seconds)")
+    parser.add_argument('--history', default=DEFAULT_HISTORY)
+    parser.add_argument('--label', default=None, help="Name of the run in the history (e.g. a commit)")
+    parser.add_argument('--threshold', type=float, default=0.25, help="Relative slowdown that fails the check")
+    parser.add_argument('--min-seconds', type=float, default=0.05, help="Absolute slowdown below which a phase never fails")
+    parser.add_argument('--window', type=int, default=5, help="History runs in the baseline median")
+    parser.add_argument('--no-save', action='store_true', help="Check against the history without appending the run")
+    parser.add_argument('--incremental', type=int, default=None, metavar='SKUS',
+                        help="Instead of the sweep, time a re-optimization after changing SKUS SKUs (in-process, no history)")
+    args = parser.parse_args(argv)
+
+    if args.incremental is not None:
+        for num_products, num_channels in sorted(args.sizes, key=lambda size: size[0] * size[1]):
+            for engine in args.engines.split(','):
+                print(format_incremental_result(run_incremental_case(engine, num_products, num_channels,
+                                                                     args.incremental, args.seed)))
+        return 0
+
+    results = run_sweep(args.sizes, args.engines.split(','), args.seed, args.time_limit, args.timeout)
+    history = load_history(args.history)
+    regressions = check_regressions(history, results, args.threshold, args.min_seconds, args.window,
+                                    host=platform.node())
+    if not args.no_save:
+        append_history(args.history, results, args.label)
+
+    for regression in regressions:
+        print(f"REGRESSION {regression['engine']} {regression['products']} x {regression['channels']} "
+              f"{regression['phase']}: {regression['baseline_seconds']:.3f} s -> {regression['seconds']:.3f} s")
+    return 1 if regressions else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
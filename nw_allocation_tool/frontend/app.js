@@ -114,12 +114,16 @@ document.addEventListener('DOMContentLoaded', () => {
                 throw new Error(`API Error (${response.status}): ${errorData.error || 'Unknown error'}`);
             }
 
-            const allocationResults = await response.json();
+            const allocationResponse = await response.json();
+            const stats = allocationResponse.solver_stats || {};
 
             // --- Display Results ---
-            statusMessage.textContent = 'Allocation successful!';
+            statusMessage.textContent = `Allocation ${allocationResponse.status} (${stats.engine}, ` +
+                `gap ${stats.gap != null ? (stats.gap * 100).toFixed(2) + '%' : 'n/a'}, ` +
+                `${stats.wall_time_seconds != null ? stats.wall_time_seconds.toFixed(2) : '?'} s, ` +
+                `${stats.node_count != null ? stats.node_count : '?'} nodes)`;
             statusMessage.style.color = 'green';
-            renderResultsTable(allocationResults);
+            renderResultsTable(allocationResponse.allocations);
 
         } catch (error) {
             console.error('Allocation failed:', error);
@@ -1,11 +1,26 @@
-from flask import Flask, request, jsonify
+import ast
+import json
+import logging
+import os
+from flask import Flask, request, jsonify, Response, send_file, g
 from flask_cors import CORS
-from flask_sqlalchemy import SQLAlchemy
+from werkzeug.serving import is_running_from_reloader
 from flask_jwt_extended import JWTManager, create_access_token, jwt_required, get_jwt_identity
-from datetime import datetime, timedelta
-import pandas as pd
-from backend.models import db, Product, Inventory, Channel, Allocation, User
-from backend.solver import optimize_allocation
+from backend.models import db, Channel, User, AllocationJob, AllocationRun
+from backend.schemas import OptimizationParameters, AllocationDelta, ScenarioVariant
+from backend.allocation_store import load_previous_allocation, save_allocation_run, delete_allocation_run
+from backend.jobs import JobRunner, submit_job, request_cancel
+from backend.solve_cache import SolveCache, cached_optimize_allocation
+from backend.incremental import reoptimize_allocation
+from backend.scenarios import run_scenarios, validate_scenarios
+from backend.data_loader import load_allocation_frames
+from backend.dashboard import (MetricsCache, inventory_metrics, summary_metrics, enable_inventory_summary,
+                               rebuild_inventory_summary)
+from backend.migrations import upgrade
+from backend.excel_parameters import ExcelParameterStore, build_rules, unresolved_labels
+from backend.run_report import RunMetrics
+from backend.artifact_store import artifact_path
+from backend.columnar_request import columnar_inputs, read_table
 from backend.config import Config
 
 app = Flask(__name__)
@@ -15,61 +30,295 @@ CORS(app)
 db.init_app(app)
 jwt = JWTManager(app)
 
+# Results of already-solved inputs (repeat scenarios return without building a model)
+solve_cache = SolveCache(max_entries=app.config['SOLVE_CACHE_ENTRIES'],
+                         directory=app.config['SOLVE_CACHE_DIR'] or None,
+                         max_disk_bytes=app.config['SOLVE_CACHE_MAX_BYTES'])
+
+# Per-phase timings and model sizes of the allocation runs, scraped on /metrics
+run_metrics = RunMetrics()
+
+# Business rules of the parameter workbooks (opt-in), parsed once (binary sidecars) and hot-reloaded on change
+excel_parameters = None
+if app.config['EXCEL_PARAMETERS_DIR']:
+    excel_parameters = ExcelParameterStore(app.config['EXCEL_PARAMETERS_DIR'],
+                                           cache_dir=app.config['EXCEL_CACHE_DIR'] or None)
+
+# Dashboard counts, maintained incrementally in InventorySummary when INVENTORY_SUMMARY is set
+dashboard_cache = MetricsCache(ttl_seconds=app.config['DASHBOARD_CACHE_SECONDS'])
+if app.config['INVENTORY_SUMMARY']:
+    enable_inventory_summary()
+
+def demand_dict_from_payload(demand):
+    """
+    Converts the request demand into the solver's {(product_sku, channel_id): weekly_quantity} dictionary.
+    Accepts a list of DemandInput-like dicts or the frontend mapping {"('SKU001', 'STORE1')": 40}.
+    """
+    if isinstance(demand, list):
+        return {(d['product_sku'], d['channel_id']): d['demand_quantity'] for d in demand}
+    return {tuple(ast.literal_eval(key)): quantity for key, quantity in demand.items()}
+
 @app.route('/api/dashboard/metrics', methods=['GET'])
 @jwt_required()
 def get_dashboard_metrics():
     try:
-        excess_stock = Inventory.query.filter_by(status='excess').count()
-        obsolete_items = Inventory.query.filter_by(status='obsolete').count()
-        returns = Inventory.query.filter_by(status='returned').count()
-        expiring_soon = Inventory.query.filter(
-            Inventory.expiry_date <= datetime.now() + timedelta(days=90)
-        ).count()
-
-        return jsonify({
-            'excess_stock': excess_stock,
-            'obsolete_items': obsolete_items,
-            'returns': returns,
-            'expiring_soon': expiring_soon
-        })
+        # One aggregated query (or the summary table), at most once per DASHBOARD_CACHE_SECONDS
+        metrics = summary_metrics if app.config['INVENTORY_SUMMARY'] else inventory_metrics
+        return jsonify(dashboard_cache.get(metrics))
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
+def allocation_inputs(data, tables=None):
+    """
+    Builds the optimize_allocation keyword arguments of an allocate request from its JSON body and the database.
+
+    Tables sent in columnar form ('columnar' in the body: {table: {column: array}}, or uploaded
+    files in tables) replace the database frames and the demand of the body.
+    """
+    tables = {**(data.get('columnar') or {}), **(tables or {})}
+    # Optional run scope, filtered in SQL: {'country', 'statuses', 'channel_types', 'stocked_only'}
+    scope = data.get('scope') or {}
+    products_df = channels_df = inventory_df = None
+    if not {'products', 'channels', 'inventory'} <= set(tables):
+        products_df, channels_df, inventory_df = load_allocation_frames(
+            country=scope.get('country'),
+            statuses=scope.get('statuses'),
+            channel_types=scope.get('channel_types'),
+            stocked_only=scope.get('stocked_only', False)
+        )
+    if tables:
+        # Vectorized validation, no per-row Pydantic objects (see backend/columnar_request.py)
+        frames = columnar_inputs(tables, products_df, channels_df, inventory_df)
+        products_df, channels_df, inventory_df = frames['products_df'], frames['channels_df'], frames['inventory_df']
+    demand_dict = frames['demand_dict'] if 'demand' in tables else demand_dict_from_payload(data.get('demand', {}))
+    raw_parameters = dict(data.get('parameters') or {})
+    if excel_parameters is not None:
+        # Rule families the request does not set come from the parameter workbooks (opt-in,
+        # EXCEL_PARAMETERS_DIR); which ones, and the labels that matched no channel, are reported
+        workbook_tables = excel_parameters.tables()
+        applied = []
+        for family, rules in build_rules(workbook_tables, channels_df).items():
+            if family not in raw_parameters:
+                raw_parameters[family] = rules
+                applied.append(family)
+        unresolved = unresolved_labels(workbook_tables, channels_df)
+        if unresolved:
+            app.logger.warning("Workbook channel labels matching no channel were skipped: %s", unresolved)
+        g.excel_parameters = {'applied': applied, 'unresolved_labels': unresolved}
+    parameters = OptimizationParameters(**raw_parameters) # Includes the 'solver' control block
+    # Warm start: the latest stored run, repaired against the current data by the solver
+    previous_allocation = load_previous_allocation() if parameters.solver.mip_start == 'previous' else None
+    return {
+        'products_df': products_df,
+        'channels_df': channels_df,
+        'inventory_df': inventory_df,
+        'demand_dict': demand_dict,
+        # 'revenue': data.get('revenue', {}) # Removed revenue
+        'parameters': parameters,
+        'previous_allocation': previous_allocation
+    }
+
+def run_allocation(inputs):
+    """Solves (or fetches from the solve cache), stores the run and returns the JSON response."""
+    allocation_result = cached_optimize_allocation(solve_cache, **inputs)
+
+    # The optimize_allocation function now returns model, status, results
+    model, status, allocation_result_list = allocation_result # Unpack the tuple
+
+    # Save allocation results to database (one AllocationRun header, rows in bulk). Runs without
+    # a usable solution (status other than 'Optimal') are not stored, so they never become a warm start
+    run_id = None
+    if status == 'Optimal':
+        run_id = save_allocation_run(allocation_result_list, model.solver_stats, inputs['parameters']).id
+    run_metrics.observe(model.run_report) # None on a cache hit
+    # Return the allocation decisions with the solver report (gap, wall time, node count)
+    # and the run report (time per phase, model size, peak memory)
+    return jsonify({
+        'run_id': run_id,
+        'status': status,
+        'allocations': allocation_result_list,
+        'solver_stats': model.solver_stats,
+        'run_report': model.run_report,
+        'excel_parameters': g.get('excel_parameters') # Workbook rule families applied, unresolved labels
+    })
+
 @app.route('/api/inventory/allocate', methods=['POST'])
 @jwt_required()
 def allocate_inventory():
     try:
         data = request.get_json()
-        allocation_result = optimize_allocation(
-            products_df=pd.DataFrame([p.to_dict() for p in Product.query.all()]),
-            channels_df=pd.DataFrame([c.to_dict() for c in Channel.query.all()]),
-            inventory_df=pd.DataFrame([i.to_dict() for i in Inventory.query.all()]),
-            demand=data.get('demand', {}),
-            # revenue=data.get('revenue', {}) # Removed revenue
-            parameters=data.get('parameters', {}) # Assuming parameters are passed in request body now
-        )
-        
-        # The optimize_allocation function now returns model, status, results
-        model, status, allocation_result_list = allocation_result # Unpack the tuple
-
-        # Save allocation results to database
-        # Ensure allocation_result_list is used here
-        for alloc in allocation_result_list: # Corrected loop variable
-            new_allocation = Allocation(
-                product_id=alloc['product_sku'], # Use 'product_sku' from results dict
-                channel_id=alloc['channel_id'],
-                quantity=alloc['quantity'],
-                allocation_date=datetime.now()
-            )
-            db.session.add(new_allocation)
-        
-        db.session.commit()
-        # Return the list of allocation decisions
-        return jsonify(allocation_result_list)
+        try:
+            inputs = allocation_inputs(data)
+        except ValueError as e: # Invalid parameters or columnar tables
+            return jsonify({'error': str(e)}), 400
+        return run_allocation(inputs)
     except Exception as e:
         db.session.rollback() # Rollback in case of error during commit
         return jsonify({'error': str(e)}), 500
 
+@app.route('/api/inventory/allocate/upload', methods=['POST'])
+@jwt_required()
+def allocate_inventory_upload():
+    """
+    Allocate from uploaded tables: multipart form with one Parquet or CSV file per table
+    ('products', 'channels', 'inventory', 'demand'; missing ones come from the database) and
+    optional 'parameters' / 'scope' JSON fields.
+    """
+    try:
+        try:
+            tables = {name: read_table(upload.stream, upload.filename) for name, upload in request.files.items()}
+            data = {key: json.loads(request.form[key]) for key in ('parameters', 'scope') if request.form.get(key)}
+            inputs = allocation_inputs(data, tables)
+        except ValueError as e: # Unreadable or invalid tables, invalid parameters
+            return jsonify({'error': str(e)}), 400
+        return run_allocation(inputs)
+    except Exception as e:
+        db.session.rollback()
+        return jsonify({'error': str(e)}), 500
+
+@app.route('/api/inventory/reallocate', methods=['POST'])
+@jwt_required()
+def reallocate_inventory():
+    """
+    Incremental re-optimization: same body as /api/inventory/allocate plus a 'delta'
+    (AllocationDelta) listing what changed since the latest stored run.
+    """
+    try:
+        data = request.get_json()
+        try:
+            inputs = allocation_inputs(data)
+            delta = AllocationDelta(**(data.get('delta') or {}))
+        except ValueError as e: # Invalid parameters, delta or columnar tables
+            return jsonify({'error': str(e)}), 400
+        previous_allocation = inputs.pop('previous_allocation') or load_previous_allocation()
+        if not previous_allocation:
+            return jsonify({'error': 'No stored allocation run to re-optimize from'}), 409
+        model, status, allocation_result_list = reoptimize_allocation(
+            **inputs, previous_allocation=previous_allocation, delta=delta)
+
+        run_id = None
+        if status == 'Optimal': # As run_allocation: only runs with a usable solution are stored
+            run_id = save_allocation_run(allocation_result_list, model.solver_stats, inputs['parameters']).id
+        run_metrics.observe(model.run_report)
+        return jsonify({
+            'run_id': run_id,
+            'status': status,
+            'allocations': allocation_result_list,
+            'solver_stats': model.solver_stats,
+            'run_report': model.run_report,
+            'excel_parameters': g.get('excel_parameters')
+        })
+    except Exception as e:
+        db.session.rollback()
+        return jsonify({'error': str(e)}), 500
+
+@app.route('/api/allocation/scenarios', methods=['POST'])
+@jwt_required()
+def compare_scenarios():
+    """
+    What-if comparison: same body as /api/inventory/allocate plus 'variants' (list of
+    ScenarioVariant) and optional 'include_allocations'. The base parameters and every variant
+    are solved with HiGHS on one structural model (see backend/scenarios.py); a solver.engine
+    other than 'highs' is rejected. No run is stored.
+    """
+    try:
+        data = request.get_json()
+        try:
+            inputs = allocation_inputs(data)
+            variants = [ScenarioVariant(**variant) for variant in data.get('variants') or []]
+            validate_scenarios(inputs['parameters'], variants)
+        except ValueError as e: # Invalid parameters, variants (names, engine) or columnar tables
+            return jsonify({'error': str(e)}), 400
+        inputs.pop('previous_allocation')
+        # Solved in this request: at most SCENARIO_WORKERS processes per comparison
+        comparison = run_scenarios(**inputs, variants=variants, max_workers=app.config['SCENARIO_WORKERS'],
+                                   include_allocations=bool(data.get('include_allocations')))
+        return jsonify({**comparison, 'excel_parameters': g.get('excel_parameters')})
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+# --- Asynchronous allocation jobs ---
+# Submit returns a job id at once; the solve runs in a JobRunner process and the
+# client polls the status, then fetches the result (or cancels the job).
+
+@app.route('/api/allocation/jobs', methods=['POST'])
+@jwt_required()
+def submit_allocation_job():
+    try:
+        data = request.get_json() or {}
+        OptimizationParameters(**(data.get('parameters') or {})) # Reject invalid parameters before queueing
+        job = submit_job(data, submitted_by=get_jwt_identity())
+        return jsonify(job.to_dict()), 202
+    except Exception as e:
+        db.session.rollback()
+        return jsonify({'error': str(e)}), 400
+
+@app.route('/api/allocation/jobs/<job_id>', methods=['GET'])
+@jwt_required()
+def get_allocation_job(job_id):
+    job = db.session.get(AllocationJob, job_id)
+    if job is None:
+        return jsonify({'error': 'Job not found'}), 404
+    return jsonify(job.to_dict())
+
+@app.route('/api/allocation/jobs/<job_id>/result', methods=['GET'])
+@jwt_required()
+def get_allocation_job_result(job_id):
+    job = db.session.get(AllocationJob, job_id)
+    if job is None:
+        return jsonify({'error': 'Job not found'}), 404
+    if job.status != 'done':
+        return jsonify({'error': f"Job is {job.status}", 'job': job.to_dict()}), 409
+    return app.response_class(job.result, mimetype='application/json') # Stored as JSON already
+
+@app.route('/api/allocation/jobs/<job_id>/cancel', methods=['POST'])
+@jwt_required()
+def cancel_allocation_job(job_id):
+    job = db.session.get(AllocationJob, job_id)
+    if job is None:
+        return jsonify({'error': 'Job not found'}), 404
+    return jsonify(request_cancel(job).to_dict())
+
+@app.route('/api/allocation/cache', methods=['GET'])
+@jwt_required()
+def get_solve_cache_counters():
+    return jsonify(solve_cache.counters)
+
+@app.route('/metrics', methods=['GET'])
+def prometheus_metrics():
+    """Prometheus scrape endpoint: run/phase time and model size histograms, solve-cache counters."""
+    body = run_metrics.render({'allocation_solve_cache_events_total': solve_cache.counters})
+    return Response(body, content_type='text/plain; version=0.0.4; charset=utf-8')
+
+@app.route('/api/allocation/artifacts/<artifact_id>.<artifact_format>.gz', methods=['GET'])
+@jwt_required()
+def get_model_artifact(artifact_id, artifact_format):
+    """Gzip LP/MPS export of a run (run_report['artifact']); 404 until written or after retention."""
+    path = artifact_path(app.config['MODEL_ARTIFACT_DIR'], artifact_id, artifact_format)
+    if path is None or not os.path.exists(path):
+        return jsonify({'error': 'Artifact not found'}), 404
+    return send_file(os.path.abspath(path), mimetype='application/gzip', as_attachment=True)
+
+# --- Stored allocation runs ---
+
+@app.route('/api/allocation/runs', methods=['GET'])
+@jwt_required()
+def list_allocation_runs():
+    limit = request.args.get('limit', 50, type=int)
+    runs = AllocationRun.query.order_by(AllocationRun.id.desc()).limit(limit).all()
+    return jsonify([run.to_dict() for run in runs])
+
+@app.route('/api/allocation/runs/<int:run_id>', methods=['DELETE'])
+@jwt_required()
+def delete_stored_allocation_run(run_id):
+    try:
+        if not delete_allocation_run(run_id):
+            return jsonify({'error': 'Run not found'}), 404
+        return jsonify({'deleted': run_id})
+    except Exception as e:
+        db.session.rollback()
+        return jsonify({'error': str(e)}), 500
+
 @app.route('/api/channels/secondlife', methods=['GET'])
 @jwt_required()
 def get_secondlife_channels():
@@ -105,10 +354,27 @@ def login():
         return jsonify({"msg": "Bad username or password"}), 401
 
 
+def save_job_result(job, result):
+    """Persists the allocations of a finished job as an allocation run (if the solve has a usable solution)."""
+    run_metrics.observe(result.get('run_report'))
+    if result['status'] != 'Optimal':
+        return
+    parameters = OptimizationParameters(**(json.loads(job.request_payload).get('parameters') or {}))
+    save_allocation_run(result['allocations'], result['solver_stats'], parameters)
+
+# Solver processes for the asynchronous jobs (the synchronous allocate, reallocate and scenario
+# routes still solve in the request thread). Never started at import: web workers importing this
+# module (and the spawned solver processes, which re-run it) must not claim jobs. It runs in its own
+# process (python -m backend.jobs), or inside the development server with START_JOB_RUNNER=1.
+job_runner = JobRunner(app, allocation_inputs, save_job_result,
+                       max_workers=app.config['JOB_WORKERS'], poll_interval=app.config['JOB_POLL_SECONDS'],
+                       cache=solve_cache)
+
 if __name__ == '__main__':
+    logging.basicConfig(level=logging.INFO) # Run reports are logged at INFO
     with app.app_context():
-        # Create tables first if they don't exist
-        db.create_all()
+        # Create tables first if they don't exist, then upgrade existing ones (columns, indexes)
+        upgrade()
 
         # Ensure a default user exists for testing if the table is empty
         if not User.query.first():
@@ -124,4 +390,10 @@ if __name__ == '__main__':
             db.session.commit()
             print("Created default user: testuser / password (stored insecurely)")
 
+        if app.config['INVENTORY_SUMMARY']:
+            rebuild_inventory_summary() # Backfill; ORM writes keep it current from here on
+
+    # With the reloader, only the serving child process runs the jobs (not the file watcher)
+    if app.config['START_JOB_RUNNER'] and is_running_from_reloader():
+        job_runner.start()
     app.run(debug=True)
@@ -0,0 +1,46 @@
+import unittest
+import tempfile
+import sys
+import os
+from flask import Flask
+
+# Add the project root directory to the Python path (backend.* imports)
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from backend.models import db, Allocation, Channel, Product
+from backend.allocation_store import load_previous_allocation, save_allocation_run
+
+class TestAllocationStore(unittest.TestCase):
+
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.app = Flask(__name__)
+        self.app.config['SQLALCHEMY_DATABASE_URI'] = f"sqlite:///{os.path.join(self.directory.name, 'store.db')}"
+        db.init_app(self.app)
+        with self.app.app_context():
+            db.create_all()
+            db.session.add_all([Product(id=7, item_id='SKU001'), Product(id=9, item_id='SKU002'),
+                                Channel(id=3, name='Paris Outlet', channel_type='outlet')])
+            db.session.commit()
+
+    def tearDown(self):
+        with self.app.app_context():
+            db.session.remove()
+            db.engine.dispose()
+        self.directory.cleanup()
+
+    def test_rows_store_database_ids_and_load_skus(self):
+        """Test that rows hold Product.id/Channel.id, unknown keys are skipped, and the warm start reads SKUs back."""
+        allocations = [{'product_sku': 'SKU001', 'channel_id': '3', 'quantity': 5},
+                       {'product_sku': 'SKU002', 'channel_id': '3', 'quantity': 2},
+                       {'product_sku': 'REQUEST_ONLY', 'channel_id': '3', 'quantity': 4},
+                       {'product_sku': 'SKU001', 'channel_id': 'NEW_CHANNEL', 'quantity': 1}]
+        with self.app.app_context():
+            run = save_allocation_run(allocations, {'status': 'Optimal'})
+            self.assertEqual(run.row_count, 2)
+            rows = db.session.query(Allocation.product_id, Allocation.channel_id).order_by(Allocation.product_id).all()
+            self.assertEqual(rows, [(7, 3), (9, 3)])
+            self.assertEqual(load_previous_allocation(), {('SKU001', '3'): 5, ('SKU002', '3'): 2})
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,80 @@
+import unittest
+import tempfile
+import pandas as pd
+import sys
+import os
+
+# Add the project root directory to the Python path (backend.* imports)
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '../backend')))
+
+from backend.columnar_request import columnar_inputs
+from solver import optimize_allocation
+from schemas import OptimizationParameters
+
+class TestColumnarRequest(unittest.TestCase):
+
+    def tables(self):
+        return {
+            'products': {'sku': ['SKU001', 'SKU002', 'SKU003'], 'donation_eligible': [True, False, True],
+                         'brand': ['BrandA', 'BrandA', 'BrandB'], 'abc_class': ['A', None, 'C']},
+            'channels': {'id': ['STORE1', 'DONATE1'], 'capacity': [100, 50], 'channel_type': ['store', 'donation']},
+            'inventory': {'product_sku': ['SKU001', 'SKU002', 'SKU003', 'SKU001'], 'quantity': [50, 30, 40, 20]},
+            'demand': {'product_sku': ['SKU001', 'SKU002'], 'channel_id': ['STORE1', 'STORE1'], 'demand_quantity': [40, 20]},
+        }
+
+    def test_columns_to_solver_inputs(self):
+        """Test that valid column arrays become the solver frames and demand dictionary."""
+        inputs = columnar_inputs(self.tables())
+        self.assertEqual(list(inputs['products_df'].index), ['SKU001', 'SKU002', 'SKU003'])
+        self.assertEqual(inputs['products_df'].loc['SKU002', 'brand'], 'BrandA')
+        self.assertEqual(inputs['channels_df'].loc['DONATE1', 'capacity'], 50)
+        self.assertEqual(inputs['inventory_df']['quantity'].sum(), 140)
+        self.assertEqual(inputs['demand_dict'], {('SKU001', 'STORE1'): 40, ('SKU002', 'STORE1'): 20})
+
+        model, status, results = optimize_allocation(**inputs, parameters=OptimizationParameters())
+        self.assertEqual(status, 'Optimal')
+        self.assertEqual(sum(res['quantity'] for res in results if res['channel_id'] == 'STORE1'), 100)
+
+    def test_invalid_columns_are_all_reported(self):
+        """Test that bad values, duplicate keys and unknown references are reported together, with row numbers."""
+        tables = self.tables()
+        tables['channels']['capacity'] = [100, -5]
+        tables['channels']['channel_type'] = ['store', 'warehouse']
+        tables['products']['donation_eligible'] = [True, 'maybe', False]
+        tables['demand']['demand_quantity'] = [40, 2.5]
+        with self.assertRaises(ValueError) as raised:
+            columnar_inputs(tables)
+        message = str(raised.exception)
+        self.assertIn('channels.capacity: below 0 in 1 row (e.g. 1)', message)
+        self.assertIn("channels.channel_type: value not in", message)
+        self.assertIn('products.donation_eligible: not a boolean in 1 row (e.g. 1)', message)
+        self.assertIn('demand.demand_quantity: not an integer in 1 row (e.g. 1)', message)
+
+        tables = self.tables()
+        tables['demand'] = {'product_sku': ['SKU001', 'SKU001', 'SKU999'], 'channel_id': ['STORE1', 'STORE1', 'STORE1'],
+                            'demand_quantity': [1, 2, 3]}
+        with self.assertRaises(ValueError) as raised:
+            columnar_inputs(tables)
+        self.assertIn('demand: duplicate product_sku/channel_id in 1 row (e.g. 1)', str(raised.exception))
+        del tables['demand']
+        tables['inventory']['product_sku'][3] = 'SKU999'
+        with self.assertRaises(ValueError) as raised:
+            columnar_inputs(tables)
+        self.assertIn("inventory.product_sku: unknown reference in 1 row (e.g. 3): ['SKU999']", str(raised.exception))
+
+    def test_csv_tables_and_database_frames(self):
+        """Test that CSV files are read as text and that tables left out come from the given frames."""
+        tables = self.tables()
+        with tempfile.TemporaryDirectory() as directory:
+            demand_path = os.path.join(directory, 'demand.csv')
+            pd.DataFrame({'product_sku': ['001', 'SKU002'], 'channel_id': ['STORE1', 'STORE1'],
+                          'demand_quantity': [4, 2]}).to_csv(demand_path, index=False)
+            products_df = pd.DataFrame(tables['products']).assign(sku=['001', 'SKU002', 'SKU003']).set_index('sku')
+            channels_df = pd.DataFrame(tables['channels']).set_index('id')
+            inputs = columnar_inputs({'demand': demand_path}, products_df, channels_df, pd.DataFrame(tables['inventory']))
+        self.assertIs(inputs['products_df'], products_df)
+        self.assertEqual(inputs['demand_dict'], {('001', 'STORE1'): 4, ('SKU002', 'STORE1'): 2}) # '001' stays text
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,89 @@
+import unittest
+from datetime import datetime, timedelta
+import sys
+import os
+from flask import Flask
+from sqlalchemy import event
+
+# Add the project root directory to the Python path (backend.* imports)
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from backend.models import db, Inventory, InventorySummary
+from backend import dashboard
+from backend.dashboard import (MetricsCache, inventory_metrics, summary_metrics, enable_inventory_summary,
+                               rebuild_inventory_summary)
+
+NOW = datetime(2025, 1, 1, 12, 0)
+
+class TestDashboard(unittest.TestCase):
+
+    def setUp(self):
+        self.app = Flask(__name__)
+        self.app.config['SQLALCHEMY_DATABASE_URI'] = 'sqlite://'
+        db.init_app(self.app)
+        self.context = self.app.app_context()
+        self.context.push()
+        db.create_all()
+        enable_inventory_summary()
+
+    def tearDown(self):
+        # The listeners are global to the Inventory mapper: remove them for the other test modules
+        for name, listener in (('after_insert', dashboard._after_insert), ('before_update', dashboard._before_update),
+                               ('before_delete', dashboard._before_delete)):
+            if event.contains(Inventory, name, listener):
+                event.remove(Inventory, name, listener)
+        db.session.remove()
+        db.drop_all()
+        self.context.pop()
+
+    def summary_rows(self):
+        return {(row.status, row.expiry_day): row.item_count for row in InventorySummary.query.all() if row.item_count}
+
+    def test_summary_follows_orm_inventory_writes(self):
+        """Test that inserts, updates and deletes through the session keep InventorySummary equal to the Inventory counts."""
+        soon, later = NOW + timedelta(days=10), NOW + timedelta(days=200)
+        items = [Inventory(status='excess', expiry_date=soon), Inventory(status='excess', expiry_date=later),
+                 Inventory(status='obsolete', expiry_date=None), Inventory(status='returned', expiry_date=soon)]
+        db.session.add_all(items)
+        db.session.commit()
+        expected = {'excess_stock': 2, 'obsolete_items': 1, 'returns': 1, 'expiring_soon': 2}
+        self.assertEqual(inventory_metrics(NOW), expected)
+        self.assertEqual(summary_metrics(NOW), expected)
+        self.assertEqual(self.summary_rows()[('excess', soon.date())], 1)
+
+        items[1].status = 'obsolete' # Status change
+        items[2].expiry_date = soon # Expiry change
+        items[0].quantity = 5 # Neither: the summary row is untouched
+        db.session.delete(items[3])
+        db.session.commit()
+        expected = {'excess_stock': 1, 'obsolete_items': 2, 'returns': 0, 'expiring_soon': 2}
+        self.assertEqual(inventory_metrics(NOW), expected)
+        self.assertEqual(summary_metrics(NOW), expected)
+        self.assertEqual(self.summary_rows(), {('excess', soon.date()): 1, ('obsolete', later.date()): 1,
+                                               ('obsolete', soon.date()): 1})
+
+        maintained = self.summary_rows()
+        rebuild_inventory_summary()
+        self.assertEqual(self.summary_rows(), maintained)
+
+    def test_cached_metrics_until_ttl_or_clear(self):
+        """Test that the dashboard cache serves the computed metrics within the TTL and recomputes after clear or expiry."""
+        db.session.add(Inventory(status='excess'))
+        db.session.commit()
+        cache = MetricsCache(ttl_seconds=60)
+        self.assertEqual(cache.get(summary_metrics)['excess_stock'], 1)
+
+        db.session.add(Inventory(status='excess'))
+        db.session.commit()
+        self.assertEqual(cache.get(summary_metrics)['excess_stock'], 1) # Cached
+        cache.clear()
+        self.assertEqual(cache.get(summary_metrics)['excess_stock'], 2)
+
+        expiring = MetricsCache(ttl_seconds=0)
+        self.assertEqual(expiring.get(inventory_metrics)['excess_stock'], 2)
+        db.session.add(Inventory(status='excess'))
+        db.session.commit()
+        self.assertEqual(expiring.get(inventory_metrics)['excess_stock'], 3)
+
+if __name__ == '__main__':
+    unittest.main()
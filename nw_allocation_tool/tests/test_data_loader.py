@@ -0,0 +1,84 @@
+import unittest
+import pandas as pd
+import sys
+import os
+from flask import Flask
+
+# Add the project root directory to the Python path (backend.* imports)
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from backend.models import db, Product, Inventory, Channel
+from backend.data_loader import load_allocation_frames
+
+class TestDataLoader(unittest.TestCase):
+
+    def setUp(self):
+        self.app = Flask(__name__)
+        self.app.config['SQLALCHEMY_DATABASE_URI'] = 'sqlite://'
+        db.init_app(self.app)
+        self.context = self.app.app_context()
+        self.context.push()
+        db.create_all()
+        db.session.add_all([
+            Product(id=1, item_id='SKU001', brand='BrandA', division='D1', axe='A1', subaxis='S1'),
+            Product(id=2, item_id='SKU002', brand='BrandB', division='D1', axe='A2', subaxis='S1'),
+            Product(id=3, item_id='SKU003', brand='BrandA', division='D2', axe='A1', subaxis=None),
+            Product(id=4, item_id=None, brand='BrandC'), # Not a solver product
+            Channel(id=10, channel_type='outlet', country='FR', capacity=100),
+            Channel(id=11, channel_type='donation', country='FR', capacity=None),
+            Channel(id=12, channel_type='outlet', country='IT', capacity=50),
+            Inventory(product_id=1, quantity=20, status='excess', country='FR'),
+            Inventory(product_id=1, quantity=5, status='obsolete', country='FR'),
+            Inventory(product_id=2, quantity=7, status='excess', country='IT'),
+            Inventory(product_id=4, quantity=9, status='excess', country='FR'),
+        ])
+        db.session.commit()
+
+    def tearDown(self):
+        db.session.remove()
+        db.drop_all()
+        self.context.pop()
+
+    def reference_frames(self):
+        """The frames as built before the projected loaders: query.all(), to_dict, then reshaped in pandas."""
+        products = pd.DataFrame([p.to_dict() for p in Product.query.all()]).dropna(subset=['item_id'])
+        products = products.set_index('item_id')[['brand', 'division', 'axe', 'subaxis']]
+        channels = pd.DataFrame([c.to_dict() for c in Channel.query.all()])
+        channels = channels.set_index(channels['id'].astype(str))[['capacity', 'channel_type', 'country']]
+        inventory = pd.DataFrame([i.to_dict() for i in Inventory.query.all()])
+        inventory['product_sku'] = inventory['product_id'].map({p.id: p.item_id for p in Product.query.all()})
+        return products, channels, inventory[inventory['product_sku'].isin(products.index)]
+
+    def test_frames_match_orm_output(self):
+        """Test that the projected loaders return the ORM rows with the solver index, columns and dtypes."""
+        products, channels, inventory = load_allocation_frames()
+        reference_products, reference_channels, reference_inventory = self.reference_frames()
+
+        self.assertEqual(list(products.index), ['SKU001', 'SKU002', 'SKU003'])
+        self.assertEqual(list(products.columns), ['brand', 'division', 'axe', 'subaxis'])
+        self.assertTrue(all(isinstance(dtype, pd.CategoricalDtype) for dtype in products.dtypes))
+        pd.testing.assert_frame_equal(products.astype(object), reference_products.astype(object), check_names=False)
+
+        self.assertEqual(list(channels.index), ['10', '11', '12'])
+        self.assertIsInstance(channels['channel_type'].dtype, pd.CategoricalDtype)
+        pd.testing.assert_frame_equal(channels.astype({'channel_type': object}),
+                                      reference_channels[['capacity', 'channel_type']], check_names=False)
+
+        expected = reference_inventory.groupby('product_sku')['quantity'].sum()
+        self.assertEqual(dict(zip(inventory['product_sku'], inventory['quantity'])), expected.to_dict())
+        self.assertEqual(dict(zip(inventory['product_sku'], inventory['quantity'])), {'SKU001': 25, 'SKU002': 7})
+
+    def test_scope_filters(self):
+        """Test that country, statuses, channel types and stocked_only are applied in the loaded frames."""
+        products, channels, inventory = load_allocation_frames(country='FR', statuses=['excess'],
+                                                               channel_types=['outlet'], stocked_only=True)
+        self.assertEqual(list(products.index), ['SKU001'])
+        self.assertEqual(list(channels.index), ['10'])
+        self.assertEqual(inventory.to_dict('records'), [{'product_sku': 'SKU001', 'quantity': 20}])
+
+        products, channels, inventory = load_allocation_frames(country='DE', stocked_only=True)
+        self.assertTrue(products.empty and channels.empty and inventory.empty)
+        self.assertEqual(list(channels.columns), ['capacity', 'channel_type'])
+
+if __name__ == '__main__':
+    unittest.main()
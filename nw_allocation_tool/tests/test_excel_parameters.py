@@ -0,0 +1,61 @@
+import unittest
+import tempfile
+import pandas as pd
+import sys
+import os
+
+# Add the project root directory to the Python path (backend.* imports)
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from backend.excel_parameters import ExcelParameterStore, unresolved_labels
+
+class TestExcelParameters(unittest.TestCase):
+
+    def write_coverage(self, directory, days):
+        pd.DataFrame({'Channel': ['Outlet', 'Outlet'], 'ABC Class': ['A', 'B'], 'Coverage (in days)': days}).to_excel(
+            os.path.join(directory, 'CoverageperABCperChannel.xlsx'), index=False)
+
+    def test_rules_sidecar_and_hot_reload(self):
+        """Test that workbooks become rules, are served from the sidecar, and are reloaded when they change."""
+        channels = pd.DataFrame({'channel_type': ['outlet', 'store']}, index=['OUTLET1', 'STORE1'])
+        with tempfile.TemporaryDirectory() as directory, tempfile.TemporaryDirectory() as cache_dir:
+            self.write_coverage(directory, [28, 21])
+            pd.DataFrame({'Channel': ['Outlet'], 'operational_division': ['CPD'], 'operational_axe_label': ['Hair'],
+                          'Max capacity (in # of SKU)': [3500]}).to_excel(os.path.join(directory, 'CapacityPerChannel.xlsx'), index=False)
+
+            store = ExcelParameterStore(directory, cache_dir=cache_dir, check_interval=0)
+            rules = store.rules(channels)
+            # 'Outlet' is a channel type: one channel-type rule, not one copy per outlet channel
+            self.assertEqual([(r.channel_id, r.channel_type, r.abc_class, r.coverage_days) for r in rules['coverage_days_rules']],
+                             [('*', 'outlet', 'A', 28), ('*', 'outlet', 'B', 21)])
+            self.assertEqual(rules['outlet_sku_capacity_rules'][0].max_skus, 3500)
+            self.assertNotIn('outlet_assortment_rules', rules) # Missing workbook
+            self.assertEqual(unresolved_labels(store.tables(), channels), {})
+            self.assertEqual(store.parse_count, 2)
+
+            restarted = ExcelParameterStore(directory, cache_dir=cache_dir, check_interval=0)
+            self.assertEqual(restarted.rules(channels), rules)
+            self.assertEqual(restarted.parse_count, 0) # Both read from the sidecars
+
+            self.write_coverage(directory, [30, 21])
+            path = os.path.join(directory, 'CoverageperABCperChannel.xlsx')
+            os.utime(path, (0, os.stat(path).st_mtime + 10)) # Distinct mtime on coarse filesystem clocks
+            self.assertEqual(restarted.rules(channels)['coverage_days_rules'][0].coverage_days, 30)
+            self.assertEqual(restarted.parse_count, 1)
+
+    def test_unresolved_channel_labels(self):
+        """Test that labels matching no channel ID, name or type are skipped and reported."""
+        channels = pd.DataFrame({'channel_type': ['outlet', 'store'], 'name': ['Paris Outlet', 'Lyon']},
+                                index=['OUTLET1', 'STORE1'])
+        with tempfile.TemporaryDirectory() as directory:
+            pd.DataFrame({'Channel': ['Lyon', 'TBA', 'STORE1'], 'ABC Class': ['A', 'A', 'B'],
+                          'Coverage (in days)': [14, 7, 21]}).to_excel(
+                os.path.join(directory, 'CoverageperABCperChannel.xlsx'), index=False)
+            store = ExcelParameterStore(directory, check_interval=0)
+            rules = store.rules(channels)['coverage_days_rules']
+            self.assertEqual([(r.channel_id, r.channel_type, r.coverage_days) for r in rules],
+                             [('STORE1', None, 14), ('STORE1', None, 21)])
+            self.assertEqual(unresolved_labels(store.tables(), channels), {'coverage_days_rules': ['TBA']})
+
+if __name__ == '__main__':
+    unittest.main()
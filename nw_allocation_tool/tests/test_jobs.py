@@ -0,0 +1,104 @@
+import unittest
+import multiprocessing
+import tempfile
+import time
+import pandas as pd
+import sys
+import os
+from flask import Flask
+
+# Add the project root directory to the Python path (backend.* imports)
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '../backend')))
+
+from backend.models import db, AllocationJob
+from backend.jobs import JobRunner, submit_job
+from schemas import OptimizationParameters, CoverageDaysRule
+
+class TestJobRunner(unittest.TestCase):
+
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.app = Flask(__name__)
+        self.app.config['SQLALCHEMY_DATABASE_URI'] = f"sqlite:///{os.path.join(self.directory.name, 'jobs.db')}"
+        db.init_app(self.app)
+        with self.app.app_context():
+            db.create_all()
+        self.results = {}
+
+    def tearDown(self):
+        with self.app.app_context():
+            db.session.remove()
+            db.engine.dispose()
+        self.directory.cleanup()
+
+    def load_inputs(self, payload):
+        """Two independent 'countries', so decompose solves two batches in a process pool."""
+        products = pd.DataFrame({'sku': ['FR1', 'FR2', 'IT1', 'IT2'], 'brand': ['BrandA', 'BrandB', 'BrandA', 'BrandB'],
+                                 'abc_class': ['A', 'A', 'A', 'A']}).set_index('sku')
+        channels = pd.DataFrame({'id': ['FR_STORE', 'FR_DONATE', 'IT_STORE', 'IT_DONATE'], 'capacity': [30, 20, 25, 40],
+                                 'channel_type': ['store', 'donation', 'store', 'donation']}).set_index('id')
+        inventory = pd.DataFrame({'product_sku': ['FR1', 'FR2', 'IT1', 'IT2'], 'quantity': [20, 25, 30, 10]})
+        demand = {('FR1', 'FR_STORE'): 14, ('FR2', 'FR_STORE'): 21, ('FR2', 'FR_DONATE'): 70,
+                  ('IT1', 'IT_STORE'): 35, ('IT1', 'IT_DONATE'): 7, ('IT2', 'IT_STORE'): 7}
+        rules = [CoverageDaysRule(channel_id=c, abc_class='A', coverage_days=14) for c in channels.index]
+        parameters = OptimizationParameters(coverage_days_rules=rules, **payload['parameters'])
+        return {'products_df': products, 'channels_df': channels, 'inventory_df': inventory,
+                'demand_dict': demand, 'parameters': parameters}
+
+    def save_result(self, job, result):
+        self.results[job.id] = result
+
+    def run_job(self, payload, timeout=60.0):
+        runner = JobRunner(self.app, self.load_inputs, self.save_result, max_workers=1)
+        with self.app.app_context():
+            job_id = submit_job(payload).id
+            deadline = time.monotonic() + timeout
+            try:
+                while time.monotonic() < deadline:
+                    runner.run_once()
+                    job = db.session.get(AllocationJob, job_id)
+                    db.session.refresh(job)
+                    if job.status in ('done', 'failed', 'cancelled'):
+                        return job.status, job.error, self.results.get(job_id)
+                    time.sleep(0.1)
+            finally:
+                runner.stop()
+        self.fail(f"Job {job_id} did not finish within {timeout} s")
+
+    def test_job_solves_in_solver_process(self):
+        """Test that a queued job is claimed, solved in its own process and its result saved."""
+        status, error, result = self.run_job({'parameters': {'solver': {'engine': 'highs'}}})
+        self.assertEqual(status, 'done', error)
+        self.assertEqual(result['status'], 'Optimal')
+        self.assertGreater(sum(res['quantity'] for res in result['allocations']), 0)
+
+    def test_decomposed_job_starts_its_worker_pool(self):
+        """Test that a decompose job can start the batch process pool inside its solver process."""
+        status, error, result = self.run_job({'parameters': {'solver': {'engine': 'highs', 'decompose': True, 'workers': 2}}})
+        self.assertEqual(status, 'done', error)
+        self.assertEqual(result['status'], 'Optimal')
+        self.assertEqual(result['solver_stats']['objective'], sum(res['quantity'] for res in result['allocations']))
+
+    def test_failed_process_start_fails_the_job(self):
+        """Test that a solver process that cannot start marks its job failed instead of leaving it claimed."""
+        class UnstartableProcess:
+            def __init__(self, *args, **kwargs):
+                pass
+
+            def start(self):
+                raise OSError("Cannot start a solver process")
+
+        runner = JobRunner(self.app, self.load_inputs, self.save_result, max_workers=1)
+        runner._context = type('Context', (), {'Process': UnstartableProcess,
+                                               'Pipe': staticmethod(multiprocessing.Pipe)})()
+        with self.app.app_context():
+            job_id = submit_job({'parameters': {}}).id
+            runner.run_once()
+            job = db.session.get(AllocationJob, job_id)
+            self.assertEqual(job.status, 'failed')
+            self.assertIn('Cannot start a solver process', job.error)
+            self.assertEqual(runner._processes, {})
+
+if __name__ == '__main__':
+    unittest.main()
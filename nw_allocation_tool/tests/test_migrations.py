@@ -0,0 +1,76 @@
+import unittest
+import tempfile
+import sys
+import os
+from flask import Flask
+from sqlalchemy import inspect, text
+
+# Add the project root directory to the Python path (backend.* imports)
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from backend.models import db
+from backend.migrations import MIGRATIONS, QUERY_INDEXES, upgrade, drop_query_indexes
+
+# Composite keys of the declared indexes (the single-column ones are checked by name only)
+COMPOSITE_INDEXES = {
+    'ix_inventory_country_status': ['country', 'status'],
+    'ix_channel_country_channel_type': ['country', 'channel_type'],
+    'ix_allocation_channel_id_allocation_date': ['channel_id', 'allocation_date'],
+    'ix_allocation_job_status_created_at': ['status', 'created_at'],
+}
+
+class TestMigrations(unittest.TestCase):
+
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.app = Flask(__name__)
+        self.app.config['SQLALCHEMY_DATABASE_URI'] = f"sqlite:///{os.path.join(self.directory.name, 'migrations.db')}"
+        db.init_app(self.app)
+        self.context = self.app.app_context()
+        self.context.push()
+
+    def tearDown(self):
+        db.session.remove()
+        db.engine.dispose()
+        self.context.pop()
+        self.directory.cleanup()
+
+    def indexes(self) -> dict:
+        inspector = inspect(db.engine)
+        return {index['name']: index['column_names']
+                for table in inspector.get_table_names() for index in inspector.get_indexes(table)}
+
+    def assert_schema(self):
+        indexes = self.indexes()
+        for name in QUERY_INDEXES:
+            self.assertIn(name, indexes)
+        for name, columns in COMPOSITE_INDEXES.items():
+            self.assertEqual(indexes[name], columns)
+        self.assertIn('run_id', [column['name'] for column in inspect(db.engine).get_columns('allocation')])
+
+    def test_upgrade_is_idempotent(self):
+        """Test that a fresh database gets every migration once, with the declared indexes."""
+        self.assertEqual(upgrade(), [name for name, _ in MIGRATIONS])
+        self.assert_schema()
+        self.assertEqual(upgrade(), [])
+        self.assert_schema()
+
+        drop_query_indexes()
+        self.assertFalse(set(QUERY_INDEXES) & set(self.indexes()))
+        self.assertEqual(upgrade(), ['0002_query_indexes'])
+        self.assert_schema()
+
+    def test_upgrade_in_place(self):
+        """Test that a database created before run headers and indexes is upgraded without losing rows."""
+        with db.engine.begin() as connection:
+            connection.execute(text("CREATE TABLE allocation (id INTEGER PRIMARY KEY, product_id INTEGER, channel_id INTEGER, "
+                                    "quantity INTEGER, allocation_date DATETIME, status VARCHAR(20))"))
+            connection.execute(text("INSERT INTO allocation (product_id, channel_id, quantity) VALUES (1, 2, 3)"))
+        self.assertEqual(upgrade(), [name for name, _ in MIGRATIONS])
+        self.assertEqual(upgrade(), [])
+        self.assert_schema()
+        with db.engine.connect() as connection:
+            self.assertEqual(connection.execute(text("SELECT quantity, run_id FROM allocation")).all(), [(3, None)])
+
+if __name__ == '__main__':
+    unittest.main()
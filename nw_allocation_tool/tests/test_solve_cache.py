@@ -0,0 +1,86 @@
+import unittest
+import tempfile
+import pandas as pd
+import sys
+import os
+
+# Add the backend directory to the Python path
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '../backend')))
+
+from solve_cache import SolveCache, CachedModel, allocation_fingerprint, cached_optimize_allocation
+from schemas import OptimizationParameters
+
+class TestSolveCache(unittest.TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        cls.sample_products = pd.DataFrame({
+            'sku': ['SKU001', 'SKU002', 'SKU003'],
+            'brand': ['BrandA', 'BrandA', 'BrandB']
+        }).set_index('sku')
+
+        cls.sample_channels = pd.DataFrame({
+            'id': ['STORE1', 'OUTLET1'],
+            'capacity': [50, 0],
+            'channel_type': ['store', 'outlet']
+        }).set_index('id')
+
+        cls.sample_inventory = pd.DataFrame({
+            'product_sku': ['SKU001', 'SKU002', 'SKU003', 'SKU001'],
+            'quantity': [20, 30, 40, 10]
+        })
+
+        cls.sample_demand = {('SKU001', 'STORE1'): 40, ('SKU002', 'STORE1'): 20}
+
+    def fingerprint(self, **overrides):
+        inputs = dict(products_df=self.sample_products, channels_df=self.sample_channels,
+                      inventory_df=self.sample_inventory, demand_dict=self.sample_demand,
+                      parameters=OptimizationParameters())
+        inputs.update(overrides)
+        return allocation_fingerprint(**inputs)
+
+    def test_fingerprint_is_canonical(self):
+        """Test that row order and split inventory lines do not change the key, but the inputs do."""
+        reordered = self.fingerprint(
+            products_df=self.sample_products.iloc[::-1],
+            inventory_df=pd.DataFrame({'product_sku': ['SKU003', 'SKU002', 'SKU001'], 'quantity': [40, 30, 30]}),
+            demand_dict=dict(reversed(list(self.sample_demand.items())))
+        )
+        self.assertEqual(reordered, self.fingerprint())
+        self.assertNotEqual(self.fingerprint(demand_dict={('SKU001', 'STORE1'): 41}), self.fingerprint())
+        self.assertNotEqual(self.fingerprint(parameters=OptimizationParameters(solver={'engine': 'highs'})), self.fingerprint())
+
+    def test_memory_and_disk_tiers(self):
+        """Test LRU eviction, disk hits and size-based disk eviction counters."""
+        value = {'status': 'Optimal', 'allocations': [{'product_sku': 'SKU001', 'channel_id': 'STORE1', 'quantity': 5}],
+                 'solver_stats': {'engine': 'cbc', 'solution_status': 'Optimal Solution Found'}}
+        with tempfile.TemporaryDirectory() as directory:
+            cache = SolveCache(max_entries=1, directory=directory)
+            cache.put('a', value)
+            cache.put('b', value)
+            self.assertEqual(cache.counters['memory_evictions'], 1)
+            self.assertEqual(cache.get('b'), value)
+            self.assertEqual(cache.get('a'), value) # Evicted from memory, still on disk
+            self.assertIsNone(cache.get('c'))
+            self.assertEqual((cache.counters['memory_hits'], cache.counters['disk_hits'], cache.counters['misses']), (1, 1, 1))
+
+            small = SolveCache(directory=directory, max_disk_bytes=1)
+            small.put('d', value)
+            self.assertEqual(os.listdir(directory), [])
+            self.assertEqual(small.counters['disk_evictions'], 3)
+
+    def test_repeat_solve_is_served_from_cache(self):
+        """Test that a repeated optimize_allocation call returns the stored result without solving."""
+        cache = SolveCache()
+        params = OptimizationParameters()
+        first = cached_optimize_allocation(cache, self.sample_products.copy(), self.sample_channels.copy(),
+                                           self.sample_inventory, self.sample_demand, params)
+        second = cached_optimize_allocation(cache, self.sample_products.copy(), self.sample_channels.copy(),
+                                            self.sample_inventory, self.sample_demand, params)
+        self.assertNotIsInstance(first[0], CachedModel)
+        self.assertIsInstance(second[0], CachedModel)
+        self.assertEqual(second[1:], first[1:])
+        self.assertEqual(second[0].solver_stats, first[0].solver_stats)
+
+if __name__ == '__main__':
+    unittest.main()
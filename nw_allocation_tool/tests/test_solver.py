@@ -1,4 +1,7 @@
 import unittest
+import gzip
+import tempfile
+import numpy as np
 import pandas as pd
 import sys
 import os
@@ -6,8 +9,17 @@ import os
 # Add the backend directory to the Python path
 sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '../backend')))
 
-from solver import optimize_allocation
-from schemas import OptimizationParameters
+from solver import optimize_allocation, parse_cbc_log, relative_gap, has_usable_solution, reported_status
+from schemas import OptimizationParameters, CoverageDaysRule, OutletSKUCapacityRule, AllocationDelta, ScenarioVariant
+from allocation_data import prepare_allocation_data
+from rule_index import compile_coverage_days, compile_outlet_capacity
+from heuristic import repair_allocation
+from incremental import reoptimize_allocation
+from run_report import RunMetrics
+from artifact_store import ArtifactStore
+from model_summary_generator import summarize_model, write_markdown
+from instance_generator import generate_instance
+from scenarios import run_scenarios, variant_parameters
 
 class TestSolver(unittest.TestCase):
 
@@ -75,6 +87,413 @@ class TestSolver(unittest.TestCase):
             if res['channel_id'] == 'DONATE1':
                 self.assertNotIn(res['product_sku'], ['SKU001', 'SKU002'])
 
+    def test_ineligible_pairs_get_no_variables(self):
+        """Test that only eligible (product, channel) pairs are turned into variables."""
+        params = OptimizationParameters(
+            restricted_brands_for_donation=['BrandA'], # SKU001, SKU002 are BrandA
+            coverage_days_rules=[CoverageDaysRule(channel_id='STORE1', abc_class='A', coverage_days=7)]
+        )
+        products = self.sample_products.assign(abc_class=['A', 'B', 'A', 'A'])
+        inventory = pd.DataFrame({'product_sku': ['SKU001', 'SKU002', 'SKU003'], 'quantity': [10, 10, 10]})
+        model, status, results = optimize_allocation(
+            products, self.sample_channels, inventory, self.sample_demand, params
+        )
+        self.assertEqual(status, "Optimal")
+        variable_names = {v.name for v in model.variables()}
+        # No inventory -> no variable for SKU004
+        self.assertFalse(any('SKU004' in name for name in variable_names))
+        # Restricted brand -> no donation variable
+        self.assertNotIn("allocation_qty_('SKU001',_'DONATE1')", variable_names)
+        self.assertIn("allocation_qty_('SKU003',_'DONATE1')", variable_names)
+        # Coverage rule with demand -> variable kept; without demand -> no variable
+        self.assertIn("allocation_qty_('SKU001',_'STORE1')", variable_names)
+        self.assertNotIn("allocation_qty_('SKU003',_'STORE1')", variable_names)
+        # Class B has no rule on STORE1, so SKU002 stays eligible there
+        self.assertIn("allocation_qty_('SKU002',_'STORE1')", variable_names)
+        self.assertFalse(any(name.startswith('Force_y_zero') for name in model.constraints))
+
+    def test_coverage_rules_become_variable_bounds(self):
+        """Test that coverage caps are variable upper bounds (and big-M values) instead of rows."""
+        params = OptimizationParameters(coverage_days_rules=[
+            CoverageDaysRule(channel_id='STORE1', abc_class='A', coverage_days=1), # SKU001: 40/7 -> 5
+            CoverageDaysRule(channel_id='STORE2', abc_class='A', coverage_days=1), # SKU001: 30/7 -> 4
+        ])
+        products = self.sample_products.assign(abc_class=['A', 'B', 'B', 'A'])
+        demand = {**self.sample_demand, ('SKU004', 'STORE1'): 3} # 3/7 < 1 unit -> fixed to zero
+        model, status, results = optimize_allocation(
+            products, self.sample_channels, self.sample_inventory, demand, params
+        )
+        self.assertEqual(status, "Optimal")
+        variables = model.variablesDict()
+        self.assertEqual(variables["allocation_qty_('SKU001',_'STORE1')"].upBound, 5)
+        self.assertEqual(variables["allocation_qty_('SKU001',_'STORE2')"].upBound, 4)
+        self.assertEqual(variables["allocation_qty_('SKU002',_'STORE1')"].upBound, 30) # No rule: inventory
+        self.assertNotIn("allocation_qty_('SKU004',_'STORE1')", variables)
+        self.assertFalse(any(name.startswith('Max_Coverage_Days') for name in model.constraints))
+
+    def test_binaries_only_for_outlet_rule_pairs(self):
+        """Test that y/linking rows only exist in SKU-count rule groups, and that without rules the model is an LP."""
+        products = self.sample_products.assign(division=['D1', 'D1', 'D1', 'D2'], axe='A1')
+        model, status, results = optimize_allocation(
+            products, self.sample_channels, self.sample_inventory, self.sample_demand, OptimizationParameters()
+        )
+        self.assertEqual(status, "Optimal")
+        self.assertFalse(model.isMIP())
+        self.assertFalse(any(name.startswith('Link_x_y') for name in model.constraints))
+        self.assertTrue(all(res['quantity'] == int(res['quantity']) for res in results))
+
+        params = OptimizationParameters(outlet_sku_capacity_rules=[
+            OutletSKUCapacityRule(channel_id='OUTLET1', division='D1', axe='A1', max_skus=1)
+        ])
+        for engine in ('highs', 'cbc'):
+            model, status, results = optimize_allocation(
+                products.copy(), self.sample_channels.copy(), self.sample_inventory, self.sample_demand, params, engine=engine
+            )
+            self.assertEqual(status, "Optimal")
+            outlet_skus = {res['product_sku'] for res in results if res['channel_id'] == 'OUTLET1'}
+            self.assertLessEqual(len(outlet_skus - {'SKU004'}), 1)
+        # Only the OUTLET1 pairs of the (D1, A1) group get a binary
+        binaries = {v.name for v in model.variables() if v.name.startswith('is_allocated')}
+        self.assertEqual(binaries, {f"is_allocated_('{p}',_'OUTLET1')" for p in ('SKU001', 'SKU002', 'SKU003')})
+
+    def test_rule_wildcards_and_channel_type_defaults(self):
+        """Test that the compiled rule index applies wildcards, channel-type defaults and per-channel overrides."""
+        products = self.sample_products.assign(abc_class=['A', 'B', 'B', 'A'], division=['D1', 'D1', 'D1', 'D2'], axe='A1')
+        params = OptimizationParameters(
+            coverage_days_rules=[
+                CoverageDaysRule(channel_id='STORE1', abc_class='A', coverage_days=7), # Override
+                CoverageDaysRule(channel_type='store', abc_class='*', coverage_days=1), # Store default
+            ],
+            outlet_sku_capacity_rules=[
+                OutletSKUCapacityRule(channel_type='outlet', division='D1', axe='*', max_skus=1),
+            ])
+        data = prepare_allocation_data(products.copy(), self.sample_channels.copy(), self.sample_inventory, self.sample_demand, params)
+        caps = dict(zip(data['eligible_pairs'], data['pair_upper_bound']))
+        self.assertEqual(caps[('SKU001', 'STORE1')], 40) # 40/7 * 7
+        self.assertEqual(caps[('SKU001', 'STORE2')], 4) # 30/7 * 1
+        self.assertNotIn(('SKU003', 'STORE1'), caps) # Default rule without demand
+        self.assertEqual([(name, max_skus) for name, _, max_skus in data['outlet_capacity_rows']],
+                         [('Outlet_Capacity_SKU_OUTLET1_D1_A1', 1)])
+
+    def test_single_cell_defaults_do_not_override_specific_rules(self):
+        """Test that a channel-type or wildcard rule matching one cell never beats a more specific rule, in any order."""
+        channels, channel_types = pd.Index(['S1', 'O1']), np.array(['store', 'outlet'])
+        explicit = CoverageDaysRule(channel_id='O1', abc_class='A', coverage_days=7)
+        default = CoverageDaysRule(channel_type='outlet', abc_class='A', coverage_days=1) # Only one outlet
+        for rules in ([explicit, default], [default, explicit]):
+            self.assertEqual(compile_coverage_days(channels, channel_types, rules)[1, 0], 7)
+
+        group_keys = [('D1', 'A1'), ('D2', 'A1')]
+        explicit = OutletSKUCapacityRule(channel_id='O1', division='D1', axe='A1', max_skus=5)
+        wildcard = OutletSKUCapacityRule(channel_id='O1', division='D1', axe='*', max_skus=2) # Only one D1 group
+        for rules in ([explicit, wildcard], [wildcard, explicit]):
+            self.assertEqual(compile_outlet_capacity(channels, channel_types, group_keys, rules)[1, 0], 5)
+
+    def test_highs_engine_matches_cbc(self):
+        """Test that the matrix/HiGHS engine returns the same contract and objective as PuLP/CBC."""
+        params = OptimizationParameters(
+            restricted_brands_for_donation=['BrandA'],
+            coverage_days_rules=[CoverageDaysRule(channel_id='STORE1', abc_class='A', coverage_days=7)]
+        )
+        products = self.sample_products.assign(abc_class=['A', 'B', 'A', 'A'])
+        totals = {}
+        for engine in ('cbc', 'highs'):
+            model, status, results = optimize_allocation(
+                products.copy(), self.sample_channels.copy(), self.sample_inventory,
+                self.sample_demand, params, engine=engine
+            )
+            self.assertEqual(status, "Optimal")
+            for res in results:
+                self.assertEqual(set(res), {'product_sku', 'channel_id', 'quantity'})
+                if res['channel_id'] == 'DONATE1':
+                    self.assertNotIn(res['product_sku'], ['SKU001', 'SKU002'])
+            totals[engine] = sum(res['quantity'] for res in results)
+        self.assertEqual(totals['cbc'], totals['highs'])
+
+    def test_greedy_engine_and_mip_start(self):
+        """Test that the greedy engine is feasible and that CBC seeded with it still reaches the optimum."""
+        products = self.sample_products.assign(division='D1', axe='A1')
+        params = OptimizationParameters(
+            restricted_brands_for_donation=['BrandA'],
+            outlet_sku_capacity_rules=[OutletSKUCapacityRule(channel_id='OUTLET1', division='D1', axe='A1', max_skus=2)]
+        )
+        model, status, greedy_results = optimize_allocation(
+            products.copy(), self.sample_channels.copy(), self.sample_inventory, self.sample_demand, params, engine='greedy'
+        )
+        self.assertEqual(status, "Optimal")
+        self.assertEqual(model.solver_stats['solution_status'], 'Solution Found')
+        allocated = pd.DataFrame(greedy_results)
+        supply = self.sample_inventory.groupby('product_sku')['quantity'].sum()
+        self.assertTrue((allocated.groupby('product_sku')['quantity'].sum() <= supply.reindex(allocated['product_sku'].unique())).all())
+        for channel_id, capacity in self.sample_channels.loc[['STORE1', 'DONATE1', 'STORE2'], 'capacity'].items():
+            self.assertLessEqual(allocated.loc[allocated['channel_id'] == channel_id, 'quantity'].sum(), capacity)
+        self.assertLessEqual((allocated['channel_id'] == 'OUTLET1').sum(), 2)
+        self.assertFalse(((allocated['channel_id'] == 'DONATE1') & allocated['product_sku'].isin(['SKU001', 'SKU002'])).any())
+
+        exact = optimize_allocation(products.copy(), self.sample_channels.copy(), self.sample_inventory, self.sample_demand, params)[0]
+        params.solver.mip_start = 'greedy'
+        seeded = optimize_allocation(products.copy(), self.sample_channels.copy(), self.sample_inventory, self.sample_demand, params)[0]
+        self.assertEqual(seeded.solver_stats['objective'], exact.solver_stats['objective'])
+        self.assertGreaterEqual(exact.solver_stats['objective'], model.solver_stats['objective'])
+
+    def test_previous_allocation_warm_start(self):
+        """Test that a stale previous run is repaired to a feasible start and the solve still reaches the optimum."""
+        params = OptimizationParameters()
+        exact = optimize_allocation(self.sample_products.copy(), self.sample_channels.copy(), self.sample_inventory,
+                                    self.sample_demand, params)[0]
+        previous = {('SKU001', 'STORE1'): 90, ('SKU002', 'STORE1'): 30, ('SKU004', 'DONATE1'): 60, ('SKU999', 'STORE1'): 5}
+        data = prepare_allocation_data(self.sample_products.copy(), self.sample_channels.copy(), self.sample_inventory,
+                                       self.sample_demand, params)
+        repaired = dict(zip(data['eligible_pairs'], repair_allocation(data, previous)))
+        self.assertLessEqual(repaired[('SKU001', 'STORE1')] + repaired[('SKU002', 'STORE1')], 100) # STORE1 capacity
+        self.assertLessEqual(repaired[('SKU001', 'STORE1')], 70) # SKU001 supply
+        self.assertEqual(repaired[('SKU004', 'DONATE1')], 50) # DONATE1 capacity
+
+        params.solver.mip_start = 'previous'
+        objectives = {}
+        for engine in ('cbc', 'greedy'):
+            model, status, results = optimize_allocation(
+                self.sample_products.copy(), self.sample_channels.copy(), self.sample_inventory,
+                self.sample_demand, params, engine=engine, previous_allocation=previous
+            )
+            self.assertEqual(status, "Optimal")
+            objectives[engine] = model.solver_stats['objective']
+        self.assertEqual(objectives['cbc'], exact.solver_stats['objective'])
+        self.assertLessEqual(objectives['greedy'], objectives['cbc'])
+
+    def test_incremental_reoptimization(self):
+        """Test that a delta re-solves only the affected pairs and falls back to a full solve on a stale run."""
+        params = OptimizationParameters()
+        results = optimize_allocation(self.sample_products.copy(), self.sample_channels.copy(), self.sample_inventory,
+                                      self.sample_demand, params)[2]
+        previous = {(res['product_sku'], res['channel_id']): res['quantity'] for res in results}
+
+        inventory = self.sample_inventory.copy()
+        inventory.loc[inventory['product_sku'] == 'SKU003', 'quantity'] += 10
+        exact = optimize_allocation(self.sample_products.copy(), self.sample_channels.copy(), inventory,
+                                    self.sample_demand, params)[0]
+        model, status, merged = reoptimize_allocation(
+            self.sample_products.copy(), self.sample_channels.copy(), inventory, self.sample_demand, params,
+            previous, AllocationDelta(product_skus=['SKU003'])
+        )
+        self.assertEqual(status, "Optimal")
+        self.assertEqual(model.solver_stats['objective'], exact.solver_stats['objective'])
+        self.assertLess(model.solver_stats['region_pairs'], model.solver_stats['total_pairs'])
+        for res in merged:
+            if res['product_sku'] != 'SKU003':
+                self.assertEqual(res['quantity'], previous[(res['product_sku'], res['channel_id'])])
+
+        # SKU001 lost stock but the delta does not say so: the fixed part is infeasible, full solve
+        inventory = self.sample_inventory[self.sample_inventory['quantity'] != 20]
+        model, status, merged = reoptimize_allocation(
+            self.sample_products.copy(), self.sample_channels.copy(), inventory, self.sample_demand, params,
+            previous, AllocationDelta()
+        )
+        self.assertEqual(model.solver_stats['region_pairs'], model.solver_stats['total_pairs'])
+        self.assertLessEqual(sum(res['quantity'] for res in merged if res['product_sku'] == 'SKU001'), 50)
+
+    def test_run_report_and_metrics(self):
+        """Test that a run reports its phases and model size, and that the metrics render as Prometheus histograms."""
+        products = self.sample_products.assign(division=['D1', 'D1', 'D1', 'D2'], axe='A1')
+        params = OptimizationParameters(outlet_sku_capacity_rules=[
+            OutletSKUCapacityRule(channel_id='OUTLET1', division='D1', axe='A1', max_skus=1)
+        ])
+        model, status, results = optimize_allocation(
+            products, self.sample_channels.copy(), self.sample_inventory, self.sample_demand, params, engine='cbc'
+        )
+        report = model.run_report
+        self.assertEqual(list(report['phases']), ['prepare', 'build', 'solve', 'extract'])
+        self.assertIsNone(report['artifact']) # No model export unless asked (or sampled)
+        self.assertTrue(all(timing['wall_seconds'] >= 0 for timing in report['phases'].values()))
+        size = report['model_size']
+        self.assertEqual(size['variables'], len(model.variables()))
+        self.assertEqual(size['binaries'], 3)
+        self.assertEqual(size['rows'], len(model.constraints))
+        self.assertEqual(size['families']['Outlet_Capacity_SKU'], {'rows': 1, 'nonzeros': 3})
+        self.assertEqual(report['solver_stats'], model.solver_stats)
+
+        metrics = RunMetrics()
+        metrics.observe(report)
+        metrics.observe(None) # Cache hit: no report
+        text = metrics.render({'allocation_solve_cache_events_total': {'misses': 1}})
+        self.assertIn('allocation_phase_seconds_count{engine="cbc",phase="solve"} 1', text)
+        self.assertIn('allocation_run_seconds_bucket{engine="cbc",le="+Inf"} 1', text)
+        self.assertIn('allocation_runs_total{engine="cbc",status="Optimal"} 1', text)
+        self.assertIn('allocation_solve_cache_events_total{event="misses"} 1', text)
+
+    def test_model_artifact_store(self):
+        """Test that model exports are written in the background, gzip-compressed, and pruned by retention."""
+        model, status, results = optimize_allocation(
+            self.sample_products.copy(), self.sample_channels.copy(), self.sample_inventory,
+            self.sample_demand, OptimizationParameters(), engine='cbc'
+        )
+        with tempfile.TemporaryDirectory() as directory:
+            store = ArtifactStore(directory, max_count=1)
+            first = store.submit(model, 'lp')
+            store.flush()
+            os.utime(first['path'], (0, 0))
+            second = store.submit(model, 'mps')
+            store.flush()
+            self.assertEqual(store.counters['written'], 2)
+            self.assertEqual([path for _, _, path in store.artifacts()], [second['path']]) # Oldest one deleted
+            self.assertFalse(os.path.exists(first['path']))
+            with gzip.open(second['path'], 'rt') as artifact:
+                self.assertIn('ROWS', artifact.read())
+            self.assertEqual(sorted(os.listdir(directory)), [os.path.basename(second['path'])]) # No temporary file left
+            with self.assertRaises(ValueError):
+                store.submit(model, 'xml')
+
+    def test_model_summary_any_engine(self):
+        """Test that the model summary gives the same constraint families for CBC and HiGHS, and counts for greedy."""
+        products = self.sample_products.assign(division=['D1', 'D1', 'D1', 'D2'], axe='A1')
+        params = OptimizationParameters(outlet_sku_capacity_rules=[
+            OutletSKUCapacityRule(channel_id='OUTLET1', division='D1', axe='A1', max_skus=1)
+        ])
+        summaries = {}
+        for engine in ('cbc', 'highs', 'greedy'):
+            model, status, results = optimize_allocation(
+                products, self.sample_channels.copy(), self.sample_inventory, self.sample_demand, params, engine=engine
+            )
+            summaries[engine] = summarize_model(model, results, sample_rows=2)
+            self.assertEqual(summaries[engine]['output']['units'], sum(res['quantity'] for res in results))
+
+        cbc, highs = summaries['cbc']['constraints'], summaries['highs']['constraints']
+        self.assertEqual(sorted(cbc), sorted(highs))
+        for family in cbc:
+            for key in ('rows', 'nonzeros', 'coefficient_range', 'rhs_range', 'rhs_histogram'):
+                self.assertEqual(cbc[family][key], highs[family][key], (family, key))
+            self.assertLessEqual(len(cbc[family]['samples']), 2)
+        self.assertEqual(cbc['Outlet_Capacity_SKU']['rhs_histogram'], {'[1e0, 1e1)': 1})
+        self.assertEqual(summaries['cbc']['variables']['is_allocated']['binary'], 3)
+
+        greedy = summaries['greedy']
+        self.assertEqual(greedy['source'], 'run_report')
+        self.assertEqual({family: counts['rows'] for family, counts in greedy['constraints'].items()},
+                         {family: counts['rows'] for family, counts in cbc.items()})
+        with tempfile.TemporaryFile('w+') as file:
+            write_markdown(summaries['cbc'], file)
+            file.seek(0)
+            self.assertIn('| Outlet_Capacity_SKU | 1 | 3 |', file.read())
+
+    def test_solver_settings_and_stats(self):
+        """Test that the solver control block is accepted by both engines and the solve is reported."""
+        params = OptimizationParameters(
+            solver={'time_limit_seconds': 30, 'mip_gap_rel': 0.0, 'threads': 1, 'presolve': False}
+        )
+        for engine in ('cbc', 'highs'):
+            params.solver.engine = engine
+            model, status, results = optimize_allocation(
+                self.sample_products.copy(), self.sample_channels.copy(), self.sample_inventory,
+                self.sample_demand, params
+            )
+            self.assertEqual(status, "Optimal")
+            stats = model.solver_stats
+            self.assertEqual(stats['engine'], engine)
+            self.assertEqual(stats['objective'], sum(res['quantity'] for res in results))
+            self.assertAlmostEqual(stats['gap'], 0.0)
+            self.assertGreaterEqual(stats['node_count'], 0)
+            self.assertGreaterEqual(stats['wall_time_seconds'], 0.0)
+
+    def test_parse_cbc_log_time_limit(self):
+        """Test that the CBC summary of a run stopped on the time limit is parsed."""
+        log_text = (
+            "Result - Stopped on time limit\n\n"
+            "Objective value:                15430.00000000\n"
+            "Upper bound:                    15472.623\n"
+            "Gap:                            -0.00\n"
+            "Enumerated nodes:               1142\n"
+        )
+        stats = parse_cbc_log(log_text)
+        self.assertEqual(stats, {'objective': 15430.0, 'best_bound': 15472.623, 'node_count': 1142})
+        self.assertAlmostEqual(relative_gap(stats['objective'], stats['best_bound']), 42.623 / 15430)
+
+    def test_anytime_incumbent_extraction(self):
+        """Test that incumbents from a time/gap-limited solve are used only in anytime mode."""
+        anytime = OptimizationParameters().solver
+        strict = OptimizationParameters(solver={'anytime': False}).solver
+        optimal = {'solution_status': 'Optimal Solution Found'}
+        incumbent = {'solution_status': 'Solution Found'}
+        no_solution = {'solution_status': 'No Solution Found'}
+        self.assertTrue(has_usable_solution(optimal, anytime))
+        self.assertTrue(has_usable_solution(optimal, strict))
+        self.assertTrue(has_usable_solution(incumbent, anytime))
+        self.assertFalse(has_usable_solution(incumbent, strict))
+        self.assertFalse(has_usable_solution(no_solution, anytime))
+        # A discarded incumbent is never reported as an (empty) optimum
+        self.assertEqual(reported_status('Optimal', incumbent, strict), 'Not Solved')
+        self.assertEqual(reported_status('Optimal', incumbent, anytime), 'Optimal')
+        self.assertEqual(reported_status('Infeasible', {'solution_status': 'No Solution Exists'}, strict), 'Infeasible')
+
+    def test_decomposed_solve_matches_monolithic(self):
+        """Test that solving independent components in worker processes gives the monolithic optimum."""
+        # Two 'countries': coverage rules everywhere and demand only inside each country
+        products = pd.DataFrame({
+            'sku': ['FR1', 'FR2', 'IT1', 'IT2'],
+            'brand': ['BrandA', 'BrandB', 'BrandA', 'BrandB'],
+            'abc_class': ['A', 'A', 'A', 'A']
+        }).set_index('sku')
+        channels = pd.DataFrame({
+            'id': ['FR_STORE', 'FR_DONATE', 'IT_STORE', 'IT_DONATE'],
+            'capacity': [30, 20, 25, 40],
+            'channel_type': ['store', 'donation', 'store', 'donation']
+        }).set_index('id')
+        inventory = pd.DataFrame({'product_sku': ['FR1', 'FR2', 'IT1', 'IT2'], 'quantity': [20, 25, 30, 10]})
+        demand = {
+            ('FR1', 'FR_STORE'): 14, ('FR2', 'FR_STORE'): 21, ('FR2', 'FR_DONATE'): 70,
+            ('IT1', 'IT_STORE'): 35, ('IT1', 'IT_DONATE'): 7, ('IT2', 'IT_STORE'): 7,
+        }
+        rules = [CoverageDaysRule(channel_id=c, abc_class='A', coverage_days=14) for c in channels.index]
+
+        totals = {}
+        for decompose in (False, True):
+            params = OptimizationParameters(coverage_days_rules=rules,
+                                            solver={'engine': 'highs', 'decompose': decompose, 'workers': 2})
+            model, status, results = optimize_allocation(products.copy(), channels.copy(), inventory, demand, params)
+            self.assertEqual(status, "Optimal")
+            totals[decompose] = sum(res['quantity'] for res in results)
+            if decompose:
+                self.assertEqual(model.num_components, 2)
+                self.assertEqual(model.solver_stats['objective'], totals[decompose])
+        self.assertEqual(totals[False], totals[True])
+
+    def test_what_if_scenarios_share_one_model(self):
+        """Test that each variant solved on the shared structural model matches its own solve."""
+        instance = generate_instance(150, 12, seed=2)
+        base = instance['parameters']
+        variants = [
+            ScenarioVariant(name='half_outlet_caps', outlet_sku_capacity_rules=[
+                rule.model_copy(update={'max_skus': rule.max_skus // 2}) for rule in base.outlet_sku_capacity_rules]),
+            ScenarioVariant(name='no_outlet_caps', outlet_sku_capacity_rules=[], outlet_assortment_rules=[]),
+            ScenarioVariant(name='double_coverage', coverage_days_rules=[
+                rule.model_copy(update={'coverage_days': 2 * rule.coverage_days}) for rule in base.coverage_days_rules]),
+            ScenarioVariant(name='restricted', restricted_brands_for_donation=sorted(set(instance['products_df']['brand']))[:3]),
+        ]
+        comparison = run_scenarios(instance['products_df'].copy(), instance['channels_df'].copy(), instance['inventory_df'],
+                                   instance['demand_dict'], base, variants, max_workers=2, include_allocations=True)
+        self.assertEqual([row['name'] for row in comparison['scenarios']], ['base'] + [variant.name for variant in variants])
+        self.assertEqual(set(comparison['phases']), {'prepare', 'build', 'solve'})
+        self.assertEqual(comparison['engine'], 'highs')
+
+        for row, variant in zip(comparison['scenarios'], [None] + variants):
+            params = base if variant is None else variant_parameters(base, variant)
+            model, status, results = optimize_allocation(instance['products_df'].copy(), instance['channels_df'].copy(),
+                                                         instance['inventory_df'], instance['demand_dict'], params,
+                                                         engine='highs')
+            self.assertEqual(row['status'], status)
+            self.assertAlmostEqual(row['objective'], model.solver_stats['objective'])
+            self.assertEqual(row['allocated_units'], sum(res['quantity'] for res in row['allocations']))
+            self.assertEqual(sum(row['units_by_channel_type'].values()), row['allocated_units'])
+        by_name = {row['name']: row for row in comparison['scenarios']}
+        self.assertGreaterEqual(by_name['no_outlet_caps']['objective'], by_name['base']['objective'])
+        self.assertLessEqual(by_name['half_outlet_caps']['objective'], by_name['base']['objective'])
+
+        with self.assertRaises(ValueError):
+            run_scenarios(instance['products_df'].copy(), instance['channels_df'].copy(), instance['inventory_df'],
+                          instance['demand_dict'], base, [ScenarioVariant(name='base')])
+        with self.assertRaises(ValueError): # Scenarios never silently switch an explicit engine to HiGHS
+            run_scenarios(instance['products_df'].copy(), instance['channels_df'].copy(), instance['inventory_df'],
+                          instance['demand_dict'], OptimizationParameters(solver={'engine': 'cbc'}), variants)
+
     def test_min_skus_per_store(self):
         """Test the minimum number of unique SKUs allocated to store channels."""
         min_skus_required = 2
@@ -0,0 +1,53 @@
+import unittest
+import sys
+import os
+
+# Add the backend directory to the Python path
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '../backend')))
+
+from instance_generator import generate_instance
+from solver_benchmark import run_case, run_incremental_case, check_regressions
+
+class TestSolverBenchmark(unittest.TestCase):
+
+    def test_generator_is_seeded_and_solvable(self):
+        """Test that the generator is deterministic and its instances solve with the same model on every engine."""
+        instance = generate_instance(200, 12, seed=3)
+        again = generate_instance(200, 12, seed=3)
+        self.assertTrue(instance['products_df'].equals(again['products_df']))
+        self.assertEqual(instance['demand_dict'], again['demand_dict'])
+        self.assertEqual(instance['parameters'], again['parameters'])
+        self.assertEqual(set(instance['channels_df']['channel_type']) - {'store', 'outlet', 'donation'}, set())
+        self.assertTrue(instance['parameters'].outlet_sku_capacity_rules)
+
+        results = [run_case(engine, 200, 12, seed=3) for engine in ('highs', 'greedy')]
+        self.assertEqual(results[0]['model_size'], results[1]['model_size'])
+        self.assertTrue(all(result['status'] == 'Optimal' for result in results))
+        self.assertGreaterEqual(results[0]['objective'], results[1]['objective'])
+
+    def test_incremental_case_splits_catalogue_and_region_time(self):
+        """Test that the incremental benchmark re-solves a small region and times both parts of the run."""
+        result = run_incremental_case('highs', 300, 12, changed_skus=3, seed=1)
+        self.assertEqual(result['status'], 'Optimal')
+        self.assertLess(result['region_pairs'], result['total_pairs'])
+        self.assertIn('prepare', result['phases'])
+        self.assertIn('solve', result['phases'])
+        self.assertLessEqual(result['catalogue_seconds'] + result['region_seconds'], result['total_seconds'] + 1e-6)
+
+    def test_regression_check(self):
+        """Test that a phase slower than the history median beyond the threshold is reported."""
+        def result(prepare, solve, **extra):
+            return {'engine': 'highs', 'products': 1000, 'channels': 100, 'seed': 0,
+                    'phases': {'prepare': prepare, 'solve': solve}, 'total_seconds': prepare + solve, **extra}
+        history = [{'host': 'a', 'results': [result(1.0, 2.0)]}, {'host': 'a', 'results': [result(1.1, 2.0)]},
+                   {'host': 'b', 'results': [result(9.0, 9.0)]}]
+
+        self.assertEqual(check_regressions(history, [result(1.1, 2.02)], host='a'), [])
+        regressions = check_regressions(history, [result(1.05, 3.0)], threshold=0.25, host='a')
+        self.assertEqual({r['phase'] for r in regressions}, {'solve', 'total'})
+        self.assertEqual(regressions[0]['baseline_seconds'], 2.0)
+        failed = {'engine': 'highs', 'products': 1000, 'channels': 100, 'seed': 0, 'status': 'timeout'}
+        self.assertEqual([r['phase'] for r in check_regressions(history, [failed], host='a')], ['total'])
+
+if __name__ == '__main__':
+    unittest.main()